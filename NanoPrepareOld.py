@@ -7,19 +7,19 @@ import numpy as np
 import zipfile
 import matplotlib.pyplot as plt
 import pandas as pd
-import json
 import altair as alt
 import nanodata.nanodata as nano
+import nanoanalysisdata.curvefile as curvefile
 
 
 def get_selection(title: str, options: tuple | list) -> str:
     """Creates a selection box element in the GUI with a given title and options
-        Args:
-            title (str): title of selection box
-            options (tuple[any] or list[any]): options for the selection
+    Args:
+        title (str): title of selection box
+        options (tuple[any] or list[any]): options for the selection
 
-        Returns:
-            any: option selected from the selection inputted to GUI
+    Returns:
+        any: option selected from the selection inputted to GUI
     """
     return st.selectbox(
         title,
@@ -31,9 +31,9 @@ def get_selection(title: str, options: tuple | list) -> str:
 def save_uploaded_file(uploaded_file: UploadedFile, path: str) -> None:
     """Saves the contents of an uploaded file to a given path.
 
-        Args:
-            uploaded_file (UploadedFile): File uploaded using the streamlit file uploader
-            path (str): The path to the directory where the file will be saved
+    Args:
+        uploaded_file (UploadedFile): File uploaded using the streamlit file uploader
+        path (str): The path to the directory where the file will be saved
 
     """
     try:
@@ -48,9 +48,9 @@ def save_uploaded_file(uploaded_file: UploadedFile, path: str) -> None:
 def extract_zip(file_name: str, dir_name: str) -> None:
     """Extracts the contents of the zip file to a given directory.
 
-        Args:
-            file_name (str): Name of the zip file
-            dir_name (str): The path to the directory where the file will be extracted
+    Args:
+        file_name (str): Name of the zip file
+        dir_name (str): The path to the directory where the file will be extracted
 
     """
     try:
@@ -61,22 +61,27 @@ def extract_zip(file_name: str, dir_name: str) -> None:
         print(e)
 
 
-def generate_raw_curve(experiment_manager: iter, segment: int, ratio_z_left: float = 1, ratio_z_right: float = 1):
+def generate_raw_curve(
+    experiment_manager: iter,
+    segment: int,
+    ratio_z_left: float = 1,
+    ratio_z_right: float = 1,
+):
     """Creates DataFrame objects for experiment data in a given segment and returns them in a list
 
-        Args:
-            experiment_manager (iter): iterable DataManager object
-            segment (int): Number corresponding to a certain segment
-            ratio_z_left (float): Left-hand side limit for specifying a certain range of z values
-            ratio_z_right (float): Right-hand side limit for specifying a certain range of z values
+    Args:
+        experiment_manager (iter): iterable DataManager object
+        segment (int): Number corresponding to a certain segment
+        ratio_z_left (float): Left-hand side limit for specifying a certain range of z values
+        ratio_z_right (float): Right-hand side limit for specifying a certain range of z values
 
-        Returns:
-            exp_data_frames (list): list of DataFrame objects
+    Returns:
+        exp_data_frames (list): list of DataFrame objects
     """
 
 
 def generate_raw_curve(
-        data_man, segment: int, ratio_z_left: float = 1, ratio_z_right: float = 1
+    data_man, segment: int, ratio_z_left: float = 1, ratio_z_right: float = 1
 ):
     # takes a list of experiments and returns a list of experiment dataframes for the selected segment
     exp_data_frames = []
@@ -105,8 +110,8 @@ def generate_raw_curve(
 def generate_json_template():
     """Generates a JSON formatting template corresponding to the data of a sample curve
 
-        Returns:
-            curve (dict): A dictionary formatted for JSON filetype for a sample curve
+    Returns:
+        curve (dict): A dictionary formatted for JSON filetype for a sample curve
     """
     curve = {
         "filename": "noname",
@@ -124,43 +129,75 @@ def generate_json_template():
 def save_to_json(active_datasets):
     """Saves the data of active datasets to a JSON file.
 
-            Args:
-                active_datasets (iter): list of datasets
+    Args:
+        active_datasets (iter): list of datasets
     """
 
     fname = "data/test.json"
 
-    curves = []
+    # curves are written as they are produced, see curvefile.save_json
+    with open(fname, "w") as f:
+        curvefile.save_json(f, export_structure(active_datasets), indent="")
+
+
+def save_to_npz(active_datasets):
+    """Saves the data of active datasets to a binary .npz file, see curvefile.
+
+    Args:
+        active_datasets (iter): list of datasets
+    """
+    curvefile.save_npz("data/test.npz", export_structure(active_datasets))
+
+
+def export_structure(active_datasets):
+    """Collects the experiment, protocol and curves of active datasets to export
+
+    Args:
+        active_datasets (iter): list of datasets
+
+    Returns:
+        structure (dict): The export, its curves produced lazily by export_curves
+    """
+    exp = {"Description": "Optics11 data"}
+    pro = {}
+
+    return {
+        "experiment": exp,
+        "protocol": pro,
+        "curves": export_curves(active_datasets),
+    }
+
 
+def export_curves(active_datasets):
+    """Yields the curve of every segment of active datasets
+
+    Args:
+        active_datasets (iter): list of datasets
+
+    Yields:
+        curve (dict): The curve, with its F and Z data as arrays
+    """
     for dataset in active_datasets:
         for i, segment in enumerate(dataset):
             cv = generate_json_template()
-            cv["filename"] = dataset.name[dataset.name.rindex('/')+1:] + f"_{i+1}"
+            cv["filename"] = dataset.name[dataset.name.rindex("/") + 1 :] + f"_{i+1}"
             cv["tip"]["radius"] = dataset.tip_radius * 1e-9
             cv["spring_constant"] = dataset.cantilever_k
             cv["speed"] = segment.speed
-            cv["data"]["F"] = segment.data['force'].tolist()
-            cv["data"]["Z"] = segment.data['z'].tolist()
-
-            curves.append(cv)
-
-    exp = {"Description": "Optics11 data"}
-    pro = {}
-
-    json_contents = json.dumps({"experiment": exp, "protocol": pro, "curves": curves}, indent="")
+            cv["data"]["F"] = segment.data["force"]
+            cv["data"]["Z"] = segment.data["z"]
 
-    with open(fname, "w") as f:
-        f.write(json_contents)
+            yield cv
 
 
 def base_chart(data_frame):
     """Creates a base layer for a layered chart from a given DataFrame object
 
-            Args:
-                data_frame: DataFrame object
+    Args:
+        data_frame: DataFrame object
 
-            Returns:
-                base: Chart object corresponding to the base layer
+    Returns:
+        base: Chart object corresponding to the base layer
     """
     base = (
         alt.Chart(
@@ -180,12 +217,12 @@ def base_chart(data_frame):
 def layer_charts(data_frames: list, chart_func):
     """Layers individual charts created from DataFrame objects in a given list
 
-            Args:
-                data_frames (list): list of DataFrame objects
-                chart_func: Function creating a single layer of the layered chart
+    Args:
+        data_frames (list): list of DataFrame objects
+        chart_func: Function creating a single layer of the layered chart
 
-            Returns:
-                layered_charts: A layered chart
+    Returns:
+        layered_charts: A layered chart
     """
     layers = [chart_func(data_frame) for data_frame in data_frames]
     layered_charts = alt.layer(*layers)
@@ -195,19 +232,17 @@ def layer_charts(data_frames: list, chart_func):
 def file_handler(file_name: str, quale: str, file: UploadedFile):
     """Decides how to handle the uploaded file and creates an experiment manager storing its data
 
-            Args:
-                file_name (str): Name of the file to be handled
-                file (UploadedFile): File uploaded using the streamlit file uploader
+    Args:
+        file_name (str): Name of the file to be handled
+        file (UploadedFile): File uploaded using the streamlit file uploader
 
-            Returns:
-                experiment_manager (iter): iterable DataManager object
+    Returns:
+        experiment_manager (iter): iterable DataManager object
     """
     if file_name.endswith(".zip"):
-        # unzip the file
-        dir_name = tempfile.mkdtemp()  # create a temp folder to pass to experiment
-        extract_zip(file_name, dir_name)  # save the file to the temp folder
-        experiment_manager = nano.ChiaroDataManager(dir_name)
-        experiment_manager.load()
+        # read the members straight from the uploaded zip file
+        experiment_manager = nano.ChiaroDataManager(file_name)
+        experiment_manager.load_archive(file)
         print(experiment_manager.path)
     else:
         dir_name = tempfile.mkdtemp()  # create a temp folder to pass to experiment
@@ -228,11 +263,9 @@ def get_filter(filter_name: str):
 
 
 def execute_filter(experiment_manager, filter_object, params) -> list:
-    active_datasets = []
-    for dataset in experiment_manager:
-        if filter_object.is_valid(params, dataset):
-            active_datasets.append(dataset)
-    return active_datasets
+    datasets = list(experiment_manager)
+    mask = filter_object.mask(params, datasets)
+    return [dataset for dataset, valid in zip(datasets, mask) if valid]
 
 
 def main() -> None:
@@ -271,6 +304,7 @@ def main() -> None:
     )
 
     save_json_button = file_select_col.button("Save to JSON")
+    save_npz_button = file_select_col.button("Save to NPZ")
     file = file_upload_col.file_uploader("Choose a zip file")
 
     left_graph.line_chart()
@@ -299,22 +333,29 @@ def main() -> None:
         save_uploaded_file(file, "data")
         fname = "data/" + file.name
         experiment_manager = file_handler(fname, quale, file)
-        if 'active_datasets' not in st.session_state:
-            st.session_state['active_datasets'] = experiment_manager.data_sets
+        if "active_datasets" not in st.session_state:
+            st.session_state["active_datasets"] = experiment_manager.data_sets
 
-        st.session_state['active_datasets'] = experiment_manager.data_sets
+        st.session_state["active_datasets"] = experiment_manager.data_sets
 
         segment = left_config_segment.selectbox(
             "Segment", (i for i in range(len(list(experiment_manager.data_sets)[0])))
         )
 
         if save_json_button:
-            save_to_json(st.session_state['active_datasets'])
+            save_to_json(st.session_state["active_datasets"])
             with open("data/test.json") as f:
                 file_select_col.download_button(
                     "Download JSON", data=f, file_name="test.json"
                 )
 
+        if save_npz_button:
+            save_to_npz(st.session_state["active_datasets"])
+            with open("data/test.npz", "rb") as f:
+                file_select_col.download_button(
+                    "Download NPZ", data=f, file_name="test.npz"
+                )
+
         raw_curve = generate_raw_curve(experiment_manager, segment)
 
         # make a layered altair chart with each curve from raw_curve as a layer
@@ -342,15 +383,16 @@ def main() -> None:
 
             # run filter
             if force_filter:
-                filtered_data = execute_filter(experiment_manager,
-                                               force_filter,
-                                               {"force": float(threshold),
-                                                "comparison": ">"})
-                st.session_state['active_datasets'] = filtered_data
+                filtered_data = execute_filter(
+                    experiment_manager,
+                    force_filter,
+                    {"force": float(threshold), "comparison": ">"},
+                )
+                st.session_state["active_datasets"] = filtered_data
 
                 print(f"Filter applied for threshold {threshold}")
                 print(len(experiment_manager.data_sets))
-                print(len(st.session_state['active_datasets']))
+                print(len(st.session_state["active_datasets"]))
 
                 # re-generate the raw curve
                 raw_curve = generate_raw_curve(filtered_data, segment)
@@ -373,7 +415,7 @@ def main() -> None:
             else:
                 st.warning("Threshold filter is not currently initialised.")
         else:
-            st.session_state['active_datasets'] = experiment_manager.data_sets
+            st.session_state["active_datasets"] = experiment_manager.data_sets
 
 
 if __name__ == "__main__":
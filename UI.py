@@ -4,17 +4,17 @@ import nanodata.nanodata as nd
 import abc
 import pandas as pd
 import altair as alt
-from typing import Any
+from typing import Any, Iterator
 from enum import Enum
 import dataclasses
-import zipfile
-import json
+import nanoanalysisdata.curvefile as curvefile
+
 
 def generate_json_template():
     """Generates a JSON formatting template corresponding to the data of a sample curve
 
-        Returns:
-            curve (dict): A dictionary formatted for JSON filetype for a sample curve
+    Returns:
+        curve (dict): A dictionary formatted for JSON filetype for a sample curve
     """
     curve = {
         "filename": "noname",
@@ -28,6 +28,7 @@ def generate_json_template():
     }
     return curve
 
+
 class UISingleton(type):
     _instances = {}
 
@@ -75,7 +76,9 @@ class UI(st.delta_generator.DeltaGenerator, metaclass=UISingleton):
         super().__init__()
         self._sidebar = UISideBar(self)
         self._graphs: dict[str, UIGraph] = {}
-        self._manager = nd.ChiaroDataManager(tempfile.mkdtemp())
+        self._manager = nd.ChiaroDataManager(
+            tempfile.mkdtemp(), cache_dir="data/cache", memory_budget=512 * 2**20
+        )
         self._data_sets: dict[str, DataSetState] = {
             data_set.name: DataSetState(data_set.name) for data_set in self._manager
         }
@@ -85,23 +88,30 @@ class UI(st.delta_generator.DeltaGenerator, metaclass=UISingleton):
         # upload zip file and set manager path to tempfile path
         file = self.file_uploader("Upload zipped data files", type="zip")
         save_json_button = self.button("Save to JSON")
+        save_npz_button = self.button("Save to NPZ")
 
-        if file is not None:
-            with zipfile.ZipFile(file, "r") as zip_file:
-                zip_file.extractall(self.manager.path)
+        # every rerun hands back the same upload, which is loaded only once
+        if file is not None and st.session_state.get("archive") != (
+            file.name,
+            file.size,
+        ):
+            # members are streamed from the upload, nothing is written to disk
+            self.manager.load_archive(file, lazy=True)
+            st.session_state["archive"] = (file.name, file.size)
 
         if save_json_button:
             self.export_json()
             with open("data/test.json") as f:
-                self.download_button(
-                    "Download JSON", data=f, file_name="test.json"
-                )
+                self.download_button("Download JSON", data=f, file_name="test.json")
+
+        if save_npz_button:
+            self.export_npz()
+            with open("data/test.npz", "rb") as f:
+                self.download_button("Download NPZ", data=f, file_name="test.npz")
 
         self.sidebar.draw()
         self.draw_graphs()
 
-
-
     def add_graph(self, x_field: str, y_field: str):
         self._graphs[f"{x_field}-{y_field}"] = UIGraph(self, x_field, y_field)
 
@@ -113,7 +123,8 @@ class UI(st.delta_generator.DeltaGenerator, metaclass=UISingleton):
             graph.draw()
 
     def load_data_sets(self):
-        self.manager.load()
+        # bodies are parsed when first plotted or filtered
+        self.manager.load(lazy=True)
         self._data_sets: dict[str, DataSetState] = {
             data_set.name: DataSetState(data_set.name) for data_set in self._manager
         }
@@ -123,8 +134,25 @@ class UI(st.delta_generator.DeltaGenerator, metaclass=UISingleton):
 
         fname = "data/test.json"
 
-        curves = []
+        # curves are written as they are produced, see curvefile.save_json
+        with open(fname, "w") as f:
+            curvefile.save_json(f, self.export_structure(), indent="")
+
+    def export_npz(self):
+        """Saves the data of active datasets to a binary .npz file, see curvefile."""
+        curvefile.save_npz("data/test.npz", self.export_structure())
+
+    def export_structure(self) -> dict[str, Any]:
+        """Returns the experiment, protocol and curves of the active datasets to export.
+        The curves are produced lazily, see export_curves."""
+        exp = {"Description": "Optics11 data"}
+        pro = {}
 
+        return {"experiment": exp, "protocol": pro, "curves": self.export_curves()}
+
+    def export_curves(self) -> Iterator[dict[str, Any]]:
+        """Yields the curve of every segment of the active datasets, with its F and Z
+        data as arrays."""
         for dataset_name in self.data_sets:
             dataset_obj = self.manager[dataset_name]
             if self.data_sets[dataset_name].active:
@@ -134,18 +162,10 @@ class UI(st.delta_generator.DeltaGenerator, metaclass=UISingleton):
                     cv["tip"]["radius"] = dataset_obj.tip_radius * 1e-9
                     cv["spring_constant"] = dataset_obj.cantilever_k
                     cv["speed"] = segment.speed
-                    cv["data"]["F"] = segment.data['force'].tolist()
-                    cv["data"]["Z"] = segment.data['z'].tolist()
-
-                    curves.append(cv)
-
-        exp = {"Description": "Optics11 data"}
-        pro = {}
+                    cv["data"]["F"] = segment.data["force"]
+                    cv["data"]["Z"] = segment.data["z"]
 
-        json_contents = json.dumps({"experiment": exp, "protocol": pro, "curves": curves}, indent="")
-
-        with open(fname, "w") as f:
-            f.write(json_contents)
+                    yield cv
 
     @property
     def sidebar(self):
@@ -173,8 +193,8 @@ class UI(st.delta_generator.DeltaGenerator, metaclass=UISingleton):
                 "Get Help": None,
                 "Report a Bug": None,
                 "About": "Web version of CellMechLabs NanoPrepare and NanoAnalysis tools\n"
-                         "Ported by: GU 3rd Year CompSci students @SH32\n"
-                         "\nGithub: https://github.com/CellMechLab/",
+                "Ported by: GU 3rd Year CompSci students @SH32\n"
+                "\nGithub: https://github.com/CellMechLab/",
             },
         )
 
@@ -303,15 +323,15 @@ class DataSetsContainer(ContainerUtils):
             st.write("In View")
 
         for (
-                data_set_name,
-                data_set_properties,
+            data_set_name,
+            data_set_properties,
         ) in self.data_sets.items():
             name, checkbox = self.expander.columns(2)
             with name:
                 st.write(data_set_name)
             with checkbox:
                 if st.checkbox(
-                        " ", value=data_set_properties.display, key=data_set_name
+                    " ", value=data_set_properties.display, key=data_set_name
                 ):
                     self._add_data_set_to_graph(data_set_name, segment_index)
                 else:
@@ -465,17 +485,22 @@ class FiltersContainer(ContainerUtils):
     def __run_filters(self):
         if not self.filters:
             return
-        for data_set in self.window.data_sets.values():
-            for filter, filter_parameters in self.filters.items():
-                parameters = {
+        filters = [
+            (
+                filter,
+                {
                     filter_parameter.name: filter_parameter.selected_value
                     for filter_parameter in filter_parameters
-                }
-                data_set.active = filter.is_valid(
-                    parameters, self.manager[data_set.name]
-                )
-                if not data_set.active:
-                    break
+                },
+            )
+            for filter, filter_parameters in self.filters.items()
+        ]
+        data_sets = list(self.window.data_sets.values())
+        mask = nd.apply_filters(
+            filters, [self.manager[data_set.name] for data_set in data_sets]
+        )
+        for data_set, active in zip(data_sets, mask):
+            data_set.active = bool(active)
 
     @property
     def filters(self):
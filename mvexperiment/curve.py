@@ -3,7 +3,9 @@ import matplotlib.pyplot as plt
 import numpy as np
 from scipy.optimize import curve_fit
 from scipy.signal import medfilt
-from scipy.signal import savgol_filter as savgol
+
+from nanodata.nanodata import contact, hertz
+from nanodata.nanodata.savgol import savgol_filter as savgol
 
 # Status of sample arm (?)
 MODE_DIRECTION_BACKWARD = 1
@@ -34,6 +36,7 @@ def GGauss(x, x1, x2, a1, a2, s1, s2):
 # Represents a certain segment in the data and its properties.
 # Dependencies : matplotlib, numpy
 
+
 class Segment(object):
     def __init__(self, parent=None, z=None, f=None):
         self.z = z  # displacement
@@ -243,63 +246,90 @@ class Segment(object):
             return
         offsetY = np.average(self.f[: self.iContact])
         offsetX = self.z[self.iContact]
-        Yf = self.f[self.iContact:] - offsetY
-        Xf = self.z[self.iContact:] - offsetX
+        Yf = self.f[self.iContact :] - offsetY
+        Xf = self.z[self.iContact :] - offsetX
         self.indentation = Xf - Yf / self.parent.cantilever_k
         self.touch = Yf
 
     # Math - physics formula code
     # Port as it is
     def hertz(
-            self, x, E=None
+        self, x, E=None
     ):  # NB E should be in nN/nm^2 = 10^9 N/m^2 -> internal units for E is GPa
         if E is None:
             E = self.young
         x = np.abs(x)
         # Eeff = E*1.0e9 #to convert E in GPa to keep consistency with the units nm and nN
         y = (
-                (4.0 / 3.0)
-                * (E / (1 - self.poisson ** 2))
-                * np.sqrt(self.parent.tip_radius * x ** 3)
+            (4.0 / 3.0)
+            * (E / (1 - self.poisson**2))
+            * np.sqrt(self.parent.tip_radius * x**3)
         )
         return y  # y will be in nN
 
     # Again, math code.
-    # Port as it is
-    # Dependencies = numpy, scipy (curve_fit)
+    # hertz is linear in E, so the least squares E is solved directly, see
+    # nanodata.nanodata.hertz. seed is kept for callers, there is nothing to seed.
+    # Dependencies = numpy
     def fitHertz(self, seed=1000.0 / 1e9, threshold=None, thresholdType="indentation"):
         self.young = None
         if self.indentation is None:
             return
-        x = self.indentation
-        y = self.touch
-        if threshold is not None:
-            imax = len(x)
-            if thresholdType == "indentation":
-                if threshold > np.max(x):
-                    return False
-                imax = np.argmin((x - threshold) ** 2)
-            else:
-                if threshold > np.max(y) or threshold < np.min(y):
-                    return False
-                imax = np.argmin((y - threshold) ** 2)
-            if imax > 10:
-                x = x[:imax]
-                y = y[:imax]
-                self.youngIThreshold = imax
-            else:
-                return False
-        seeds = [seed]
-        # NB the curve is forced to have F=0 at indentation 0
-        try:
-            popt, pcov = curve_fit(self.hertz, x, y, p0=seeds, maxfev=10000)
-            self.young = popt[0]
-            self.H_indentation = x
-            self.H_touch = y
-            area = np.pi * self.parent.tip_radius * x
-            self.H_pressure = y / area
-            return self.young * 1e9
+        young, stops = hertz.fit_young(
+            [self.indentation],
+            [self.touch],
+            self.parent.tip_radius,
+            self.poisson,
+            threshold,
+            thresholdType,
+        )
+        return self.setHertz(young[0], stops[0], threshold)
 
-        except RuntimeError:
+    # Stores a Hertz fit of the first imax samples of the indentation
+    def setHertz(self, young, imax, threshold=None):
+        if imax == 0 or np.isnan(young):
             return False
-        return True
+        if threshold is not None:
+            self.youngIThreshold = imax
+        x = self.indentation[:imax]
+        y = self.touch[:imax]
+        self.young = young
+        self.H_indentation = x
+        self.H_touch = y
+        area = np.pi * self.parent.tip_radius * x
+        self.H_pressure = y / area
+        return self.young * 1e9
+
+
+# Batch version of findOutOfContactRegion and findContactPoint for many segments,
+# e.g. all the curves of a force map, see nanodata.nanodata.contact
+# Dependencies : numpy, scipy (curve_fit, only for curves the fast path cannot fit)
+def findContactPoints(segments, weight=20.0):
+    segments = list(segments)
+    zs = [s.z for s in segments]
+    fs = [s.f for s in segments]
+    outContact, iContact = contact.find_contact_points(zs, fs, weight)
+    for s, out, i in zip(segments, outContact, iContact):
+        s.outContact = int(out)
+        s.iContact = int(i)
+
+
+# Batch version of fitHertz for many segments, e.g. all the curves of a force map
+# Returns young * 1e9 of every segment as fitHertz, NaN where it was not fitted
+# Dependencies : numpy
+def fitHertzCurves(segments, threshold=None, thresholdType="indentation"):
+    segments = list(segments)
+    empty = np.empty(0)
+    young, stops = hertz.fit_young(
+        [empty if s.indentation is None else s.indentation for s in segments],
+        [empty if s.indentation is None else s.touch for s in segments],
+        np.array([s.parent.tip_radius for s in segments]),
+        np.array([s.poisson for s in segments]),
+        threshold,
+        thresholdType,
+    )
+    for s, E, imax in zip(segments, young, stops):
+        s.young = None
+        if s.indentation is not None:
+            s.setHertz(E, imax, threshold)
+    return young * 1e9
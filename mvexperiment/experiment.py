@@ -1,14 +1,19 @@
 import numpy as np
-from scipy.signal import savgol_filter, find_peaks
+from scipy.signal import find_peaks
 import afmformats
 
+from nanodata.nanodata import header as chiaroHeader
+from nanodata.nanodata import lookup
+from nanodata.nanodata.nanodata import find_protocol_nodes
+from nanodata.nanodata.savgol import savgol_filter
+
 from .curve import (
     MODE_DIRECTION_BACKWARD,
     MODE_DIRECTION_FORWARD,
     MODE_DIRECTIONS_PAUSE,
     Segment,
 )
-from .mvFilesystem import MvNode
+from .mvFilesystem import MvNode, localPath
 
 
 class DataSet(MvNode):
@@ -90,13 +95,58 @@ def cross(x1, x2, th, dth):
     return False
 
 
+def findNodes(time, z, protocol, bias=30, checkCross=True):
+    # For each protocol step, the first sample later than the step duration where z
+    # crosses the step threshold; the search is shared with nanodata
+    return find_protocol_nodes(
+        np.asarray(time), np.asarray(z), protocol, bias, checkCross
+    )
+
+
+def firstIndex(mask):
+    # first index where mask is True, None if there is none
+    if len(mask) == 0:
+        return None
+    found = int(np.argmax(mask))
+    return found if mask[found] else None
+
+
+def findGenovaNodes(time, z, protocol):
+    # Each step ends at the first sample where both the step time has been passed
+    # and z has crossed the step value; the crossings of every step are located on
+    # whole arrays instead of sample by sample
+    time = np.asarray(time)
+    z = np.asarray(z)
+    nodi = [0]
+    start = 0
+    nexttime = 0
+    for nextvalue, duration in protocol:
+        nexttime += duration
+        t = time[start:]
+        zz = z[start:]
+        timeCross = (t[:-1] <= nexttime) & (t[1:] > nexttime)
+        valueCross = ((zz[:-1] <= nextvalue) & (zz[1:] > nextvalue)) | (
+            (zz[:-1] >= nextvalue) & (zz[1:] < nextvalue)
+        )
+        timeIndex = firstIndex(timeCross)
+        valueIndex = firstIndex(valueCross)
+        if timeIndex is None or valueIndex is None:
+            break
+        node = start + max(timeIndex, valueIndex)
+        nodi.append(node)
+        nexttime = time[node]
+        start = node + 1
+    nodi.append(len(time) - 1)
+    return nodi
+
+
 def toFloat(val):
     return float(val.replace(",", "."))
 
 
 class ChiaroBase(DataSet):
     def check(self):
-        f = open(self.filename)
+        f = self.filename.open()
         signature = f.readline()
         f.close()
         if signature[0:5] == "Date\t":
@@ -110,106 +160,64 @@ class ChiaroBase(DataSet):
         value = line[init:].strip()
         return value
 
-    def header(self):
-        self.tip_shape = "sphere"
-        f = open(self.filename)
+    def open(self):
+        # header and body are read in a single pass over the file
+        f = self.filename.open()
+        self.header(f)
+        self.load(f)
+        f.close()
+        self.createSegments()
 
+    def header(self, f=None):
+        # f: the open file, left at the start of the body; opened here if None
+        self.tip_shape = "sphere"
         self.O11 = {"device": "Chiaro", "version": "old"}
 
-        targets = [
-            "Tip radius (um)",
-            "Calibration factor",
-            "k (N/m)",
-            "SMDuration (s)",
-            "Profile:",
-            "E[eff] (Pa)",
-            "X-position (um)",
-            "Y-position (um)",
-            "Software version",
-            "Time (s)",
-            "Measurement",
-            "Loading / unloading time (s)",
-            "Depth (nm)",
-            "Z-position (um)",
-            "Z surface (um)",
-            "Piezo position (nm) (Measured)",
-            "Calibration factor",
-            "Device",
-            "Software version",
-            "Control mode",
-            "Measurement",
-        ]
-
-        startprotocol = ["Profile", "Piezo Indentation Sweep Settings"]
-
         # Reading header
         self.version = "old"
 
-        for line in f:
-            starting = False
-            for start in startprotocol:
-                if start in line:
-                    starting = True
-                    break
-            if starting is True:
-                break
-            targeted = False
-            for target in targets:
-                if target in line:
-                    targeted = True
-                    break
-            if targeted is True:
-                value = self.getTarget(line, target)
-                if target == "Tip radius (um)":
-                    self.tip_radius = (
-                        toFloat(value) * 1000.0
-                    )  # NB: internal units are nm
-                elif target == "k (N/m)":
-                    self.cantilever_k = toFloat(value)
-                elif target == "Calibration factor":
-                    self.cantilever_lever = toFloat(
-                        value
-                    )  # NB: so called geometric factor
-                elif target == "E[eff] (Pa)":
-                    # saved in Pa, internally in GPa; this is Eeff (i.e. including 1-\nu^2)
-                    self.youngProvided = toFloat(value) / 1.0e9
-                elif target == "X-position (um)":
-                    self.xpos = toFloat(value)
-                elif target == "Y-position (um)":
-                    self.ypos = toFloat(value)
-                elif target == "Software version":
-                    self.O11["version"] = value
-                elif target == "Measurement":
-                    self.O11["measurement"] = value
-                elif target == "Z-position (um)":
-                    self.O11["zpos"] = toFloat(value)
-                elif target == "Z surface (um)":
-                    self.O11["zsurf"] = toFloat(value)
-                elif target == "Piezo position (nm) (Measured)":
-                    self.O11["piezopos"] = toFloat(value)
-                elif target == "Device":
-                    self.O11["device"] = value
-                elif target == "Control mode":
-                    # Control mode: Displacement
-                    # Control mode: Indentation
-                    # Control mode: Load
-                    # Control mode: Peak Load Poking
-                    self.O11["mode"] = value
-
-        for line in f:
-            if line.strip() == "":
-                break
-            slices = line.strip().replace(",", ".").split("\t")
-            num1 = float(slices[1])
-            num2 = float(slices[3])
-            self.protocol.append([float(slices[1]), float(slices[3])])
-
-        f.close()
-
-    def load(self):
-        f = open(self.filename)
+        if f is None:
+            with self.filename.open() as f:
+                fields, _ = chiaroHeader.parse_header(f)
+        else:
+            fields, _ = chiaroHeader.parse_header(f)
+
+        if "tip_radius" in fields:
+            self.tip_radius = fields["tip_radius"] * 1000.0  # NB: internal units are nm
+        if "cantilever_k" in fields:
+            self.cantilever_k = fields["cantilever_k"]
+        if "cantilever_lever" in fields:
+            # NB: so called geometric factor
+            self.cantilever_lever = fields["cantilever_lever"]
+        if "effective_modulus" in fields:
+            # saved in Pa, internally in GPa; this is Eeff (i.e. including 1-\nu^2)
+            self.youngProvided = fields["effective_modulus"] / 1.0e9
+        if "x_pos" in fields:
+            self.xpos = fields["x_pos"]
+        if "y_pos" in fields:
+            self.ypos = fields["y_pos"]
+        # Control mode: Displacement / Indentation / Load / Peak Load Poking
+        for field, key in [
+            ("version", "version"),
+            ("measurement", "measurement"),
+            ("z_pos", "zpos"),
+            ("z_surface", "zsurf"),
+            ("piezo_pos", "piezopos"),
+            ("device", "device"),
+            ("mode", "mode"),
+        ]:
+            if field in fields:
+                self.O11[key] = fields[field]
+        for value, duration in fields.get("protocol", []):
+            self.protocol.append([float(value), float(duration)])
+
+    def load(self, f=None):
+        # f: the open file, already past the header (see header); opened here if None
+        owned = f is None
+        numeric = not owned
+        if owned:
+            f = self.filename.open()
         stopLine = "Time (s)"
-        numeric = False
         data = []
         for riga in f:
             if numeric is False:
@@ -228,7 +236,8 @@ class ChiaroBase(DataSet):
                         float(line[2]),
                     ]
                 )
-        f.close()
+        if owned:
+            f.close()
         data = np.array(data)
 
         self.data["time"] = data[:, 0]
@@ -272,9 +281,12 @@ class Chiaro(ChiaroBase):
             nodi = []
             nodi.append(0)
             curtime = 0
+            increasing = lookup.is_increasing(self.data["time"])
             for seg in self.protocol:
                 curtime += seg[1]
-                nodi.append(np.argmin((self.data["time"] - curtime) ** 2))
+                nodi.append(
+                    lookup.nearest_index(self.data["time"], curtime, increasing)
+                )
 
         for i in range(len(nodi) - 1):
             if (nodi[i + 1] - nodi[i]) < 2:
@@ -289,30 +301,13 @@ class Chiaro(ChiaroBase):
             self[-1].speed = (z[end] - z[beg]) / (t[end] - t[beg])
 
     def createSegments2019(self, bias=30):
-        actualPos = 2
-        nodi = []
-        nodi.append(0)
-        wait = 0
-        for nextThreshold, nextTime in self.protocol:
-            for j in range(actualPos, len(self.data["z"])):
-                if self.data["time"][j] > wait + nextTime:
-                    if (
-                        self.version != "old"
-                        or (
-                            cross(
-                                self.data["z"][j],
-                                self.data["z"][j - 1],
-                                nextThreshold,
-                                bias,
-                            )
-                        )
-                        is True
-                    ):
-                        nodi.append(j)
-                        wait = self.data["time"][j]
-                        break
-            actualPos = j
-        nodi.append(len(self.data["z"]) - 1)
+        nodi = findNodes(
+            self.data["time"],
+            self.data["z"],
+            self.protocol,
+            bias,
+            checkCross=self.version == "old",
+        )
         self.nodi = nodi
         for i in range(len(nodi) - 1):
             z = self.data["z"][nodi[i] : nodi[i + 1]]
@@ -327,31 +322,13 @@ class Chiaro(ChiaroBase):
 
 class Chiaro2019(ChiaroBase):
     def createSegments(self, bias=30):
-        sign = +1
-        actualPos = 2
-        nodi = []
-        nodi.append(0)
-        wait = 0
-        for nextThreshold, nextTime in self.protocol:
-            for j in range(actualPos, len(self.data["z"])):
-                if self.data["time"][j] > wait + nextTime:
-                    if (
-                        self.version != "old"
-                        or (
-                            cross(
-                                self.data["z"][j],
-                                self.data["z"][j - 1],
-                                nextThreshold,
-                                bias,
-                            )
-                        )
-                        is True
-                    ):
-                        nodi.append(j)
-                        wait = self.data["time"][j]
-                        break
-            actualPos = j
-        nodi.append(len(self.data["z"]) - 1)
+        nodi = findNodes(
+            self.data["time"],
+            self.data["z"],
+            self.protocol,
+            bias,
+            checkCross=self.version == "old",
+        )
         self.nodi = nodi
         for i in range(len(nodi) - 1):
             z = self.data["z"][nodi[i] : nodi[i + 1]]
@@ -368,41 +345,7 @@ class ChiaroGenova(ChiaroBase):
     # this procedure works for old text curves from Genova, not last version
     # waiting for the feedback from Optics11 to get it corrected
     def createSegments(self):
-        vs = self.protocol
-        nodi = []
-        nodi.append(0)
-        j = 0
-        nexttime = vs[j][1]
-        nextvalue = vs[j][0]
-        timefound = False
-        valuefound = False
-        for i in range(len(self.data["time"])):
-            if i == len(self.data["time"]) - 1:
-                nodi.append(i)
-            else:
-                if (
-                    self.data["time"][i] <= nexttime
-                    and self.data["time"][i + 1] > nexttime
-                ):
-                    timefound = True
-                if (
-                    self.data["z"][i] <= nextvalue and self.data["z"][i + 1] > nextvalue
-                ) or (
-                    self.data["z"][i] >= nextvalue and self.data["z"][i + 1] < nextvalue
-                ):
-                    valuefound = True
-            if timefound and valuefound:
-                nodi.append(i)
-                nexttime = self.data["time"][i]
-                timefound = False
-                valuefound = False
-                if j + 1 == len(vs):
-                    nodi.append(len(self.data["time"]) - 1)
-                    break
-                else:
-                    j += 1
-                    nexttime += vs[j][1]
-                    nextvalue = vs[j][0]
+        nodi = findGenovaNodes(self.data["time"], self.data["z"], self.protocol)
         self.nodi = nodi
         for i in range(len(nodi) - 1):
             z = self.data["z"][nodi[i] : nodi[i + 1]]
@@ -422,7 +365,7 @@ class ChiaroGenova(ChiaroBase):
 
 class NanoSurf(DataSet):
     def check(self):
-        f = open(self.filename)
+        f = self.filename.open()
         signature = f.readline()
         f.close()
         if signature[0:9] == "#Filename":
@@ -430,7 +373,7 @@ class NanoSurf(DataSet):
         return False
 
     def header(self):
-        f = open(self.filename)
+        f = self.filename.open()
         targets = [
             "#Cantilever=",
             "#Spring-Constant=",
@@ -502,7 +445,7 @@ class NanoSurf(DataSet):
         data = []
         dummy = True
         collected = 0
-        f = open(self.filename)
+        f = self.filename.open()
         for line in f:
             if dummy is True:
                 if line[0:10] == "#Spec-Data":
@@ -564,7 +507,7 @@ class Easytsv(DataSet):
     _leaf_ext = [".tsv"]
 
     def check(self):
-        f = open(self.filename)
+        f = self.filename.open()
         l1 = f.readline().strip()
         f.close()
         if l1 == "#easy_tsv":
@@ -573,7 +516,7 @@ class Easytsv(DataSet):
             return False
 
     def load(self):
-        f = open(self.filename)
+        f = self.filename.open()
         lines = list()
         for i in range(3):  # first three lines of the file
             lines.append(f.readline().strip())  # strip removes \n
@@ -582,7 +525,8 @@ class Easytsv(DataSet):
         self.cantilever_k = float(lines[1][lines[1].find(":") + 1 :].strip())
         # R value needed by program
         self.tip_radius = float(lines[2][lines[2].find(":") + 1 :].strip())
-        data = np.loadtxt(self.filename, delimiter="\t", skiprows=4)
+        with self.filename.open() as f:
+            data = np.loadtxt(f, delimiter="\t", skiprows=4)
         self.data["force"] = data[:, 1]
         self.data["z"] = data[:, 0]
 
@@ -595,20 +539,22 @@ class Jpk(DataSet):
     _leaf_ext = [".jpk-force"]
 
     def load(self):
-        f = afmformats.load_data(self.filename)
-        # inspect the columns
-        # print(f[0].columns)
-
-        fd = afmformats.mod_force_distance.AFMForceDistance(
-            f[self.curveid]._raw_data, f[self.curveid].metadata, diskcache=False
-        )
-
-        self.data["force"] = [fd.appr["force"] * 1e9, fd.retr["force"] * 1e9]
-        self.data["z"] = [
-            -1.0 * (fd.appr["height (measured)"] * 1e9),
-            -1.0 * (fd.retr["height (measured)"] * 1e9),
-        ]  # flip z
-        metadata = fd.metadata
+        # afmformats reads the columns lazily, so only while the file exists
+        with localPath(self.filename) as filename:
+            f = afmformats.load_data(filename)
+            # inspect the columns
+            # print(f[0].columns)
+
+            fd = afmformats.mod_force_distance.AFMForceDistance(
+                f[self.curveid]._raw_data, f[self.curveid].metadata, diskcache=False
+            )
+
+            self.data["force"] = [fd.appr["force"] * 1e9, fd.retr["force"] * 1e9]
+            self.data["z"] = [
+                -1.0 * (fd.appr["height (measured)"] * 1e9),
+                -1.0 * (fd.retr["height (measured)"] * 1e9),
+            ]  # flip z
+            metadata = fd.metadata
         # print(fd.metadata)
         self.cantilever_k = metadata["spring constant"]
         self.tip_radius = 1.0  # nm (user input)
@@ -629,8 +575,9 @@ class JpkForceMap(DataSet):
     def __init__(self, filename=None, parent=None):
         super().__init__(filename, parent)
         if self._filehandler.is_file() is True:
-            f = afmformats.load_data(filename)
+            with localPath(self.filename) as path:
+                f = afmformats.load_data(path)
             for i in range(len(f)):
-                newleaf = Jpk(filename, self)
+                newleaf = Jpk(self.filename, self)
                 newleaf.curveid = i
                 self.append(newleaf)
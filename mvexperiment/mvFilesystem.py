@@ -1,14 +1,24 @@
-import os
-import time
+import contextlib
+import tempfile
 import zipfile
 
 from . import mvObject
 from .pathto import Path as ppath
 
-#from .zippo import Path as zpath
+
+@contextlib.contextmanager
+def localPath(filename):
+    # a path on disk for readers that cannot take a stream, e.g. afmformats
+    # members of a zip are extracted to a temporary folder, removed on exit
+    if not isinstance(filename, zipfile.Path):
+        yield filename
+        return
+    with tempfile.TemporaryDirectory() as dir_name:
+        yield filename.root.extract(filename.at, dir_name)
+
 
 class MvNode(mvObject.MvObject):
-    _leaf_ext = ['.png'] # rename to leaf_extension or file_extension
+    _leaf_ext = [".png"]  # rename to leaf_extension or file_extension
 
     def __init__(self, filename=None, parent=None):
         super().__init__(parent)
@@ -16,13 +26,9 @@ class MvNode(mvObject.MvObject):
         # try:
         if filename is not None:
             if str(filename) == filename:
-                if '.zip' in filename:
-                    if os.path.exists('./tmp') is False:
-                        os.mkdir('./tmp')
-                    name = '{}-{}-{}-{}-{}'.format(*time.gmtime()[:5])
-                    zp = zipfile.ZipFile(filename)
-                    zp.extractall(path='./tmp/'+name)
-                    self._filehandler = ppath('./tmp/'+name)
+                if ".zip" in filename:
+                    # browse and read the members in place, nothing is extracted
+                    self._filehandler = zipfile.Path(filename)
                 else:
                     self._filehandler = ppath(filename)
             else:
@@ -65,12 +71,11 @@ class MvNode(mvObject.MvObject):
             elif ddir.is_file() is True:
                 if self._leaf_ext is not None:
                     # Makes sure ._leaf_ext is iterable
-                    if str(self._leaf_ext) == self._leaf_ext: #isInstance of string?
+                    if str(self._leaf_ext) == self._leaf_ext:  # isInstance of string?
                         self._leaf_ext = [self._leaf_ext]
                     for ex in self._leaf_ext:
-                        if ddir.name[-len(ex):] == ex:
-                            newleaf = self.__class__(
-                                parent=self, filename=ddir)
+                        if ddir.name[-len(ex) :] == ex:
+                            newleaf = self.__class__(parent=self, filename=ddir)
                             if newleaf.check() is not False:
                                 self.append(newleaf)
                                 self._empty = False
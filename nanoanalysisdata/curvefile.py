@@ -0,0 +1,350 @@
+import codecs
+import json
+import math
+import numpy as np
+import warnings
+
+from typing import Any, BinaryIO, Iterator, TextIO
+
+# Binary counterpart of the JSON curve export: one {"experiment", "protocol",
+# "curves"} structure, where every curve is the JSON template with its data["F"]
+# and data["Z"] arrays. In the .npz file the F and Z samples of all the curves are
+# stored back to back in two float64 arrays, split by an offsets array, and
+# everything else is kept as JSON text.
+#
+# save_json writes the JSON export itself one curve at a time, see _JsonLayout,
+# and read_json reads it back the same way, see _JsonReader.
+
+
+def save_npz(
+    file: str | BinaryIO, structure: dict[str, Any], compress: bool = True
+) -> None:
+    """Saves an exported experiment as an .npz file.
+
+    Args:
+        file (str | BinaryIO): Path or binary stream to write to.
+        structure (dict[str, Any]): The experiment, as for the JSON export. The
+            curves can be any iterable, their F and Z data arrays or lists.
+        compress (bool): Whether to deflate the arrays, the default, for the smallest
+            files. False writes faster but larger files.
+    """
+    curves = list(structure["curves"])
+    forces = [np.asarray(curve["data"]["F"], dtype=np.float64) for curve in curves]
+    zs = [np.asarray(curve["data"]["Z"], dtype=np.float64) for curve in curves]
+    if any(len(f) != len(z) for f, z in zip(forces, zs)):
+        raise ValueError("Every curve must have as many F as Z samples.")
+    offsets = np.zeros(len(curves) + 1, dtype=np.int64)
+    np.cumsum([len(f) for f in forces], out=offsets[1:])
+    meta = {**structure, "curves": None}
+    meta["curves"] = [
+        {**curve, "data": {key: None for key in curve["data"]}} for curve in curves
+    ]
+    save = np.savez_compressed if compress else np.savez
+    save(
+        file,
+        F=np.concatenate(forces) if forces else np.empty(0),
+        Z=np.concatenate(zs) if zs else np.empty(0),
+        offsets=offsets,
+        meta=np.array(json.dumps(meta)),
+    )
+
+
+def load_npz(file: str | BinaryIO) -> dict[str, Any]:
+    """Loads an experiment saved by save_npz.
+
+    Args:
+        file (str | BinaryIO): Path or binary stream to read from.
+
+    Returns:
+        dict[str, Any]: The experiment, as json.load returns it for the JSON export,
+            except that the F and Z data of every curve are float64 views of the
+            arrays shared by all the curves.
+    """
+    with np.load(file, allow_pickle=False) as archive:
+        forces = archive["F"]
+        zs = archive["Z"]
+        offsets = archive["offsets"]
+        structure = json.loads(archive["meta"].item())
+    for curve, start, stop in zip(structure["curves"], offsets[:-1], offsets[1:]):
+        curve["data"]["F"] = forces[start:stop]
+        curve["data"]["Z"] = zs[start:stop]
+    return structure
+
+
+class _JsonLayout:
+    """Punctuation json.dumps uses for containers, for indent None or "".
+
+    Neither indents nested lines, so the text of a value does not depend on its
+    depth and the export can be written piece by piece.
+    """
+
+    def __init__(self, indent: str | None):
+        if indent not in (None, ""):
+            raise ValueError('Only indent=None or indent="" can be streamed.')
+        self.indent = indent
+        newline = "" if indent is None else "\n"
+        self.separator = ", " if indent is None else ",\n"
+        self.open_object = "{" + newline
+        self.close_object = newline + "}"
+        self.open_array = "[" + newline
+        self.close_array = newline + "]"
+
+    def value(self, value: Any) -> str:
+        return json.dumps(value, indent=self.indent)
+
+    def array(self, values: np.ndarray) -> str:
+        values = values.tolist()
+        if not values:
+            return "[]"
+        numbers = map(repr, values)
+        if not all(map(math.isfinite, values)):
+            numbers = map(_json_number, values)
+        return self.open_array + self.separator.join(numbers) + self.close_array
+
+
+def _json_number(value: float) -> str:
+    """Spells a number as json.dumps does, including NaN and infinities."""
+    if value != value:
+        return "NaN"
+    if value in (math.inf, -math.inf):
+        return "Infinity" if value > 0 else "-Infinity"
+    return repr(value)
+
+
+def _json_curve(layout: _JsonLayout, curve: dict[str, Any]) -> str:
+    items = []
+    for key, value in curve.items():
+        if key == "data" and isinstance(value, dict) and value:
+            channels = [
+                (
+                    f"{json.dumps(name)}: {layout.array(data)}"
+                    if isinstance(data, np.ndarray)
+                    and data.ndim == 1
+                    and data.dtype.kind in "fiu"
+                    else f"{json.dumps(name)}: {layout.value(data)}"
+                )
+                for name, data in value.items()
+            ]
+            value_text = (
+                layout.open_object
+                + layout.separator.join(channels)
+                + layout.close_object
+            )
+        else:
+            value_text = layout.value(value)
+        items.append(f"{json.dumps(key)}: {value_text}")
+    if not items:
+        return "{}"
+    return layout.open_object + layout.separator.join(items) + layout.close_object
+
+
+def save_json(file: TextIO, structure: dict[str, Any], indent: str | None = "") -> None:
+    """Writes an exported experiment as JSON, one curve at a time.
+
+    The text is the same as json.dumps(structure, indent=indent) would give with the
+    F and Z data as lists, but only one curve is encoded at a time, so the curves can
+    be produced lazily and memory does not grow with their number.
+
+    Args:
+        file (TextIO): Text stream to write to.
+        structure (dict[str, Any]): The experiment, as for the JSON export. The
+            curves can be any iterable, their F and Z data arrays or lists.
+        indent (str | None): "" as for UI.export_json, or None as json.dump.
+    """
+    layout = _JsonLayout(indent)
+    first = True
+    file.write("{" if not structure else layout.open_object)
+    for key, value in structure.items():
+        if not first:
+            file.write(layout.separator)
+        first = False
+        file.write(f"{json.dumps(key)}: ")
+        if key != "curves":
+            file.write(layout.value(value))
+            continue
+        empty = True
+        for curve in value:
+            file.write(layout.open_array if empty else layout.separator)
+            empty = False
+            file.write(_json_curve(layout, curve))
+        file.write("[]" if empty else layout.close_array)
+    file.write("}" if not structure else layout.close_object)
+
+
+class _JsonReader:
+    """Incremental reader of the JSON export.
+
+    Only the text of the value being parsed is buffered. Arrays of numbers directly
+    under a curve's "data" are parsed straight into float64 arrays, every other value
+    is decoded by json.
+    """
+
+    def __init__(self, file: TextIO | BinaryIO, chunk_size: int):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._bytes = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._position = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """Reads another chunk, dropping the parsed text. False at the end of file."""
+        chunk = ""
+        while not chunk and not self._eof:
+            raw = self._file.read(self._chunk_size)
+            self._eof = len(raw) == 0
+            # bytes may end inside a multi-byte character, decoding to nothing yet
+            if isinstance(raw, bytes):
+                raw = self._bytes.decode(raw, self._eof)
+            chunk = raw
+        self._buffer = self._buffer[self._position :] + chunk
+        self._position = 0
+        return bool(chunk)
+
+    def _peek(self) -> str:
+        """Returns the next character that is not whitespace, without consuming it."""
+        while True:
+            while self._position < len(self._buffer):
+                if not self._buffer[self._position].isspace():
+                    return self._buffer[self._position]
+                self._position += 1
+            if not self._fill():
+                raise ValueError("Unexpected end of the JSON export.")
+
+    def expect(self, characters: str) -> str:
+        """Consumes the next character, which must be one of characters."""
+        character = self._peek()
+        if character not in characters:
+            raise ValueError(
+                f"Expected one of {characters!r} in the JSON export, got {character!r}."
+            )
+        self._position += 1
+        return character
+
+    def value(self) -> Any:
+        """Decodes the next value with json."""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # a number reaching the end of the buffer may continue in the next chunk
+            if (
+                end < len(self._buffer) and self._buffer[end] not in "0123456789.eE+-"
+            ) or not self._fill():
+                self._position = end
+                return value
+
+    def items(self) -> Iterator[str]:
+        """Consumes an object up to each of its keys in turn, the caller consumes the
+        values."""
+        self.expect("{")
+        if self._peek() == "}":
+            self._position += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+    def elements(self) -> Iterator[None]:
+        """Consumes an array up to each of its elements in turn, the caller consumes the
+        elements."""
+        self.expect("[")
+        if self._peek() == "]":
+            self._position += 1
+            return
+        while True:
+            yield
+            if self.expect(",]") == "]":
+                return
+
+    def numbers(self) -> Any:
+        """Parses the next value into a float64 array if it is an array of numbers,
+        otherwise decodes it with json."""
+        if self._peek() != "[":
+            return self.value()
+        while (end := self._buffer.find("]", self._position)) < 0:
+            if not self._fill():
+                raise ValueError("Unexpected end of the JSON export.")
+        text = self._buffer[self._position + 1 : end]
+        if text.strip():
+            try:
+                # parsed in place, NaN and Infinity included; anything else stops the
+                # parse, which numpy only warns about for now
+                with warnings.catch_warnings():
+                    warnings.simplefilter("error", DeprecationWarning)
+                    values = np.fromstring(text, dtype=np.float64, sep=",")
+            except (DeprecationWarning, ValueError):
+                pass
+            else:
+                # a trailing comma ends the parse early without a warning
+                if len(values) == text.count(",") + 1:
+                    self._position = end + 1
+                    return values
+        # empty, nested or holding other values, e.g. null
+        value = self.value()
+        if all(type(item) in (int, float) for item in value):
+            return np.asarray(value, dtype=np.float64)
+        return value
+
+    def curve(self) -> dict[str, Any]:
+        curve = {}
+        for key in self.items():
+            if key != "data" or self._peek() != "{":
+                curve[key] = self.value()
+                continue
+            curve[key] = {name: self.numbers() for name in self.items()}
+        return curve
+
+
+def read_json(
+    file: TextIO | BinaryIO, chunk_size: int = 1 << 20
+) -> tuple[dict[str, Any], Iterator[dict[str, Any]]]:
+    """Reads a JSON export incrementally.
+
+    The entries before "curves", e.g. the experiment and protocol, are read at once.
+    The curves are then parsed one at a time as they are iterated, with their F and Z
+    data as float64 arrays, so the first curves are available before the rest of the
+    file is read. Entries after "curves" are added to the returned dict once the
+    curves are exhausted.
+
+    Args:
+        file (TextIO | BinaryIO): Stream to read from, text or UTF-8 bytes.
+        chunk_size (int): Number of characters or bytes read at a time.
+
+    Returns:
+        tuple[dict[str, Any], Iterator[dict[str, Any]]]: The other entries of the
+            export and an iterator over its curves.
+    """
+    reader = _JsonReader(file, chunk_size)
+    structure: dict[str, Any] = {}
+    keys = reader.items()
+
+    def curves() -> Iterator[dict[str, Any]]:
+        for _ in reader.elements():
+            yield reader.curve()
+        for key in keys:
+            structure[key] = reader.value()
+
+    for key in keys:
+        if key == "curves":
+            return structure, curves()
+        structure[key] = reader.value()
+    return structure, iter(())
+
+
+def load_json(file: TextIO | BinaryIO, chunk_size: int = 1 << 20) -> dict[str, Any]:
+    """Loads a JSON export as json.load does, but with the F and Z data of every curve
+    as float64 arrays, never held as lists of floats. See read_json.
+    """
+    structure, curves = read_json(file, chunk_size)
+    curves = list(curves)
+    structure["curves"] = curves
+    return structure
@@ -1,6 +1,9 @@
 import numpy as np
 from scipy.interpolate import interp1d
-from scipy.signal import savgol_filter
+from scipy.ndimage import convolve1d
+
+from nanodata.nanodata import lookup
+from nanodata.nanodata.savgol import savgol_filter, savgol_kernel
 
 haystack = []
 
@@ -17,10 +20,11 @@ class curve(object):
     def __init__(self, structure=None):
         self.filename = None
         self.active = True
-        self.data = {'F': None, 'Z': None}
+        self.data = {"F": None, "Z": None}
         self.spring_constant = 1.0
-        self.tip = {'geometry': None}
+        self.tip = {"geometry": None}
         self._cp = []
+        self._increasing = {}
         self.reset()
         if structure is not None:
             self.load(structure)
@@ -37,8 +41,14 @@ class curve(object):
         self._Z, self._F = np.array(x), np.array(y)
 
     def getJclose(self, x0, x):
-        x = np.array(x)
-        return np.argmin((x - x0) ** 2)
+        # whether x is sorted is only checked the first time it is looked up, for
+        # the last few arrays, e.g. _Z, _Zi and _Ze
+        key = id(x)
+        if key not in self._increasing or self._increasing[key][0] is not x:
+            if len(self._increasing) >= 4:
+                del self._increasing[next(iter(self._increasing))]
+            self._increasing[key] = (x, lookup.is_increasing(x))
+        return lookup.nearest_index(x, x0, self._increasing[key][1])
 
     def getFizi(self, xmin, xmax):
         jmin = self.getJclose(xmin, self._Zi)
@@ -51,6 +61,7 @@ class curve(object):
         return np.array(self._Ze[jmin:jmax]), np.array(self._E[jmin:jmax])
 
     def resetCP(self):
+        self._increasing = {}
         self._cp = None
         self._Fi = None
         self._Zi = None
@@ -60,8 +71,10 @@ class curve(object):
         self._Eparams = None
 
     def reset(self):
-        self._F = np.array(self.data['F'])
-        self._Z = np.array(self.data['Z'])
+        # no copy when the data is already an array, see curvefile.read_json
+        self._F = np.asarray(self.data["F"])
+        self._Z = np.asarray(self.data["Z"])
+        self._increasing = {}
         self._cp = None
         self._Fi = None
         self._Zi = None
@@ -71,7 +84,7 @@ class curve(object):
         self._Eparams = None
 
     def calc_indentation(self, setzeroforce=True):
-        iContact = np.argmin((self._Z - self._cp[0]) ** 2)
+        iContact = self.getJclose(self._cp[0], self._Z)
         if setzeroforce is True:
             Yf = self._F[iContact:] - self._cp[1]
         else:
@@ -99,13 +112,13 @@ class curve(object):
             yy = y[1:]
             ddt = (x[-1] - x[1]) / (len(x) - 2)
 
-        if self.tip['geometry'] == 'sphere':
-            R = self.tip['radius']
+        if self.tip["geometry"] == "sphere":
+            R = self.tip["radius"]
             area = np.pi * xx * R
             # contactradius = np.sqrt(xx * R)
             coeff = 3 * np.sqrt(np.pi) / 8 / np.sqrt(area)
-        elif self.tip['geometry'] == 'cylinder':
-            R = self.tip['radius']
+        elif self.tip["geometry"] == "cylinder":
+            R = self.tip["radius"]
             coeff = 3 / 8 / R
         else:
             return False
@@ -121,3 +134,77 @@ class curve(object):
 
         self._Ze = np.array(Ex)
         self._E = np.array(Ey)
+
+
+# Elasticity spectra of many curves at once, e.g. all of the haystack, as
+# curve.calc_elspectra with interp=True computes them one by one.
+# Every curve is resampled onto one shared grid of 1 nm steps, so a single
+# Savitzky-Golay derivative kernel is convolved along the whole batch. The points
+# calc_elspectra keeps are at least win - 1 samples away from the ends of a curve,
+# where the convolution is exactly what savgol_filter computes.
+# Returns the grid and a masked (curves, grid) array of E, masked outside the
+# spectrum of each curve and for curves calc_elspectra would not compute. The
+# _Ze and _E of every computed curve are set as well.
+def calc_elspectra_all(win, order, curves=None):
+    if curves is None:
+        curves = haystack
+    curves = list(curves)
+    step = 1.0e-9
+    if win % 2 == 0:
+        win += 1
+    dwin = int(win - 1)
+    rows = [
+        i
+        for i, c in enumerate(curves)
+        if c._Zi is not None
+        and len(c._Zi) >= 1
+        and c.tip["geometry"] in ("sphere", "cylinder")
+    ]
+    if len(rows) == 0:
+        return np.empty(0), np.ma.masked_all((len(curves), 0))
+    x = [np.asarray(curves[i]._Zi, dtype=float) for i in rows]
+    y = [np.asarray(curves[i]._Fi, dtype=float) for i in rows]
+    lo = np.array([max(np.min(xc), 1e-9) for xc in x])
+    hi = np.array([np.max(xc) for xc in x])
+    start = np.min(lo)
+    n = int(np.ceil((np.max(hi) - start) / step))
+    xx = start + np.arange(n) * step
+    # first and last + 1 grid index of every curve, as np.arange(lo, hi, step)
+    first = np.ceil((lo - start) / step).astype(int)
+    last = np.ceil((hi - start) / step).astype(int)
+
+    # one np.interp for all curves: in grid units, every curve sorted and shifted
+    # past the previous one
+    curve = np.repeat(np.arange(len(rows)), [len(xc) for xc in x])
+    u = (np.concatenate(x) - start) / step
+    shift = np.ceil(np.max(u) - min(np.min(u), 0)) + 2
+    by_curve = np.lexsort((u, curve))
+    grid = np.arange(n)
+    inside = (grid >= first[:, None]) & (grid < last[:, None])
+    yy = np.zeros((len(rows), n))
+    yy[inside] = np.interp(
+        (grid + np.arange(len(rows))[:, None] * shift)[inside],
+        (u + curve * shift)[by_curve],
+        np.concatenate(y)[by_curve],
+    )
+
+    kernel = savgol_kernel(win, order, 1, step)
+    deriv = convolve1d(yy, kernel, axis=1, mode="constant")
+    # the sphere coefficient is the same along the grid for every curve, up to
+    # 1 / sqrt(R)
+    R = np.array([curves[i].tip["radius"] for i in rows], dtype=float)
+    sphere = np.array([curves[i].tip["geometry"] == "sphere" for i in rows])
+    deriv *= np.where(sphere, 1 / np.sqrt(R), 3 / 8 / R)[:, None]
+    deriv[sphere] *= 3 * np.sqrt(np.pi) / 8 / np.sqrt(np.pi * xx)
+    # curves with no more samples than the window are not computed
+    computed = last - first > win
+    begin = first + dwin
+    end = np.where(computed, last - dwin, begin)
+    valid = (grid >= begin[:, None]) & (grid < end[:, None])
+    E = np.ma.masked_all((len(curves), n))
+    E[rows] = np.ma.masked_array(deriv, mask=~valid)
+    for j, i in enumerate(rows):
+        if computed[j]:
+            curves[i]._Ze = xx[begin[j] : end[j]]
+            curves[i]._E = E.data[i, begin[j] : end[j]].copy()
+    return xx, E
@@ -1,3 +1,3 @@
 from .nanodata import ChiaroDataManager
-from .filter import filters
-from .interfaces import TDataSet
\ No newline at end of file
+from .filter import filters, apply_filters
+from .interfaces import TDataSet
@@ -1,18 +1,64 @@
+import collections
+import concurrent.futures
+import functools
 import os
+import posixpath
+import zipfile
 import numpy as np
-from typing import Iterable, Any, Iterator
+from typing import Any, BinaryIO, Callable, Generic, Iterable, Iterator
 
 from . import interfaces
 from . import errors
 
+# Rows of the (channels, samples) store shared by a data set and its segments
+CHANNELS = ("time", "force", "deflection", "z", "indentation")
+CHANNEL_INDEX = {name: index for index, name in enumerate(CHANNELS)}
+
+# Leading fraction of a segment summarised as its out of contact baseline
+BASELINE_FRACTION = 1 / 20
+
+# Number of leading bytes of a file given to DataSetType.has_valid_signature
+SIGNATURE_SIZE = 64
+
 
 class DataManager(
     interfaces.IDataManager[interfaces.TDataSet, interfaces.TDataSetType],
 ):
-    def __init__(self, path: str):
+    """Base data manager.
+
+    Args:
+        path (str): Path to the directory containing the data sets.
+        max_loaded (int | None): Maximum number of data sets kept loaded. Beyond it,
+            the least recently used data set is unloaded, and loaded again on its
+            next access. None keeps every data set loaded.
+        memory_budget (int | None): Maximum number of array bytes kept loaded, unloading
+            data sets the same way. The most recently used data set is always kept.
+            None disables the budget.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_loaded: int | None = None,
+        memory_budget: int | None = None,
+    ):
         self._path = path
         self._data_sets: dict[str, interfaces.TDataSet] = {}
-        self._file_types: list[interfaces.TDataSetType] = []
+        self._file_types: DataSetTypeRegistry[interfaces.TDataSetType] = (
+            DataSetTypeRegistry()
+        )
+        self._max_loaded = max_loaded
+        self._memory_budget = memory_budget
+        # array bytes of the loaded data sets by name, least recently used first
+        self._recently_used: collections.OrderedDict[str, int] = (
+            collections.OrderedDict()
+        )
+        self._resident_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        # archives the registered members are read from, see load_archive
+        self._archives: list[zipfile.ZipFile] = []
 
     def _add_data_set(self, data_set: interfaces.TDataSet) -> None:
         if data_set.name in self._data_sets:
@@ -20,50 +66,219 @@ class DataManager(
                 f"Data set with name '{data_set.name}' already exists. Using existing data set."
             )
         self._data_sets[data_set.name] = data_set
+        data_set._on_access = self._touch
+        if data_set.is_loaded:
+            self._touch(data_set)
 
     def _remove_data_set(self, name: str) -> None:
         if name in self._data_sets:
             del self._data_sets[name]
+            self._resident_bytes -= self._recently_used.pop(name, 0)
         else:
             raise errors.DataSetNotFoundError(f"Data set with name '{name}' not found.")
 
     def register_file_type(self, file_type: interfaces.TDataSetType) -> None:
-        if file_type not in self._file_types:
-            self._file_types.append(file_type)
-        else:
-            raise errors.DataSetTypeExistsError(
-                f"Data set type '{file_type}' already exists."
+        self._file_types.register(file_type)
+
+    def _touch(self, data_set: interfaces.TDataSet) -> None:
+        """Marks a loaded data set as the most recently used one and unloads the least
+        recently used ones beyond max_loaded or memory_budget, except modified ones."""
+        if data_set.name in self._recently_used:
+            self._hits += 1
+            self._recently_used.move_to_end(data_set.name)
+            return
+        # the size is taken once per load, as computing it walks the segments
+        self._misses += 1
+        self._recently_used[data_set.name] = data_set.nbytes
+        self._resident_bytes += self._recently_used[data_set.name]
+        # the data set just touched is kept, and so are the modified ones, whose
+        # edits would be lost by a reload from their source
+        for name in list(self._recently_used)[:-1]:
+            if not self._over_limits():
+                break
+            if self._data_sets[name]._modified:
+                continue
+            self._resident_bytes -= self._recently_used.pop(name)
+            self._evictions += 1
+            self._data_sets[name].unload()
+
+    def _over_limits(self) -> bool:
+        return (
+            self._max_loaded is not None and len(self._recently_used) > self._max_loaded
+        ) or (
+            self._memory_budget is not None
+            and self._resident_bytes > self._memory_budget
+        )
+
+    def load(self, workers: int | None = 1, lazy: bool = False) -> None:
+        """Loads every valid file found under the path of the manager.
+
+        Args:
+            workers (int | None): Number of processes used to load the files.
+                1 loads them one after another in this process, None uses one
+                process per CPU. Data sets are registered in the same order either way.
+            lazy (bool): Only read the headers, see scan. workers is then ignored.
+        """
+        file_paths = self._file_paths()
+        if workers == 1 or lazy:
+            for file_path in file_paths:
+                self.load_file(file_path, lazy)
+            return
+
+        data_sets: list[interfaces.TDataSet] = []
+        names: set[str] = set()
+        for file_path in file_paths:
+            data_set = self._create_data_set(file_path)
+            if data_set is not None and data_set.name not in names:
+                names.add(data_set.name)
+                data_sets.append(data_set)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            for data_set in executor.map(_load_data_set, data_sets):
+                self._add_data_set(data_set)
+
+    def scan(self) -> None:
+        """Registers every valid file found under the path of the manager, reading
+        only its header. The rest of each data set is loaded on first access."""
+        self.load(lazy=True)
+
+    def load_file(self, file_path: str, lazy: bool = False) -> None:
+        """Loads a file if it is valid for a registered type.
+
+        The file is opened once, the type is detected from its first bytes and the
+        same file is then handed to the data set to load.
+
+        Args:
+            file_path (str): Path to the file.
+            lazy (bool): Only read the header of the file, see scan.
+        """
+        name = self._data_set_name(file_path)
+        if name in self._data_sets or not self._file_types.has_extension(file_path):
+            return
+        with open(file_path, "rb") as file:
+            file_type = self._file_types.detect(file_path, file.read(SIGNATURE_SIZE))
+            if file_type is None:
+                return
+            data_set = file_type.create_data_set(name, file_path)
+            file.seek(0)
+            if lazy:
+                data_set.load_header(file)
+            else:
+                data_set.load(file)
+        self._add_data_set(data_set)
+
+    def load_archive(self, archive: str | BinaryIO, lazy: bool = False) -> None:
+        """Loads every valid member of a zip archive without extracting it.
+
+        Members are read through streams of the archive, which is kept open so that
+        lazy or unloaded data sets can read their member again. An archive none of
+        whose members is registered, e.g. one that was already loaded, is closed.
+
+        Args:
+            archive (str | BinaryIO): Path to the archive, or the archive opened in
+                binary mode, e.g. an uploaded file.
+            lazy (bool): Only read the header of each member, see scan.
+        """
+        zip_file = zipfile.ZipFile(archive, "r")
+        registered = 0
+        archive_name = (
+            archive
+            if isinstance(archive, str)
+            else getattr(archive, "name", "archive.zip")
+        )
+        for info in zip_file.infolist():
+            if info.is_dir():
+                continue
+            name, _ = posixpath.splitext(posixpath.basename(info.filename))
+            if name in self._data_sets or not self._file_types.has_extension(
+                info.filename
+            ):
+                continue
+            with zip_file.open(info) as file:
+                file_type = self._file_types.detect(
+                    info.filename, file.read(SIGNATURE_SIZE)
+                )
+            if file_type is None:
+                continue
+            data_set = file_type.create_data_set(
+                name, os.path.join(archive_name, *info.filename.split("/"))
             )
+            data_set._opener = functools.partial(zip_file.open, info)
+            with data_set._open() as file:
+                if lazy:
+                    data_set.load_header(file)
+                else:
+                    data_set.load(file)
+            self._add_data_set(data_set)
+            registered += 1
+        if registered:
+            self._archives.append(zip_file)
+        else:
+            zip_file.close()
 
-    def load(self) -> None:
+    def _file_paths(self) -> list[str]:
         if not os.path.exists(self.path):
             raise FileNotFoundError(f"Path '{self.path}' does not exist.")
-        for directory in os.walk(self.path):
-            file_names = directory[2]
-            for file_name in file_names:
-                file_path = os.path.join(directory[0], file_name)
-                self.load_file(file_path)
+        return [
+            os.path.join(directory, file_name)
+            for directory, _, file_names in os.walk(self.path)
+            for file_name in file_names
+        ]
+
+    def _create_data_set(self, file_path: str) -> interfaces.TDataSet | None:
+        """Creates an unloaded data set for a file, if its type is registered.
+
+        Returns:
+            TDataSet | None: The data set, or None if the file is not valid or a
+                data set with the same name is already registered.
+        """
+        name = self._data_set_name(file_path)
+        if name in self._data_sets or not self._file_types.has_extension(file_path):
+            return None
+        with open(file_path, "rb") as file:
+            file_type = self._file_types.detect(file_path, file.read(SIGNATURE_SIZE))
+        if file_type is None:
+            return None
+        return file_type.create_data_set(name, file_path)
 
-    def load_file(self, file_path: str) -> None:
+    @staticmethod
+    def _data_set_name(file_path: str) -> str:
         file_name, _ = os.path.splitext(file_path)
-        file_name = file_name.split(os.sep)[-1]
-        for file_type in self._file_types:
-            if file_type.is_valid(file_path):
-                if file_name in self._data_sets.keys():
-                    continue
-                data_set = file_type.create_data_set(file_name, file_path)
-                data_set.load()
-                self._add_data_set(data_set)
-                break
+        return file_name.split(os.sep)[-1]
 
     def load_data_set(self, name: str) -> None:
         if name in self._data_sets:
             self._data_sets[name].load()
+            self._touch(self._data_sets[name])
         else:
             raise errors.DataSetNotFoundError(f"Data set with name '{name}' not found.")
 
     def clear(self) -> None:
         self._data_sets.clear()
+        self._recently_used.clear()
+        self._resident_bytes = 0
+        for zip_file in self._archives:
+            zip_file.close()
+        self._archives.clear()
+
+    @property
+    def resident_bytes(self) -> int:
+        """int: Returns the array bytes of the loaded data sets, as of their loading."""
+        return self._resident_bytes
+
+    @property
+    def hits(self) -> int:
+        """int: Returns the number of accesses to data sets that were already loaded."""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """int: Returns the number of times a data set had to be loaded."""
+        return self._misses
+
+    @property
+    def evictions(self) -> int:
+        """int: Returns the number of times a data set was unloaded to stay in bounds."""
+        return self._evictions
 
     @property
     def values(self) -> Iterable[interfaces.TDataSet]:
@@ -106,15 +321,137 @@ class DataManager(
         return f"{self.__name__}(path={self.path!r}, data_sets={len(self)!r}, file_types={self._file_types!r})"
 
 
+def _load_data_set(data_set: interfaces.TDataSet) -> interfaces.TDataSet:
+    """Loads a data set in a worker process and sends it back to the manager."""
+    data_set.load()
+    return data_set
+
+
 class DataSet(interfaces.IDataSet):
     def __init__(self, name: str, path: str):
         self._name: str = name
         self._path: str = path
         self._segments: list[Segment] = []
+        self._store: np.ndarray | None = None
+        self._combined: dict[str, np.ndarray] = {}
+        self._statistics: DataSetStatistics | None = None
+        # whether the segments were changed since they were loaded from the source
+        self._modified: bool = False
+        self._loaded: bool = False
+        # whether the data set was read from its source, so that it can be loaded
+        # on access after load_header or unload. Data sets built in memory are not
+        self._from_source: bool = False
+        # set by the manager holding the data set, see DataManager._touch
+        self._on_access: Callable[["DataSet"], None] | None = None
+        # set by the manager for data sets that are not plain files, see _open
+        self._opener: Callable[[], BinaryIO] | None = None
+
+    def load(self, file: BinaryIO | None = None) -> None:
+        pass
 
-    def load(self) -> None:
+    def _open(self) -> BinaryIO:
+        """Opens the source of the data set in binary mode, either its file or the
+        stream given by the manager, e.g. a member of a zip archive."""
+        if self._opener is not None:
+            return self._opener()
+        if not os.path.exists(self._path):
+            raise FileNotFoundError(f"File '{self._path}' does not exist.")
+        return open(self._path, "rb")
+
+    def unload(self) -> None:
+        """Frees the segments of the data set, keeping its header and statistics,
+        unless the segments were changed since loading. The data set is loaded again
+        on its next access."""
+        self._segments = []
+        self._store = None
+        self._clear_combined()
+        if self._modified:
+            self._statistics = None
+            self._modified = False
+        self._loaded = False
+
+    def load_header(self, file: BinaryIO | None = None) -> None:
+        """Loads only the metadata of the data set, for formats that have any."""
         pass
 
+    def _ensure_loaded(self) -> None:
+        """Loads the data set if only its header has been read so far."""
+        if not self._loaded and self._from_source:
+            self.load()
+        if self._on_access is not None:
+            self._on_access(self)
+
+    def _loaded_from_source(self, statistics: "DataSetStatistics | None") -> None:
+        """Marks the segments as loaded from the source, with the statistics kept
+        from before, see unload."""
+        self._statistics = statistics
+        self._modified = False
+        self._loaded = True
+        self._from_source = True
+
+    def add_segment(self, segment: "Segment") -> None:
+        """Adds a segment to the data set.
+
+        Args:
+            segment (Segment): The segment to add.
+        """
+        if segment not in self._segments:
+            self._segments.append(segment)
+            segment._parent = self
+            self._segments_changed()
+            self._loaded = True
+        else:
+            raise ValueError("Segment already exists.")
+
+    def _get_combined(self, name: str) -> np.ndarray:
+        """Returns a channel of all the segments combined, computed once and cached.
+
+        If the segments are consecutive views of the store, the result is a view of
+        the store instead of a copy. The result is read only as it is shared.
+
+        Args:
+            name (str): Name of the channel, one of CHANNELS.
+
+        Returns:
+            np.ndarray: The combined channel.
+        """
+        self._ensure_loaded()
+        if name not in self._combined:
+            segments = self._segments
+            if (
+                self._store is not None
+                and segments
+                and all(
+                    segment._is_store_view(name, self._store) for segment in segments
+                )
+                and all(
+                    previous.stop == segment.start
+                    for previous, segment in zip(segments[:-1], segments[1:])
+                )
+            ):
+                combined = self._store[
+                    CHANNEL_INDEX[name], segments[0].start : segments[-1].stop
+                ]
+            else:
+                combined = np.concatenate([segment[name] for segment in segments])
+            combined.flags.writeable = False
+            self._combined[name] = combined
+        return self._combined[name]
+
+    def _clear_combined(self, name: str | None = None) -> None:
+        """Drops the cached combined channel, or all of them if name is None."""
+        if name is None:
+            self._combined.clear()
+        else:
+            self._combined.pop(name, None)
+
+    def _segments_changed(self, name: str | None = None) -> None:
+        """Drops what is computed from the segments after a change to the channel, or
+        to the segments themselves if name is None."""
+        self._clear_combined(name)
+        self._statistics = None
+        self._modified = True
+
     @staticmethod
     def _get_fraction(data: np.ndarray, percent: float) -> np.ndarray:
         """Returns a fraction of the data.
@@ -139,47 +476,243 @@ class DataSet(interfaces.IDataSet):
     @property
     def time(self) -> np.ndarray:
         """np.ndarray: Returns the combined time data of all the segments."""
-        return np.concatenate([segment.time for segment in self._segments])
+        return self._get_combined("time")
 
     @property
     def force(self) -> np.ndarray:
         """np.ndarray: Returns the combined force data of all the segments"""
-        return np.concatenate([segment.force for segment in self._segments])
+        return self._get_combined("force")
 
     @property
     def deflection(self) -> np.ndarray:
         """np.ndarray: Returns the combined deflection data of all the segments"""
-        return np.concatenate([segment.deflection for segment in self._segments])
+        return self._get_combined("deflection")
 
     @property
     def z(self) -> np.ndarray:
         """np.ndarray: Returns the combined z data of all the segments"""
-        return np.concatenate([segment.z for segment in self._segments])
+        return self._get_combined("z")
 
     @property
     def indentation(self) -> np.ndarray:
         """np.ndarray: Returns the combined indentation data of all the segments"""
-        return np.concatenate([segment.indentation for segment in self._segments])
+        return self._get_combined("indentation")
 
     @property
     def segments(self) -> list["Segment"]:
         """list[Segment]: Returns the segments of the data set."""
+        self._ensure_loaded()
         return self._segments
 
+    @property
+    def is_loaded(self) -> bool:
+        """bool: Returns whether the segments of the data set are in memory."""
+        return self._loaded
+
+    @property
+    def nbytes(self) -> int:
+        """int: Returns the bytes held by the store and the segments of the data set."""
+        nbytes = self._store.nbytes if self._store is not None else 0
+        return nbytes + sum(segment.nbytes for segment in self._segments)
+
+    @property
+    def store(self) -> np.ndarray | None:
+        """np.ndarray | None: Returns the (channels, samples) array backing the segments."""
+        self._ensure_loaded()
+        return self._store
+
+    @property
+    def statistics(self) -> "DataSetStatistics":
+        """DataSetStatistics: Returns the statistics of the segments, computed once."""
+        if self._statistics is None:
+            self._statistics = DataSetStatistics(self.segments)
+        return self._statistics
+
     def __getitem__(self, index: int) -> "Segment":
-        return self._segments[index]
+        return self.segments[index]
 
     def __repr__(self) -> str:
         return f"DataSet(name={self.name!r}, path={self.path!r})"
 
 
+class DataSetStatistics:
+    """Summary statistics of every channel of every segment of a data set.
+
+    Each statistic is an array indexed [segment, channel], with channels in the
+    order of CHANNELS. Empty channels have a min of inf, a max of -inf, a mean of
+    nan and an argmax of -1. The baseline statistics cover the first
+    BASELINE_FRACTION of each segment, where the tip is not yet in contact.
+
+    Args:
+        segments (list[Segment]): The segments to summarise.
+    """
+
+    def __init__(self, segments: list["Segment"]):
+        shape = (len(segments), len(CHANNELS))
+        self.length = np.zeros(shape, dtype=int)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+        self.mean = np.full(shape, np.nan)
+        self.argmax = np.full(shape, -1, dtype=int)
+        self.baseline_mean = np.full(shape, np.nan)
+        self.baseline_std = np.full(shape, np.nan)
+
+        for index, segment in enumerate(segments):
+            block = segment._get_store_block()
+            if block is not None:
+                self._summarise(index, slice(None), block)
+            else:
+                for channel, channel_index in CHANNEL_INDEX.items():
+                    values = np.asarray(segment[channel])
+                    self._summarise(
+                        index,
+                        slice(channel_index, channel_index + 1),
+                        values[np.newaxis, :],
+                    )
+
+    def _summarise(self, index: int, channels: slice, block: np.ndarray) -> None:
+        length = block.shape[1]
+        self.length[index, channels] = length
+        if length == 0:
+            return
+        baseline = block[:, : max(int(length * BASELINE_FRACTION), 1)]
+        self.min[index, channels] = block.min(axis=1)
+        self.max[index, channels] = block.max(axis=1)
+        self.mean[index, channels] = block.mean(axis=1)
+        self.argmax[index, channels] = block.argmax(axis=1)
+        self.baseline_mean[index, channels] = baseline.mean(axis=1)
+        self.baseline_std[index, channels] = baseline.std(axis=1)
+
+    def channel_min(self, channel: str) -> float:
+        """Returns the minimum of a channel over all the segments."""
+        return np.min(self.min[:, CHANNEL_INDEX[channel]])
+
+    def channel_max(self, channel: str) -> float:
+        """Returns the maximum of a channel over all the segments."""
+        return np.max(self.max[:, CHANNEL_INDEX[channel]])
+
+    def channel_mean(self, channel: str) -> float:
+        """Returns the mean of a channel over all the segments."""
+        lengths = self.length[:, CHANNEL_INDEX[channel]]
+        means = np.nan_to_num(self.mean[:, CHANNEL_INDEX[channel]])
+        return np.sum(means * lengths) / np.sum(lengths)
+
+    def channel_argmax(self, channel: str) -> int:
+        """Returns the index of the maximum of a channel in the combined channel."""
+        column = CHANNEL_INDEX[channel]
+        segment = int(np.argmax(self.max[:, column]))
+        return int(np.sum(self.length[:segment, column]) + self.argmax[segment, column])
+
+    def __len__(self) -> int:
+        return len(self.length)
+
+    def __repr__(self) -> str:
+        return f"DataSetStatistics(segments={len(self)!r})"
+
+
+class DataSetTypeRegistry(Generic[interfaces.TDataSetType]):
+    """Registered data set types, indexed by extension and signature.
+
+    A file is matched by looking up its extension together with the prefixes of its
+    first bytes, one per distinct signature length, longest first. Types of that
+    extension without signatures are then asked in registration order through
+    has_valid_signature. Detection thus costs one lookup per signature length, not
+    one check per registered type.
+    """
+
+    def __init__(self):
+        self._types: list[interfaces.TDataSetType] = []
+        self._by_signature: dict[tuple[str, bytes], interfaces.TDataSetType] = {}
+        self._signature_sizes: list[int] = []
+        self._unsigned: dict[str, list[interfaces.TDataSetType]] = {}
+        self._extensions: set[str] = set()
+
+    def register(self, file_type: interfaces.TDataSetType) -> None:
+        """Registers a data set type.
+
+        Args:
+            file_type (TDataSetType): The type to register.
+
+        Raises:
+            DataSetTypeExistsError: If the type is already registered.
+        """
+        if file_type in self._types:
+            raise errors.DataSetTypeExistsError(
+                f"Data set type '{file_type}' already exists."
+            )
+        self._types.append(file_type)
+        for extension in file_type.extensions:
+            self._extensions.add(extension)
+            if not file_type.signatures:
+                self._unsigned.setdefault(extension, []).append(file_type)
+            for signature in file_type.signatures:
+                # the first type registered for a signature keeps it
+                self._by_signature.setdefault((extension, signature), file_type)
+        self._signature_sizes = sorted(
+            {len(signature) for _, signature in self._by_signature}, reverse=True
+        )
+
+    def has_extension(self, path: str) -> bool:
+        """Returns whether any registered type has the extension of a file."""
+        _, extension = os.path.splitext(path)
+        return extension in self._extensions
+
+    def detect(self, path: str, head: bytes) -> interfaces.TDataSetType | None:
+        """Returns the type of a file.
+
+        Args:
+            path (str): Path to the file, only its extension is used.
+            head (bytes): The first bytes of the file, at most SIGNATURE_SIZE.
+
+        Returns:
+            TDataSetType | None: The type, or None if no registered type matches.
+        """
+        _, extension = os.path.splitext(path)
+        for size in self._signature_sizes:
+            file_type = self._by_signature.get((extension, head[:size]))
+            if file_type is not None:
+                return file_type
+        for file_type in self._unsigned.get(extension, []):
+            if file_type.has_valid_signature(head):
+                return file_type
+        return None
+
+    def __contains__(self, file_type: interfaces.TDataSetType) -> bool:
+        return file_type in self._types
+
+    def __len__(self) -> int:
+        return len(self._types)
+
+    def __iter__(self) -> Iterator[interfaces.TDataSetType]:
+        return iter(self._types)
+
+    def __repr__(self) -> str:
+        return repr(self._types)
+
+
 class DataSetType(interfaces.IDataSetType):
+    """Base data set type.
+
+    Args:
+        name (str): Name of the type.
+        extensions (list[str]): File extensions of the type, with the dot.
+        data_type (type[TDataSet]): Data set class created for valid files.
+        signatures (list[bytes] | None): Prefixes the files of the type start with,
+            see DataSetTypeRegistry. Without any, has_valid_signature must be
+            overridden.
+    """
+
     def __init__(
-        self, name: str, extensions: list[str], data_type: type[interfaces.TDataSet]
+        self,
+        name: str,
+        extensions: list[str],
+        data_type: type[interfaces.TDataSet],
+        signatures: list[bytes] | None = None,
     ):
         self._name: str = name
         self._extensions: list[str] = extensions
         self._data_type: type[interfaces.TDataSet] = data_type
+        self._signatures: list[bytes] = signatures if signatures is not None else []
 
     def create_data_set(self, name: str, path: str) -> interfaces.TDataSet:
         return self._data_type(name, path)
@@ -188,8 +721,16 @@ class DataSetType(interfaces.IDataSetType):
         _, file_extension = os.path.splitext(path)
         return file_extension in self._extensions
 
+    def has_valid_signature(self, head: bytes) -> bool:
+        """Returns whether the first bytes of a file, at most SIGNATURE_SIZE, belong to
+        this type."""
+        if not self._signatures:
+            raise NotImplementedError()
+        return head.startswith(tuple(self._signatures))
+
     def has_valid_header(self, path: str) -> bool:
-        raise NotImplementedError()
+        with open(path, "rb") as file:
+            return self.has_valid_signature(file.read(SIGNATURE_SIZE))
 
     def is_valid(self, path: str) -> bool:
         return self.has_valid_extension(path) and self.has_valid_header(path)
@@ -198,6 +739,10 @@ class DataSetType(interfaces.IDataSetType):
     def extensions(self) -> Iterable[str]:
         return self._extensions
 
+    @property
+    def signatures(self) -> list[bytes]:
+        return self._signatures
+
     @property
     def name(self) -> str:
         return self._name
@@ -207,59 +752,148 @@ class DataSetType(interfaces.IDataSetType):
 
 
 class Segment(interfaces.ISegment):
-    def __init__(self, data: dict[str, Any]):
-        self._data: dict[str, Any] = data
+    """A segment of a data set.
+
+    Channels are read from a slice of the (channels, samples) store of the data set,
+    so a segment holds no arrays of its own. Channels given in the data dict, or set
+    later, take precedence over the store.
+
+    Args:
+        data (dict[str, Any] | None): Channels and other values owned by the segment.
+        store (np.ndarray | None): Array of the data set, one row per entry of CHANNELS.
+        start (int): First sample of the segment in the store.
+        stop (int | None): Sample after the last one of the segment in the store.
+    """
+
+    __slots__ = ("_data", "_store", "_start", "_stop", "_parent")
+
+    def __init__(
+        self,
+        data: dict[str, Any] | None = None,
+        store: np.ndarray | None = None,
+        start: int = 0,
+        stop: int | None = None,
+    ):
+        self._data: dict[str, Any] = data if data is not None else {}
+        self._store: np.ndarray | None = store
+        self._start: int = start
+        self._stop: int = stop if stop is not None or store is None else store.shape[1]
+        self._parent: DataSet | None = None
+
+    def _get_channel(self, name: str) -> np.ndarray:
+        if name in self._data:
+            return self._data[name]
+        if self._store is not None and name in CHANNEL_INDEX:
+            return self._store[CHANNEL_INDEX[name], self._start : self._stop]
+        return np.array([])
+
+    def _set_channel(self, name: str, value: np.ndarray) -> None:
+        self._data[name] = value
+        if self._parent is not None:
+            self._parent._segments_changed(name)
+
+    def _set_result(self, slot: str, value: Any) -> None:
+        """Stores the result of an analysis, which keeps the parent from being
+        unloaded as its source does not hold it, see DataManager._touch."""
+        setattr(self, slot, value)
+        if self._parent is not None:
+            self._parent._modified = True
+
+    def _is_store_view(self, name: str, store: np.ndarray) -> bool:
+        return self._store is store and name not in self._data
+
+    def _get_store_block(self) -> np.ndarray | None:
+        """Returns all channels as one slice of the store, if none are overridden."""
+        if self._store is None or any(name in self._data for name in CHANNELS):
+            return None
+        return self._store[:, self._start : self._stop]
 
     @property
     def time(self) -> np.ndarray:
         """np.ndarray: Returns the time data of the data set."""
-        return self._data.get("time", np.array([]))
+        return self._get_channel("time")
 
     @time.setter
     def time(self, value: np.ndarray):
-        self._data["time"] = value
+        self._set_channel("time", value)
 
     @property
     def force(self) -> np.ndarray:
         """np.ndarray: Returns the force data of the data set."""
-        return self._data.get("force", np.array([]))
+        return self._get_channel("force")
 
     @force.setter
     def force(self, value: np.ndarray):
-        self._data["force"] = value
+        self._set_channel("force", value)
 
     @property
     def deflection(self) -> np.ndarray:
         """np.ndarray: Returns the deflection data of the data set."""
-        return self._data.get("deflection", np.array([]))
+        return self._get_channel("deflection")
 
     @deflection.setter
     def deflection(self, value: np.ndarray):
-        self._data["deflection"] = value
+        self._set_channel("deflection", value)
 
     @property
     def z(self) -> np.ndarray:
         """np.ndarray: Returns the z data of the data set."""
-        return self._data.get("z", np.array([]))
+        return self._get_channel("z")
 
     @z.setter
     def z(self, value: np.ndarray):
-        self._data["z"] = value
+        self._set_channel("z", value)
 
     @property
     def indentation(self) -> np.ndarray:
         """np.ndarray: Returns the indentation data of the data set."""
-        return self._data.get("indentation", np.array([]))
+        return self._get_channel("indentation")
 
     @indentation.setter
     def indentation(self, value: np.ndarray):
-        self._data["indentation"] = value
+        self._set_channel("indentation", value)
 
     @property
     def data(self) -> dict[str, Any]:
-        return self._data
+        """dict[str, Any]: Returns the channels of the segment and any other values."""
+        if self._store is None:
+            return self._data
+        data = {name: self._get_channel(name) for name in CHANNELS}
+        data.update(self._data)
+        return data
+
+    @property
+    def nbytes(self) -> int:
+        """int: Returns the bytes of the arrays owned by the segment, the store excluded."""
+        return sum(
+            value.nbytes
+            for value in self._data.values()
+            if isinstance(value, np.ndarray)
+        )
+
+    @property
+    def parent(self) -> "DataSet | None":
+        """DataSet | None: Returns the data set the segment was added to."""
+        return self._parent
+
+    @property
+    def store(self) -> np.ndarray | None:
+        """np.ndarray | None: Returns the store of the data set the segment views."""
+        return self._store
+
+    @property
+    def start(self) -> int:
+        """int: Returns the first sample of the segment in the store."""
+        return self._start
+
+    @property
+    def stop(self) -> int:
+        """int: Returns the sample after the last one of the segment in the store."""
+        return self._stop
 
     def __getitem__(self, key: str) -> Any:
+        if key in CHANNEL_INDEX:
+            return self._get_channel(key)
         return self._data.get(key, None)
 
     def __repr__(self) -> str:
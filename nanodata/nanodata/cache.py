@@ -0,0 +1,138 @@
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import numpy as np
+
+from typing import IO, Any, BinaryIO, Iterator
+
+# Bump whenever parsing or segmentation changes, so stale entries are not reused.
+PARSER_VERSION = 3
+
+
+@contextlib.contextmanager
+def replace_on_close(path: str, mode: str) -> Iterator[IO]:
+    """Opens a new temporary file next to path, moved to path once it is written.
+
+    The temporary name is unique, so processes writing the same entry at once, e.g.
+    DataManager.load with several workers, never write to the same file.
+    """
+    file = tempfile.NamedTemporaryFile(
+        mode, dir=os.path.dirname(path), suffix=".tmp", delete=False
+    )
+    try:
+        with file:
+            yield file
+        os.replace(file.name, path)
+    except BaseException:
+        os.unlink(file.name)
+        raise
+
+
+class DataSetCache:
+    """On-disk cache of parsed data sets.
+
+    Each entry is keyed by the content hash of the source file and PARSER_VERSION.
+    It is stored as two files: a .npy array holding the (channels, samples) store of
+    the data set and a .json file holding the header and segment boundaries.
+    Cached stores are memory-mapped copy-on-write, so reloading a known file reads
+    only the pages that are used.
+
+    Args:
+        directory (str): Directory where the entries are stored. Created if missing.
+    """
+
+    def __init__(self, directory: str):
+        self._directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, path: str) -> str:
+        """Returns the cache key of a file.
+
+        Args:
+            path (str): Path to the source file.
+
+        Returns:
+            str: Hash of the file contents combined with the parser version.
+        """
+        with open(path, "rb") as file:
+            return self.key_of(file)
+
+    def key_of(self, file: BinaryIO) -> str:
+        """Returns the cache key of an open file, read from its current position to
+        its end.
+
+        Args:
+            file (BinaryIO): The file, opened in binary mode.
+
+        Returns:
+            str: Hash of the file contents combined with the parser version.
+        """
+        digest = hashlib.sha1()
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+        return f"{digest.hexdigest()}-v{PARSER_VERSION}"
+
+    def get(self, key: str) -> tuple[dict[str, Any], np.ndarray, np.ndarray] | None:
+        """Returns a cached entry.
+
+        Args:
+            key (str): Key returned by key().
+
+        Returns:
+            tuple | None: The header, the store and the (start, stop) sample of every
+                segment, or None if there is no usable entry.
+        """
+        meta_path, array_path = self._paths(key)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, "r") as file:
+                meta = json.load(file)
+            store = np.load(array_path, mmap_mode="c")
+        except (OSError, ValueError):
+            return None
+        header = meta["header"]
+        if "protocol" in header:
+            header["protocol"] = np.array(header["protocol"], dtype=float).reshape(
+                -1, 2
+            )
+        return header, store, np.array(meta["bounds"], dtype=int).reshape(-1, 2)
+
+    def put(
+        self,
+        key: str,
+        header: dict[str, Any],
+        store: np.ndarray,
+        bounds: np.ndarray,
+    ) -> None:
+        """Stores an entry.
+
+        Args:
+            key (str): Key returned by key().
+            header (dict[str, Any]): Parsed header, arrays are stored as lists.
+            store (np.ndarray): The (channels, samples) store of the data set.
+            bounds (np.ndarray): The (start, stop) sample of every segment.
+        """
+        meta_path, array_path = self._paths(key)
+        header = {
+            name: value.tolist() if isinstance(value, np.ndarray) else value
+            for name, value in header.items()
+        }
+        # write the metadata last, an entry only counts once it exists
+        with replace_on_close(array_path, "wb") as file:
+            np.save(file, np.ascontiguousarray(store))
+        with replace_on_close(meta_path, "w") as file:
+            json.dump({"header": header, "bounds": np.asarray(bounds).tolist()}, file)
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        base = os.path.join(self._directory, key)
+        return base + ".json", base + ".npy"
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    def __repr__(self) -> str:
+        return f"DataSetCache(directory={self.directory!r})"
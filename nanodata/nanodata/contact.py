@@ -0,0 +1,300 @@
+import numpy as np
+
+from typing import Sequence
+from scipy.optimize import curve_fit
+
+# Batch contact point detection for many force curves at once.
+#
+# The out of contact region of a curve is found from the histogram of its force:
+# the baseline forms a peak, fitted with a Gaussian, and the force at which the fit
+# drops below a fraction of its height bounds the baseline. The last point before
+# contact is then where the force last falls below a line fitted to the baseline.
+#
+# Curves are padded into one (curves, samples) array, so every step runs on all the
+# curves together. The Gaussian is fitted in closed form, as a weighted parabola
+# through the logarithm of the counts around the highest bin. Curves for which that
+# fit is not a peak, or that have no baseline below it, fall back to the scipy fits
+# of the per curve implementation.
+
+
+def gauss(x, x0, a0, s0):
+    return a0 * np.exp(-(((x - x0) / s0) ** 2))
+
+
+def decay(x, a, s):
+    return a * np.exp(-(x / s))
+
+
+def pad(arrays: Sequence[np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+    """Stacks arrays of different lengths into one array padded with NaN.
+
+    Args:
+        arrays (Sequence[np.ndarray]): The arrays.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The (arrays, longest) float array and the
+            length of every array.
+    """
+    lengths = np.array([len(array) for array in arrays], dtype=np.intp)
+    stack = np.full((len(arrays), lengths.max(initial=0)), np.nan)
+    for row, array in zip(stack, arrays):
+        row[: len(array)] = array
+    return stack, lengths
+
+
+def _percentile(ordered: np.ndarray, lengths: np.ndarray, q: float) -> np.ndarray:
+    """Returns the q quantile of every sorted row, with NaN padding at its end, as
+    np.percentile interpolates it."""
+    position = q * (lengths - 1)
+    below = np.floor(position).astype(np.intp)
+    above = np.minimum(below + 1, np.maximum(lengths - 1, 0))
+    a = np.take_along_axis(ordered, below[:, None], axis=1)[:, 0]
+    b = np.take_along_axis(ordered, above[:, None], axis=1)[:, 0]
+    t = position - below
+    return np.where(t >= 0.5, b - (b - a) * (1 - t), a + (b - a) * t)
+
+
+def _auto_histograms(
+    values: np.ndarray, lengths: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Histograms every row as np.histogram(row, bins="auto") does.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: The (rows, most bins) counts, the
+            matching bin centres, padded with NaN, and the number of bins of every
+            row, 0 for rows numpy would widen because all values are equal.
+    """
+    first = np.nanmin(values, axis=1)
+    last = np.nanmax(values, axis=1)
+    span = last - first
+    n = lengths.astype(float)
+    # the smaller of the Freedman-Diaconis and Sturges widths, as numpy's "auto"
+    ordered = np.sort(values, axis=1)
+    q75 = _percentile(ordered, lengths, 0.75)
+    q25 = _percentile(ordered, lengths, 0.25)
+    fd_width = 2.0 * (q75 - q25) * n ** (-1.0 / 3.0)
+    sturges_width = span / (np.log2(n) + 1.0)
+    width = np.where(fd_width > 0, np.minimum(fd_width, sturges_width), sturges_width)
+    bins = np.zeros(len(values), dtype=np.intp)
+    valid = span > 0
+    bins[valid] = np.ceil(span[valid] / width[valid]).astype(np.intp)
+
+    most = max(int(bins.max(initial=0)), 1)
+    steps = np.arange(most + 1)
+    safe_bins = np.maximum(bins, 1)[:, None]
+    # bin edges as np.linspace gives them, exact first and last edges included
+    edges = first[:, None] + steps * (span[:, None] / safe_bins)
+    edges = np.where(steps == safe_bins, last[:, None], edges)
+
+    # bin of every sample, with numpy's corrections for rounding at the edges
+    finite = ~np.isnan(values) & valid[:, None]
+    norm = safe_bins / np.where(valid, span, 1.0)[:, None]
+    scaled = (values - first[:, None]) * norm
+    index = np.where(finite, scaled, 0).astype(np.intp)
+    index = np.minimum(index, safe_bins - 1)
+    index -= values < np.take_along_axis(edges, index, axis=1)
+    index += (values >= np.take_along_axis(edges, index + 1, axis=1)) & (
+        index != safe_bins - 1
+    )
+    rows = np.broadcast_to(np.arange(len(values))[:, None], values.shape)
+    counts = np.bincount(
+        (rows * most + index)[finite], minlength=len(values) * most
+    ).reshape(len(values), most)
+    centres = (edges[:, 1:] + edges[:, :-1]) / 2.0
+    centres[steps[:-1] >= bins[:, None]] = np.nan
+    return counts.astype(float), centres, bins
+
+
+def _fit_gauss(
+    counts: np.ndarray, centres: np.ndarray, bins: np.ndarray, width: int = 3
+) -> tuple[np.ndarray, ...]:
+    """Fits gauss to every histogram in closed form.
+
+    ln(counts) is a parabola in the centres, fitted by least squares weighted by the
+    squared counts over the width bins around the highest one, moved inwards at the
+    ends of the histogram, so the tail of the contact region does not flatten it.
+
+    Returns:
+        tuple[np.ndarray, ...]: x0, a0 and s0 of every row, NaN where the fit is not
+            a peak.
+    """
+    top = np.argmax(counts, axis=1)[:, None]
+    columns = np.arange(counts.shape[1])
+    left = np.clip(top - width // 2, 0, np.maximum(bins[:, None] - width, 0))
+    used = (counts > 0) & (columns >= left) & (columns < left + width)
+    # centred on the highest bin, for the conditioning of the sums
+    peak = np.take_along_axis(centres, top, axis=1)
+    x = np.where(used, centres - peak, 0.0)
+    log_counts = np.log(np.where(used, counts, 1.0))
+    weights = np.where(used, counts**2, 0.0)
+    # normal equations of log_counts ~ c0 + c1 x + c2 x^2
+    moments = [np.sum(weights * x**k, axis=1) for k in range(5)]
+    targets = [np.sum(weights * x**k * log_counts, axis=1) for k in range(3)]
+    matrix = np.stack(
+        [np.stack([moments[i + j] for j in range(3)], axis=-1) for i in range(3)],
+        axis=-2,
+    )
+    rhs = np.stack(targets, axis=-1)
+    enough = used.sum(axis=1) >= 3
+    matrix[~enough] = np.eye(3)
+    solvable = enough & (np.abs(np.linalg.det(matrix)) > 0)
+    matrix[~solvable] = np.eye(3)
+    c0, c1, c2 = np.linalg.solve(matrix, rhs[..., None])[..., 0].T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s0 = np.sqrt(-1.0 / c2)
+        x0 = -c1 / (2.0 * c2)
+        a0 = np.exp(c0 - c1**2 / (4.0 * c2))
+    good = solvable & (c2 < 0) & np.isfinite(x0) & np.isfinite(a0) & np.isfinite(s0)
+    nan = np.full(len(counts), np.nan)
+    return (
+        np.where(good, x0 + peak[:, 0], nan),
+        np.where(good, a0, nan),
+        np.where(good, s0, nan),
+    )
+
+
+def _last_true(mask: np.ndarray) -> np.ndarray:
+    """Returns the last column where each row of mask is True, -1 if it is nowhere."""
+    last = mask.shape[1] - 1 - np.argmax(mask[:, ::-1], axis=1)
+    return np.where(mask.any(axis=1), last, -1)
+
+
+def find_out_of_contact_scipy(
+    z: np.ndarray, f: np.ndarray, weight: float = 20.0
+) -> int:
+    """Finds the last out of contact sample of one curve with scipy fits.
+
+    Same as Segment.findOutOfContactRegion of mvexperiment without refinement.
+
+    Returns:
+        int: The index, 0 if no fit converged.
+    """
+    yy, xx = np.histogram(f, bins="auto")
+    xx = (xx[1:] + xx[:-1]) / 2.0
+    try:
+        func = gauss
+        out = curve_fit(gauss, xx, yy, p0=[xx[np.argmax(yy)], np.max(yy), 1.0])
+        threshold = out[0][1] / weight
+    except RuntimeError:
+        try:
+            func = decay
+            out = curve_fit(decay, xx, yy, p0=[np.max(yy), 1.0])
+            threshold = out[0][0] / weight
+        except RuntimeError:
+            return 0
+    fit = func(xx, *out[0])
+    crossing = (fit[1:] < threshold) & (fit[:-1] > threshold)
+    jend = int(np.flatnonzero(crossing)[-1]) + 1 if crossing.any() else 0
+    xcontact = np.max(z[f < xx[jend]])
+    return int(np.argmin((z - xcontact) ** 2))
+
+
+def find_out_of_contact(
+    zs: Sequence[np.ndarray], fs: Sequence[np.ndarray], weight: float = 20.0
+) -> np.ndarray:
+    """Finds the last out of contact sample of every curve.
+
+    Args:
+        zs (Sequence[np.ndarray]): Displacement of every curve.
+        fs (Sequence[np.ndarray]): Force of every curve, as long as its displacement.
+        weight (float): The baseline ends where its Gaussian falls below its height
+            divided by weight.
+
+    Returns:
+        np.ndarray: The index for every curve, 0 where none was found.
+    """
+    z, lengths = pad(zs)
+    f, _ = pad(fs)
+    result = np.zeros(len(z), dtype=np.intp)
+    if len(z) == 0:
+        return result
+    counts, centres, bins = _auto_histograms(f, lengths)
+    x0, a0, s0 = _fit_gauss(counts, centres, bins)
+    threshold = a0 / weight
+    with np.errstate(invalid="ignore"):
+        fit = gauss(centres, x0[:, None], a0[:, None], s0[:, None])
+        crossing = (fit[:, 1:] < threshold[:, None]) & (
+            fit[:, :-1] > threshold[:, None]
+        )
+    jend = _last_true(crossing) + 1
+    fast = np.isfinite(a0) & (bins > 0)
+    jend = np.where(jend > 0, jend, 0)
+    bound = np.take_along_axis(centres, jend[:, None], axis=1)
+    with np.errstate(invalid="ignore"):
+        below = f < bound
+    has_below = below.any(axis=1)
+    xcontact = np.max(np.where(below, z, -np.inf), axis=1)
+    distance = np.where(np.isnan(z), np.inf, (z - xcontact[:, None]) ** 2)
+    result[:] = np.argmin(distance, axis=1)
+    fast &= has_below
+    for i in np.flatnonzero(~fast):
+        result[i] = find_out_of_contact_scipy(
+            np.asarray(zs[i], dtype=float), np.asarray(fs[i], dtype=float), weight
+        )
+    return result
+
+
+def find_contact(
+    zs: Sequence[np.ndarray], fs: Sequence[np.ndarray], out_contact: np.ndarray
+) -> np.ndarray:
+    """Finds the contact point of every curve.
+
+    A line is fitted to the force of each curve before its out of contact index. The
+    contact point is that index if the force is below the line there, otherwise the
+    last earlier sample where it is.
+
+    Args:
+        zs (Sequence[np.ndarray]): Displacement of every curve.
+        fs (Sequence[np.ndarray]): Force of every curve.
+        out_contact (np.ndarray): Out of contact index of every curve, see
+            find_out_of_contact.
+
+    Returns:
+        np.ndarray: The index for every curve, 0 where none was found.
+    """
+    z, _ = pad(zs)
+    f, _ = pad(fs)
+    out_contact = np.asarray(out_contact, dtype=np.intp)
+    columns = np.arange(z.shape[1])
+    baseline = columns < out_contact[:, None]
+    n = baseline.sum(axis=1).astype(float)
+    zb = np.where(baseline, z, 0.0)
+    fb = np.where(baseline, f, 0.0)
+    # least squares line through the baseline of every curve at once
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_mean = zb.sum(axis=1) / n
+        f_mean = fb.sum(axis=1) / n
+        dz = np.where(baseline, z - z_mean[:, None], 0.0)
+        slope = np.sum(dz * fb, axis=1) / np.sum(dz**2, axis=1)
+        line = f_mean[:, None] + slope[:, None] * (z - z_mean[:, None])
+        below = (f < line) & (columns >= 1) & (columns <= out_contact[:, None])
+    result = np.maximum(_last_true(below), 0)
+    fitted = (out_contact > 0) & np.isfinite(slope)
+    for i in np.flatnonzero((out_contact > 0) & ~fitted):
+        # degenerate baseline, e.g. a constant displacement, as np.polyfit handles it
+        zi = np.asarray(zs[i], dtype=float)
+        fi = np.asarray(fs[i], dtype=float)
+        out = out_contact[i]
+        ypoly = np.polyval(np.polyfit(zi[:out], fi[:out], 1), zi)
+        hits = np.flatnonzero(fi[1 : out + 1] < ypoly[1 : out + 1])
+        result[i] = hits[-1] + 1 if len(hits) else 0
+        fitted[i] = True
+    return np.where(fitted, result, 0)
+
+
+def find_contact_points(
+    zs: Sequence[np.ndarray], fs: Sequence[np.ndarray], weight: float = 20.0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Finds the out of contact index and the contact point of every curve.
+
+    Args:
+        zs (Sequence[np.ndarray]): Displacement of every curve.
+        fs (Sequence[np.ndarray]): Force of every curve.
+        weight (float): See find_out_of_contact.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The out of contact index and the contact point
+            of every curve, 0 where none was found.
+    """
+    out_contact = find_out_of_contact(zs, fs, weight)
+    return out_contact, find_contact(zs, fs, out_contact)
@@ -1,9 +1,19 @@
-from typing import Any
+from typing import Any, Iterable
 import abc
+import operator
 import numpy as np
 from . import abstracts
 import re
 
+COMPARISONS = {
+    "<": operator.lt,
+    ">": operator.gt,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
 
 class FilterMeta(abc.ABCMeta, type):
     _filters: dict[type, "Filter"] = {}
@@ -86,6 +96,25 @@ class Filter(abc.ABC, metaclass=FilterMeta):
         """
         ...
 
+    def mask(
+        self, parameters: dict[str, Any], data_sets: Iterable[abstracts.DataSet]
+    ) -> np.ndarray:
+        """Checks a batch of data sets at once.
+
+        Filters that can compare precomputed features of all the data sets in one
+        call should override this; by default is_valid is called for each data set.
+
+        Args:
+            parameters (dict): dictionary of parameters to be used to determine if the data sets are valid
+            data_sets (Iterable[DataSet]): data sets to be checked
+
+        Returns:
+            np.ndarray: boolean mask, True for each valid data set
+        """
+        return np.array(
+            [self.is_valid(parameters, data_set) for data_set in data_sets], dtype=bool
+        )
+
     @staticmethod
     def filters() -> list["Filter"]:
         return FilterMeta.filters()
@@ -105,20 +134,52 @@ class ForceFilter(Filter):
         )
 
     def is_valid(self, parameters: dict[str, Any], data_set: abstracts.DataSet) -> bool:
-        force_threshold = parameters["force"]
-        comparison = parameters["comparison"]
-        if comparison == "<":
-            return np.max(data_set.force) < force_threshold
-        elif comparison == "<=":
-            return np.max(data_set.force) <= force_threshold
-        elif comparison == ">=":
-            return np.max(data_set.force) >= force_threshold
-        elif comparison == "==":
-            return np.max(data_set.force) == force_threshold
-        elif comparison == "!=":
-            return np.max(data_set.force) != force_threshold
-
-        return np.max(data_set.force) > force_threshold
+        return bool(self.compare(parameters, self.features([data_set]))[0])
+
+    def mask(
+        self, parameters: dict[str, Any], data_sets: Iterable[abstracts.DataSet]
+    ) -> np.ndarray:
+        return self.compare(parameters, self.features(data_sets))
+
+    @staticmethod
+    def features(data_sets: Iterable[abstracts.DataSet]) -> np.ndarray:
+        """Returns the maximum force of each data set, read from its statistics."""
+        return np.array(
+            [data_set.statistics.channel_max("force") for data_set in data_sets],
+            dtype=float,
+        )
+
+    @staticmethod
+    def compare(parameters: dict[str, Any], features: np.ndarray) -> np.ndarray:
+        """Compares precomputed maximum forces, see features, against the force limit."""
+        comparison = COMPARISONS.get(parameters["comparison"], operator.gt)
+        return comparison(np.asarray(features), parameters["force"])
+
+
+def apply_filters(
+    filters: Iterable[tuple[Filter, dict[str, Any]]],
+    data_sets: Iterable[abstracts.DataSet],
+) -> np.ndarray:
+    """Runs a chain of filters over a batch of data sets.
+
+    Each filter only checks the data sets that passed every filter before it, so a
+    data set is not checked any further once one filter rejects it.
+
+    Args:
+        filters (Iterable[tuple[Filter, dict]]): filters with the parameters to run them with
+        data_sets (Iterable[DataSet]): data sets to be checked
+
+    Returns:
+        np.ndarray: boolean mask, True for each data set valid for every filter
+    """
+    data_sets = list(data_sets)
+    mask = np.ones(len(data_sets), dtype=bool)
+    for filter, parameters in filters:
+        passing = np.flatnonzero(mask)
+        if len(passing) == 0:
+            break
+        mask[passing] = filter.mask(parameters, [data_sets[i] for i in passing])
+    return mask
 
 
 filters = Filter.filters()
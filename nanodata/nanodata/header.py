@@ -0,0 +1,111 @@
+import re
+import numpy as np
+
+from typing import Any, Iterable
+
+# Header grammar of Optics11 Chiaro text exports, shared by the nanodata and
+# mvexperiment readers.
+
+FLOAT_FIELDS: dict[str, str] = {
+    "X-position (um)": "x_pos",
+    "Y-position (um)": "y_pos",
+    "Z-position (um)": "z_pos",
+    "Z surface (um)": "z_surface",
+    "Piezo position (nm) (Measured)": "piezo_pos",
+    "k (N/m)": "cantilever_k",
+    "Tip radius (um)": "tip_radius",
+    "Calibration factor": "cantilever_lever",
+    "Wavelength (nm)": "wavelength",
+    "dX before scan (um)": "dx_before_scan",
+    "Piezo position setpoint at start (nm)": "piezo_pos_setpoint",
+    "P[max] (uN)": "max_force",
+    "D[max] (nm)": "max_deflection",
+    "D[final] (nm)": "final_deflection",
+    "D[max-final] (nm)": "max_final_deflection",
+    "Slope (N/m)": "slope",
+    "E[eff] (Pa)": "effective_modulus",
+    "SMDuration (s)": "sm_duration",
+    "Depth (nm)": "depth",
+    "Loading / unloading time (s)": "loading_time",
+}
+
+STRING_FIELDS: dict[str, str] = {
+    "Auto find surface": "auto_find_surface",
+    "Device": "device",
+    "Software version": "version",
+    "Control mode": "mode",
+    "Measurement": "measurement",
+    "Model": "model",
+    "Comment": "comment",
+}
+
+# One alternative per kind of line, tried once per line. Fields are sorted longest
+# first so that no field can shadow a longer one sharing its prefix. The kind of a
+# match is given by the last group it closes, see parse_header. The colon after a
+# field name is optional, older exports leave it out. A protocol step is any
+# "<quantity>[<step>] (<unit>)" line with its time, e.g. D[Z1] (nm) in displacement
+# and P[Z1] (uN) in load control.
+HEADER_PATTERN = re.compile(
+    r"(?P<body>Time \(s\))"
+    r"|(?P<protocol>Profile:?|Piezo Indentation Sweep Settings)"
+    r"|\w\[\w*\d+\] \([^)]*\)\s+(?P<step_value>\S+)\s+t\[\d+\] \(s\)"
+    r"\s+(?P<step_time>\S+)"
+    r"|(?P<poisson>E\[v=[^\]]*\]) \(Pa\)\s*(?P<poisson_value>.*)"
+    r"|(?P<field>"
+    + "|".join(
+        re.escape(field)
+        for field in sorted({**FLOAT_FIELDS, **STRING_FIELDS}, key=len, reverse=True)
+    )
+    + r"):?\s*(?P<field_value>.*)"
+)
+
+
+def to_float(value: str) -> float:
+    """Converts a header value to float, accepting comma decimal separators."""
+    return float(value.strip().replace(",", "."))
+
+
+def parse_header(lines: Iterable[str]) -> tuple[dict[str, Any], bool]:
+    """Parses the header of a Chiaro file.
+
+    Lines are consumed up to and including the "Time (s)" line, so an iterator over
+    an open file is left at the start of the body. Float fields that cannot be
+    converted, e.g. "Not available in this mode", are skipped.
+
+    Args:
+        lines (Iterable[str]): The lines of the file.
+
+    Returns:
+        tuple[dict[str, Any], bool]: The header, with the names of FLOAT_FIELDS and
+            STRING_FIELDS, "E[v=...]" entries and a (steps, 2) "protocol" array of
+            (value, time) pairs if a protocol was found; and True if the start of the
+            body was found.
+    """
+    header: dict[str, Any] = {}
+    steps: list[tuple[float, float]] = []
+    has_protocol = False
+    found_body = False
+    for line in lines:
+        match = HEADER_PATTERN.match(line.strip())
+        if match is None:
+            continue
+        kind = match.lastgroup
+        if kind == "body":
+            found_body = True
+            break
+        elif kind == "protocol":
+            has_protocol = True
+        elif kind == "step_time":
+            steps.append((to_float(match["step_value"]), to_float(match["step_time"])))
+        elif kind == "poisson_value":
+            header[match["poisson"]] = to_float(match["poisson_value"])
+        elif match["field"] in STRING_FIELDS:
+            header[STRING_FIELDS[match["field"]]] = match["field_value"].strip()
+        else:
+            try:
+                header[FLOAT_FIELDS[match["field"]]] = to_float(match["field_value"])
+            except ValueError:
+                pass
+    if has_protocol:
+        header["protocol"] = np.array(steps, dtype=float).reshape(-1, 2)
+    return header, found_body
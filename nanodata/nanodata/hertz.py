@@ -0,0 +1,170 @@
+import numpy as np
+
+from typing import Sequence
+
+# Least squares fit of the Hertz model F = 4/3 * E / (1 - poisson^2) * sqrt(R * x^3).
+#
+# The model is linear in E: F = E * c * h(x), with c = 4/3 * sqrt(R) / (1 - poisson^2)
+# and h(x) = |x|^1.5, so the E minimising sum((F - E * c * h)^2) is
+# sum(h * F) / sum(h^2) / c, the optimum curve_fit converges to, without iterations.
+# The curves are concatenated into one array, so a whole force map is fitted with a
+# few passes over its samples, the sums of each curve taken with np.add.reduceat.
+
+
+def hertz_constant(
+    tip_radius: float | np.ndarray, poisson: float | np.ndarray
+) -> float | np.ndarray:
+    """Returns c, the force of the Hertz model for E = 1 at an indentation of 1."""
+    return (4.0 / 3.0) * np.sqrt(tip_radius) / (1 - np.asarray(poisson) ** 2)
+
+
+def concatenate(
+    arrays: Sequence[np.ndarray],
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Stores arrays of different lengths back to back in one array.
+
+    Args:
+        arrays (Sequence[np.ndarray]): The arrays.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: The float array, followed by one
+            padding 0 so every start is a valid index, the start and the length of
+            every array.
+    """
+    lengths = np.array([len(array) for array in arrays], dtype=np.intp)
+    starts = np.zeros(len(arrays), dtype=np.intp)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    values = np.empty(lengths.sum() + 1)
+    values[-1] = 0.0
+    if len(arrays):
+        np.concatenate(arrays, out=values[:-1])
+    return values, starts, lengths
+
+
+def range_sums(values: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """Returns the sum of values[start : start + stop] for every start, 0 if empty.
+
+    Args:
+        values (np.ndarray): Values, see concatenate.
+        starts (np.ndarray): First index of every range.
+        stops (np.ndarray): Length of every range.
+
+    Returns:
+        np.ndarray: The sums.
+    """
+    if not len(starts):
+        return np.zeros(0)
+    # every other reduceat bound ends a range, the sums between ranges are dropped
+    bounds = np.empty(2 * len(starts), dtype=np.intp)
+    bounds[0::2] = starts
+    bounds[1::2] = starts + stops
+    sums = np.add.reduceat(values, np.minimum(bounds, len(values) - 1))[0::2]
+    return np.where(stops > 0, sums, 0.0)
+
+
+def range_reduce(
+    ufunc: np.ufunc, values: np.ndarray, starts: np.ndarray, lengths: np.ndarray
+) -> np.ndarray:
+    """Returns ufunc reduced over values[start : start + length] of every range, all
+    of which must be non-empty.
+
+    The ranges end explicitly, as in range_sums, so the padding after the last one
+    is never reduced with it.
+    """
+    bounds = np.empty(2 * len(starts), dtype=np.intp)
+    bounds[0::2] = starts
+    bounds[1::2] = np.minimum(starts + lengths, len(values) - 1)
+    return ufunc.reduceat(values, bounds)[0::2]
+
+
+def range_argmins(
+    values: np.ndarray, starts: np.ndarray, lengths: np.ndarray
+) -> np.ndarray:
+    """Returns the index in every range of its first minimum, 0 if it is empty."""
+    result = np.zeros(len(starts), dtype=np.intp)
+    filled = np.flatnonzero(lengths > 0)
+    if not len(filled):
+        return result
+    minima = np.full(len(starts), np.inf)
+    minima[filled] = range_reduce(np.minimum, values, starts[filled], lengths[filled])
+    hits = np.flatnonzero(values[:-1] == np.repeat(minima, lengths))
+    ranges = np.searchsorted(starts, hits, side="right") - 1
+    first = np.ones(len(hits), dtype=bool)
+    first[1:] = ranges[1:] != ranges[:-1]
+    result[ranges[first]] = hits[first] - starts[ranges[first]]
+    return result
+
+
+def threshold_stops(
+    x: np.ndarray,
+    y: np.ndarray,
+    starts: np.ndarray,
+    lengths: np.ndarray,
+    threshold: float | None = None,
+    threshold_type: str = "indentation",
+) -> np.ndarray:
+    """Returns how many samples of every curve are fitted.
+
+    With a threshold this is the sample closest to it, in indentation or in force,
+    and 0 for curves that never reach the threshold or reach it within 10 samples,
+    which are not fitted.
+
+    Args:
+        x (np.ndarray): Indentation of the curves, see concatenate.
+        y (np.ndarray): Force of the curves, see concatenate.
+        starts (np.ndarray): Start of every curve.
+        lengths (np.ndarray): Length of every curve.
+        threshold (float | None): Where the fit stops, None fits whole curves.
+        threshold_type (str): "indentation" or anything else for force.
+
+    Returns:
+        np.ndarray: The number of samples fitted of every curve.
+    """
+    if threshold is None:
+        return lengths
+    values = x if threshold_type == "indentation" else y
+    filled = lengths > 0
+    reached = np.zeros(len(starts), dtype=bool)
+    if filled.any():
+        ranges = (starts[filled], lengths[filled])
+        reached[filled] = threshold <= range_reduce(np.maximum, values, *ranges)
+        if threshold_type != "indentation":
+            reached[filled] &= threshold >= range_reduce(np.minimum, values, *ranges)
+    stops = range_argmins((values - threshold) ** 2, starts, lengths)
+    return np.where(reached & (stops > 10), stops, 0)
+
+
+def fit_young(
+    xs: Sequence[np.ndarray],
+    ys: Sequence[np.ndarray],
+    tip_radius: float | np.ndarray,
+    poisson: float | np.ndarray = 0.5,
+    threshold: float | None = None,
+    threshold_type: str = "indentation",
+) -> tuple[np.ndarray, np.ndarray]:
+    """Fits the Hertz model to every curve at once.
+
+    Args:
+        xs (Sequence[np.ndarray]): Indentation of every curve.
+        ys (Sequence[np.ndarray]): Force of every curve, as long as its indentation.
+        tip_radius (float | np.ndarray): Tip radius, for all curves or one per curve.
+        poisson (float | np.ndarray): Poisson ratio, for all curves or one per curve.
+        threshold (float | None): See threshold_stops.
+        threshold_type (str): See threshold_stops.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: E of every curve in the units of the force
+            over the squared units of the indentation, NaN where it could not be
+            fitted, and the number of samples fitted, see threshold_stops.
+    """
+    x, starts, lengths = concatenate(xs)
+    y, _, _ = concatenate(ys)
+    stops = threshold_stops(x, y, starts, lengths, threshold, threshold_type)
+    h = np.abs(x)
+    h *= np.sqrt(h)
+    y *= h
+    h *= h
+    with np.errstate(divide="ignore", invalid="ignore"):
+        young = range_sums(y, starts, stops) / range_sums(h, starts, stops)
+        young /= hertz_constant(tip_radius, poisson)
+    return np.where(np.isfinite(young), young, np.nan), stops
@@ -1,7 +1,7 @@
 import abc
 import numpy as np
 
-from typing import Iterable, TypeVar, Generic, Any
+from typing import BinaryIO, Iterable, TypeVar, Generic, Any
 
 TDataSet = TypeVar("TDataSet", bound="IDataSet")
 TDataSetType = TypeVar("TDataSetType", bound="IDataSetType")
@@ -17,183 +17,166 @@ class Singleton(type):
         return cls._instances[cls]
 
 
-class AbstractSingleton(Singleton, abc.ABCMeta):
-    ...
+class AbstractSingleton(Singleton, abc.ABCMeta): ...
 
 
 class IDataManager(
     abc.ABC, Generic[TDataSet, TDataSetType], metaclass=AbstractSingleton
 ):
     @abc.abstractmethod
-    def _add_data_set(self, data_set: TDataSet) -> None:
-        ...
+    def _add_data_set(self, data_set: TDataSet) -> None: ...
 
     @abc.abstractmethod
-    def _remove_data_set(self, name: str) -> None:
-        ...
+    def _remove_data_set(self, name: str) -> None: ...
 
     @abc.abstractmethod
-    def register_file_type(self, file_type: TDataSetType) -> None:
-        ...
+    def register_file_type(self, file_type: TDataSetType) -> None: ...
 
     @abc.abstractmethod
-    def load(self) -> None:
-        ...
+    def load(self, workers: int | None = 1, lazy: bool = False) -> None: ...
 
     @abc.abstractmethod
-    def load_data_set(self, name: str) -> None:
-        ...
+    def scan(self) -> None: ...
 
     @abc.abstractmethod
-    def clear(self) -> None:
-        ...
+    def load_archive(self, archive: str | BinaryIO, lazy: bool = False) -> None: ...
+
+    @abc.abstractmethod
+    def load_data_set(self, name: str) -> None: ...
+
+    @abc.abstractmethod
+    def clear(self) -> None: ...
 
     @property
     @abc.abstractmethod
-    def values(self) -> Iterable[TDataSet]:
-        ...
+    def values(self) -> Iterable[TDataSet]: ...
 
     @property
     @abc.abstractmethod
-    def items(self) -> Iterable[tuple[str, TDataSet]]:
-        ...
+    def items(self) -> Iterable[tuple[str, TDataSet]]: ...
 
     @property
     @abc.abstractmethod
-    def keys(self) -> Iterable[str]:
-        ...
+    def keys(self) -> Iterable[str]: ...
 
     @property
     @abc.abstractmethod
-    def path(self) -> str:
-        ...
+    def path(self) -> str: ...
 
     @property
     @abc.abstractmethod
-    def data_sets(self) -> Iterable[TDataSet]:
-        ...
+    def data_sets(self) -> Iterable[TDataSet]: ...
 
     @abc.abstractmethod
-    def __getitem__(self, name: str) -> TDataSet:
-        ...
+    def __getitem__(self, name: str) -> TDataSet: ...
 
     @abc.abstractmethod
-    def __len__(self) -> int:
-        ...
+    def __len__(self) -> int: ...
 
     @abc.abstractmethod
-    def __iter__(self) -> Iterable[TDataSet]:
-        ...
+    def __iter__(self) -> Iterable[TDataSet]: ...
 
     @abc.abstractmethod
-    def __repr__(self) -> str:
-        ...
+    def __repr__(self) -> str: ...
 
 
 class IDataSet(abc.ABC):
     @abc.abstractmethod
-    def load(self) -> None:
-        ...
+    def load(self, file: BinaryIO | None = None) -> None: ...
+
+    @abc.abstractmethod
+    def load_header(self, file: BinaryIO | None = None) -> None: ...
+
+    @abc.abstractmethod
+    def unload(self) -> None: ...
 
     @property
     @abc.abstractmethod
-    def name(self) -> str:
-        ...
+    def name(self) -> str: ...
 
     @property
     @abc.abstractmethod
-    def path(self) -> str:
-        ...
+    def path(self) -> str: ...
 
     @abc.abstractmethod
-    def __repr__(self) -> str:
-        ...
+    def __repr__(self) -> str: ...
 
 
 class IDataSetType(abc.ABC):
     @abc.abstractmethod
-    def is_valid(self, path: str) -> bool:
-        ...
+    def is_valid(self, path: str) -> bool: ...
+
+    @abc.abstractmethod
+    def create_data_set(self, name: str, path: str) -> TDataSet: ...
 
     @abc.abstractmethod
-    def create_data_set(self, name: str, path: str) -> TDataSet:
-        ...
+    def has_valid_extension(self, path: str) -> bool: ...
 
     @abc.abstractmethod
-    def has_valid_extension(self, path: str) -> bool:
-        ...
+    def has_valid_header(self, path: str) -> bool: ...
 
     @abc.abstractmethod
-    def has_valid_header(self, path: str) -> bool:
-        ...
+    def has_valid_signature(self, head: bytes) -> bool: ...
 
     @property
     @abc.abstractmethod
-    def extensions(self) -> Iterable[str]:
-        ...
+    def extensions(self) -> Iterable[str]: ...
 
     @property
     @abc.abstractmethod
-    def name(self) -> str:
-        ...
+    def signatures(self) -> list[bytes]: ...
+
+    @property
+    @abc.abstractmethod
+    def name(self) -> str: ...
 
 
 class ISegment(abc.ABC):
+    __slots__ = ()
+
     @property
     @abc.abstractmethod
-    def time(self) -> np.ndarray:
-        ...
+    def time(self) -> np.ndarray: ...
 
     @time.setter
     @abc.abstractmethod
-    def time(self, value: np.ndarray):
-        ...
+    def time(self, value: np.ndarray): ...
 
     @property
     @abc.abstractmethod
-    def force(self) -> np.ndarray:
-        ...
+    def force(self) -> np.ndarray: ...
 
     @force.setter
     @abc.abstractmethod
-    def force(self, value: np.ndarray):
-        ...
+    def force(self, value: np.ndarray): ...
 
     @property
     @abc.abstractmethod
-    def deflection(self) -> np.ndarray:
-        ...
+    def deflection(self) -> np.ndarray: ...
 
     @deflection.setter
     @abc.abstractmethod
-    def deflection(self, value: np.ndarray):
-        ...
+    def deflection(self, value: np.ndarray): ...
 
     @property
     @abc.abstractmethod
-    def z(self) -> np.ndarray:
-        ...
+    def z(self) -> np.ndarray: ...
 
     @z.setter
     @abc.abstractmethod
-    def z(self, value: np.ndarray):
-        ...
+    def z(self, value: np.ndarray): ...
 
     @property
     @abc.abstractmethod
-    def indentation(self) -> np.ndarray:
-        ...
+    def indentation(self) -> np.ndarray: ...
 
     @indentation.setter
     @abc.abstractmethod
-    def indentation(self, value: np.ndarray):
-        ...
+    def indentation(self, value: np.ndarray): ...
 
     @property
     @abc.abstractmethod
-    def data(self) -> dict[str, Any]:
-        ...
+    def data(self) -> dict[str, Any]: ...
 
     @abc.abstractmethod
-    def __repr__(self) -> str:
-        ...
+    def __repr__(self) -> str: ...
@@ -0,0 +1,40 @@
+import numpy as np
+
+# Index of the sample closest to a value, as np.argmin((x - x0) ** 2) gives it.
+#
+# Channels such as time, and often z, are sorted, and then the closest sample is
+# found by bisection, without a pass over the array. Whether an array is sorted is
+# checked once by the caller, see is_increasing, and passed on with every lookup.
+
+
+def is_increasing(x: np.ndarray) -> bool:
+    """Returns whether x never decreases, False if it holds NaN."""
+    x = np.asarray(x)
+    return x.ndim == 1 and (len(x) < 2 or bool(np.all(x[1:] >= x[:-1])))
+
+
+def nearest_index(x: np.ndarray, x0: float, increasing: bool | None = None) -> int:
+    """Returns the index of the sample of x closest to x0, the first one if several
+    are as close, as np.argmin((x - x0) ** 2) does.
+
+    Args:
+        x (np.ndarray): The samples.
+        x0 (float): The value looked up.
+        increasing (bool | None): Whether x never decreases, see is_increasing.
+            None checks it on every call, pass it when looking up the same x often.
+
+    Returns:
+        int: The index, found by bisection if x is increasing and x0 is not NaN.
+    """
+    x = np.asarray(x)
+    if increasing is None:
+        increasing = is_increasing(x)
+    if not increasing or len(x) == 0 or x0 != x0:
+        return int(np.argmin((x - x0) ** 2))
+    i = int(np.searchsorted(x, x0))
+    if i == len(x):
+        i -= 1
+    elif i > 0 and (x0 - x[i - 1]) ** 2 <= (x[i] - x0) ** 2:
+        i -= 1
+    # the first of equal samples, as argmin
+    return int(np.searchsorted(x, x[i]))
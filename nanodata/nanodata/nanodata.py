@@ -1,11 +1,22 @@
+import io
 import numpy as np
 import os
+import pandas as pd
+import re
+import warnings
 
-from typing import Any, Iterator
+from typing import Any, BinaryIO, Iterable, Iterator, TextIO
 from scipy.optimize import curve_fit
-from scipy.signal import savgol_filter, find_peaks, medfilt
+from scipy.signal import find_peaks, medfilt
 
 from . import abstracts
+from . import cache
+from . import contact
+from . import hertz
+from . import lookup
+from . import header as chiaro_header
+from .savgol import savgol_filter
+
 
 # TODO move these
 def Gauss(x, x0, a0, s0) -> float:
@@ -20,14 +31,188 @@ def GGauss(x, x1, x2, a1, a2, s1, s2) -> float:
     return a1 * np.exp(-(((x - x1) / s1) ** 2)) + a2 * np.exp(-(((x - x2) / s2) ** 2))
 
 
-def can_be_crossed(x1, x2, th, dth) -> bool:
-    th1 = th + dth
-    th2 = th - dth
-    if np.sign(x1 - th1) != np.sign(x2 - th1):
-        return True
-    if np.sign(x1 - th2) != np.sign(x2 - th2):
-        return True
-    return False
+def crossings(x: np.ndarray, th: float, dth: float) -> np.ndarray:
+    """Returns, for every sample after the first, whether x crosses th + dth or th - dth
+    between the previous sample and this one."""
+    crossed = np.zeros(max(len(x) - 1, 0), dtype=bool)
+    for level in (th + dth, th - dth):
+        signs = np.sign(x - level)
+        crossed |= signs[1:] != signs[:-1]
+    return crossed
+
+
+def find_protocol_nodes(
+    time: np.ndarray,
+    z: np.ndarray,
+    protocol: np.ndarray,
+    bias: float = 30,
+    check_crossing: bool = True,
+) -> list[int]:
+    """Finds the sample where each step of the protocol ends.
+
+    For each step, this is the first sample after the end of the previous step that
+    is later than the step duration and where z crosses the step threshold within
+    +/- bias. Each step is resolved with array operations rather than a loop over
+    the samples.
+
+    Args:
+        time (np.ndarray): The time channel.
+        z (np.ndarray): The z channel.
+        protocol (np.ndarray): (threshold, duration) of each step.
+        bias (float): Tolerance on the threshold.
+        check_crossing (bool): If False, only the duration is checked.
+
+    Returns:
+        list[int]: 0, the end of every step that was found and the last sample.
+    """
+    size = len(z)
+    nodes = [0]
+    start = 2
+    wait = 0
+    for threshold, duration in protocol:
+        if start >= size:
+            continue
+        candidates = time[start:] > wait + duration
+        if check_crossing:
+            candidates &= crossings(z[start - 1 :], threshold, bias)
+        found = int(np.argmax(candidates))
+        if candidates[found]:
+            start += found
+            nodes.append(start)
+            wait = time[start]
+        else:
+            # nothing found, later steps may only end on the last sample
+            start = size - 1
+    nodes.append(size - 1)
+    return nodes
+
+
+BLANK_LINE = re.compile(r"^[ \t\r]*$", re.MULTILINE)
+
+
+def parse_numeric_body(text: str) -> np.ndarray:
+    """Parses a tab separated numeric table in a single pass.
+
+    Comma decimal separators are accepted. The number of columns is taken from
+    the first non-empty row, so optional trailing columns (e.g. Auxiliary) are kept.
+    Every other non-empty row must have that many numbers, otherwise ValueError is
+    raised.
+
+    Args:
+        text (str): The table text, without any header lines.
+
+    Returns:
+        np.ndarray: 2D float array with one row per line of the table.
+    """
+    text = text.strip()
+    if not text:
+        return np.empty((0, 0))
+    first_row = text[: text.find("\n")] if "\n" in text else text
+    columns = len(first_row.split())
+    rows = text.count("\n") + 1 - len(BLANK_LINE.findall(text))
+    try:
+        # numpy stops at the first value it cannot parse and, for now, only warns
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            values = np.fromstring(text.replace(",", "."), sep=" ")
+    except DeprecationWarning:
+        raise ValueError("Numeric body holds a value that is not a number.") from None
+    if values.size != rows * columns:
+        raise ValueError(
+            f"Numeric body has {values.size} values, not {rows} rows of {columns}."
+        )
+    return values.reshape(rows, columns)
+
+
+def read_numeric_body(file: TextIO, chunk_size: int = 1 << 20) -> np.ndarray:
+    """Parses the rest of an open file as a numeric table, see parse_numeric_body.
+
+    The file is read in blocks of whole lines so that the full text is never held
+    in memory at once.
+
+    Args:
+        file (TextIO): Open file positioned at the first row of the table.
+        chunk_size (int): Approximate number of characters parsed per block.
+
+    Returns:
+        np.ndarray: 2D float array with one row per line of the table.
+    """
+    blocks = []
+    while True:
+        lines = file.readlines(chunk_size)
+        if not lines:
+            break
+        block = parse_numeric_body("".join(lines))
+        if block.size:
+            blocks.append(block)
+    if not blocks:
+        return np.empty((0, 0))
+    return np.concatenate(blocks)
+
+
+def iter_stripped_lines(file: TextIO) -> Iterator[str]:
+    """Yields the stripped, non-empty lines of an open file one at a time."""
+    for line in iter(file.readline, ""):
+        line = line.strip()
+        if line:
+            yield line
+
+
+def find_contact_points(segments: Iterable["Segment"], weight: float = 20.0) -> None:
+    """Finds the contact point of many segments at once, e.g. all the curves of a
+    force map, as find_out_of_contact_region and find_contact_point do one by one.
+
+    Args:
+        segments (Iterable[Segment]): The segments, their outContact and iContact
+            are set.
+        weight (float): See contact.find_out_of_contact.
+    """
+    segments = list(segments)
+    out_contact, i_contact = contact.find_contact_points(
+        [segment.z for segment in segments],
+        [segment.force for segment in segments],
+        weight,
+    )
+    for segment, out, i in zip(segments, out_contact, i_contact):
+        segment.outContact = int(out)
+        segment.iContact = int(i)
+
+
+def fit_hertz_curves(
+    segments: Iterable["Segment"],
+    threshold: float | None = None,
+    threshold_type: str = "indentation",
+) -> np.ndarray:
+    """Fits the Hertz model to many segments at once, as Segment.fit_hertz does one
+    by one.
+
+    Args:
+        segments (Iterable[Segment]): The segments, their fit is stored on them.
+        threshold (float | None): See hertz.threshold_stops.
+        threshold_type (str): See hertz.threshold_stops.
+
+    Returns:
+        np.ndarray: E * 1e9 of every segment, NaN where it was not fitted, e.g. for
+            segments without an indentation, see create_indentation.
+    """
+    segments = list(segments)
+    empty = np.empty(0)
+    fitted = [segment.touch is not None for segment in segments]
+    young, stops = hertz.fit_young(
+        [s.indentation if f else empty for s, f in zip(segments, fitted)],
+        [s.touch if f else empty for s, f in zip(segments, fitted)],
+        np.array([segment.parent.tip_radius for segment in segments]),
+        np.array([segment._poisson for segment in segments]),
+        threshold,
+        threshold_type,
+    )
+    for segment, segment_young, stop, segment_fitted in zip(
+        segments, young, stops, fitted
+    ):
+        segment.young = None
+        if segment_fitted:
+            segment.set_hertz(segment_young, stop, threshold)
+    return young * 1e9
 
 
 ##################################
@@ -42,11 +227,34 @@ class ChiaroDataManager(abstracts.DataManager["ChiaroDataSet", "ChiaroDataSetTyp
 
     Args:
         dir_path (str): Path to the directory containing the data sets.
+        cache_dir (str | None): Directory for the parsed data set cache, None disables it.
+        max_loaded (int | None): Maximum number of data sets kept loaded, see DataManager.
+        memory_budget (int | None): Maximum number of array bytes kept loaded, see
+            DataManager. Unloaded data sets are reloaded from the cache if enabled.
     """
 
-    def __init__(self, dir_path: str):
-        super().__init__(dir_path)
-        self.register_file_type(ChiaroDataSetType())
+    def __init__(
+        self,
+        dir_path: str,
+        cache_dir: str | None = None,
+        max_loaded: int | None = None,
+        memory_budget: int | None = None,
+    ):
+        super().__init__(dir_path, max_loaded, memory_budget)
+        self._cache = cache.DataSetCache(cache_dir) if cache_dir is not None else None
+        self.register_file_type(ChiaroDataSetType(self._cache))
+
+    @property
+    def catalogue(self) -> pd.DataFrame:
+        """pd.DataFrame: Returns one row of header fields per data set, indexed by name.
+
+        Only headers are needed, so after scan() this does not read any body.
+        """
+        rows = [
+            {"path": data_set.path, "loaded": data_set.is_loaded, **data_set.header}
+            for data_set in self.data_sets
+        ]
+        return pd.DataFrame(rows, index=pd.Index(list(self.keys), name="name"))
 
 
 ##################################
@@ -55,134 +263,43 @@ class ChiaroDataManager(abstracts.DataManager["ChiaroDataSet", "ChiaroDataSetTyp
 
 
 class ChiaroDataSet(abstracts.DataSet):
-    def __init__(self, name: str, path: str):
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        data_set_cache: cache.DataSetCache | None = None,
+    ):
         super().__init__(name, path)
         self._header: dict[str, float | str] = {"version": "old"}
+        self._cache = data_set_cache
 
-    def _load_header(self, lines: list[str]) -> int:
+    def _load_header(self, lines: Iterable[str]) -> bool:
         """Loads the header of the chiaro data set.
 
+        Lines are consumed up to and including the "Time (s)" line, so that the
+        source of the lines is left at the start of the body.
+
         Args:
-            lines (list[str]): list of file lines
+            lines (Iterable[str]): file lines, see header.parse_header
 
         Returns:
-            int: Line number for the start of the body
+            bool: True if the start of the body was found
         """
-        reading_header: bool = True
-        current_line: int = 0
-        # TODO figure out where these are relevant
-        targets = [
-            "Time (s)",
-            "Loading / unloading time (s)",
-            "Calibration factor",
-        ]
-
-        float_targets: dict[str, str] = {
-            "X-position (um)": "x_pos",
-            "Y-position (um)": "y_pos",
-            "Z-position (um)": "z_pos",
-            "Z surface (um)": "z_surface",
-            "Piezo position (nm) (Measured)": "piezo_pos",
-            "k (N/m)": "cantilever_k",
-            "Tip radius (um)": "tip_radius",
-            "Calibration factor": "cantilever_lever",
-            "Wavelength (nm)": "wavelength",
-            "dX before scan (um)": "dx_before_scan",
-            "Piezo position setpoint at start (nm)": "piezo_pos_setpoint",
-            "P[max] (uN)": "max_force",
-            "D[max] (nm)": "max_deflection",
-            "D[final] (nm)": "final_deflection",
-            "D[max-final] (nm)": "max_final_deflection",
-            "Slope (N/m)": "slope",
-            "E[eff] (Pa)": "effective_modulus",
-            "SMDuration (s)": "sm_duration",
-            "Depth (nm)": "depth",
-        }
-
-        string_targets: dict[str, str] = {
-            "Auto find surface": "auto_find_surface",
-            "Device:": "device",
-            "Software version:": "version",
-            "Control mode:": "mode",
-            "Measurement:": "measurement",
-            "Model:": "model",
-            "Comment:": "comment",
-        }
-
-        while reading_header:
-            line = lines[current_line]
-            current_line += 1
-            if line.startswith("Time (s)"):
-                return current_line
-            # TODO find cleaner way to do this specific if
-            if line.startswith("E[v="):
-                closed_square = line.find("]")
-                self._header[line[: closed_square + 1]] = float(
-                    line[closed_square + 7 :]
-                )
-                continue
-
-            for target, name in float_targets.items():
-                if line.startswith(target):
-                    try:
-                        self._header[name] = float(line[len(target) :].strip())
-                    except ValueError:
-                        # Value is not a float, e.g: "Not available in this mode". So don't add
-                        # TODO create log message
-                        pass
-                    continue
-
-            for target, name in string_targets.items():
-                if line.startswith(target):
-                    self._header[name] = line[len(target) :].strip()
-                    continue
-
-            if line.startswith("Profile:") or line.startswith(
-                "Piezo Indentation Sweep Settings"
-            ):
-                protocol_points: list[tuple[float, float]] = []
-                line = lines[current_line]
-                # TODO add support for D/t[n] where n > 9 and clean up code
-                while line.startswith("D[Z"):
-                    t_index = line.find("t")
-                    # d_name = line[:5].strip()
-                    d_value = float(line[11 : t_index - 1].strip())
-                    # t_name = line[t_index : t_index + 4].strip()
-                    t_value = float(line[t_index + 8 :].strip())
-                    # self._header[d_name] = d_value
-                    # self._header[t_name] = t_value
-                    protocol_points.append((d_value, t_value))
-
-                    current_line += 1
-                    line = lines[current_line]
-                self._header["protocol"] = np.array(protocol_points)
-
-        return 0
-
-    def _load_body(self, lines: list[str], line_num: int = 0) -> None:
-        # TODO this is copied from original, still needs adapting
-        data = []
-        for line in lines[line_num:]:
-            line = line.strip().replace(",", ".").split("\t")
-            # Time (s)	Load (uN)	Indentation (nm)	Cantilever (nm)	Piezo (nm)	Auxiliary
-            # skip 2 = indentation and #5 auxiliary if present
-            data.append(
-                [
-                    float(line[0]),  # time
-                    float(line[1]),  # force
-                    float(line[3]),  # z
-                    float(line[4]),  # indentation
-                    float(line[2]),  # deflection
-                ]
-            )
-
-        data = np.array(data)
-
-        time = data[:, 0]
-        force = data[:, 1] * 1000.0
-        deflection = data[:, 2]
-        z = data[:, 3]
-        indentation = data[:, 4]
+        header, found_body = chiaro_header.parse_header(lines)
+        self._header.update(header)
+        return found_body
+
+    def _load_body(self, file: TextIO) -> None:
+        # Time (s)	Load (uN)	Indentation (nm)	Cantilever (nm)	Piezo (nm)	Auxiliary
+        # reorder to time, force, z, indentation, deflection and skip auxiliary if present
+        data = read_numeric_body(file)
+        if data.size == 0:
+            raise ValueError(f"File '{self._path}' contains no data.")
+        # one row per channel, see abstracts.CHANNELS
+        self._store = np.ascontiguousarray(data[:, [0, 1, 3, 4, 2]].T)
+        self._store[1] *= 1000.0
+
+        time, force, deflection, z, indentation = self._store
 
         def create_segments_current():
             nodi = []
@@ -211,69 +328,25 @@ class ChiaroDataSet(abstracts.DataSet):
                 nodi = []
                 nodi.append(0)
                 current_time = 0
+                increasing = lookup.is_increasing(time)
                 for seg_index in range(self.protocol.shape[0]):
                     current_time += self.protocol[seg_index, 1]
-                    nodi.append(np.argmin((time - current_time) ** 2))
+                    nodi.append(lookup.nearest_index(time, current_time, increasing))
 
             for i in range(len(nodi) - 1):
                 if (nodi[i + 1] - nodi[i]) < 2:
                     continue
-                segment_z = z[nodi[i] : nodi[i + 1]]
-                segment_force = force[nodi[i] : nodi[i + 1]]
-                segment_time = time[nodi[i] : nodi[i + 1]]
-                segment_indentation = indentation[nodi[i] : nodi[i + 1]]
-                segment_deflection = deflection[nodi[i] : nodi[i + 1]]
-
                 self.add_segment(
                     Segment(
-                        {
-                            "z": segment_z,
-                            "force": segment_force,
-                            "time": segment_time,
-                            "indentation": segment_indentation,
-                            "deflection": segment_deflection,
-                        }
+                        store=self._store, start=int(nodi[i]), stop=int(nodi[i + 1])
                     )
                 )
 
         def create_segments_2019(bias=30):
-            actual_pos = 2
-            nodi = []
-            nodi.append(0)
-            wait = 0
-            for protocol_index in range(self.protocol.shape[0]):
-                next_threshold = self.protocol[protocol_index, 0]
-                next_time = self.protocol[protocol_index, 1]
-                for j in range(actual_pos, len(z)):
-                    if time[j] > wait + next_time:
-                        if can_be_crossed(
-                            z[j],
-                            z[j - 1],
-                            next_threshold,
-                            bias,
-                        ):
-                            nodi.append(j)
-                            wait = time[j]
-                            break
-                actual_pos = j
-            nodi.append(len(z) - 1)
+            nodi = find_protocol_nodes(time, z, self.protocol, bias)
             for i in range(len(nodi) - 1):
-                segment_z = z[nodi[i] : nodi[i + 1]]
-                segment_force = force[nodi[i] : nodi[i + 1]]
-                segment_time = time[nodi[i] : nodi[i + 1]]
-                segment_indentation = indentation[nodi[i] : nodi[i + 1]]
-                segment_deflection = deflection[nodi[i] : nodi[i + 1]]
-
                 self.add_segment(
-                    Segment(
-                        {
-                            "z": segment_z,
-                            "force": segment_force,
-                            "time": segment_time,
-                            "indentation": segment_indentation,
-                            "deflection": segment_deflection,
-                        }
-                    )
+                    Segment(store=self._store, start=nodi[i], stop=nodi[i + 1])
                 )
 
         # TODO figure out if Genova variant is necessary from experiment.py
@@ -282,26 +355,79 @@ class ChiaroDataSet(abstracts.DataSet):
         else:
             create_segments_current()
 
-    def load(self) -> None:
-        # TODO check file extension
-        lines: list[str]
-        line_num: int
-
-        if not os.path.exists(self._path):
-            raise FileNotFoundError(f"File '{self._path}' does not exist.")
-        with open(self.path, "r") as file:
-            lines = file.readlines()
-            lines = [
-                line.strip() for line in lines if line.strip()
-            ]  # remove empty lines
+    def load(self, file: BinaryIO | None = None) -> None:
+        """Loads the header and segments of the data set.
 
-        # TODO verify that empty files actually have 0 lines
-        if len(lines) == 0:
-            raise ValueError(f"File '{self._path}' is empty.")
+        Args:
+            file (BinaryIO | None): The file of the data set already opened in binary
+                mode at its start, e.g. by the manager after detecting its type. None
+                opens the source of the data set, see DataSet._open.
+        """
+        # TODO check file extension
+        if file is None:
+            with self._open() as file:
+                return self.load(file)
+        # loading again, e.g. after load_header, starts from a clean data set. The
+        # statistics of unchanged segments are those of the source, and are kept
+        statistics = None if self._modified else self._statistics
+        self._segments = []
+        self._store = None
+        self._clear_combined()
+        if self._cache is not None:
+            key = self._cache.key_of(file)
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._restore(*cached)
+                self._loaded_from_source(statistics)
+                return
+            file.seek(0)
+        text = io.TextIOWrapper(file)
+        try:
+            # header is read line by line, the body is then parsed straight from the file
+            if not self._load_header(iter_stripped_lines(text)):
+                raise ValueError(f"File '{self._path}' is empty or has no data.")
+            self._load_body(text)
+        finally:
+            # leave the file to its owner
+            text.detach()
+        self._loaded_from_source(statistics)
+        if self._cache is not None:
+            self._cache.put(key, self._header, *self._pack())
+
+    def load_header(self, file: BinaryIO | None = None) -> None:
+        """Reads the header of the file and stops at the start of the body.
+
+        The segments are loaded by load() on first access.
 
-        line_num = self._load_header(lines)
-        self._load_body(lines, line_num)
-        # self._create_segments()
+        Args:
+            file (BinaryIO | None): The file of the data set, see load.
+        """
+        if file is None:
+            with self._open() as file:
+                return self.load_header(file)
+        text = io.TextIOWrapper(file)
+        try:
+            if not self._load_header(iter_stripped_lines(text)):
+                raise ValueError(f"File '{self._path}' is empty or has no data.")
+        finally:
+            text.detach()
+        self._from_source = True
+
+    def _pack(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the store and the (start, stop) sample of every segment."""
+        bounds = np.array(
+            [(segment.start, segment.stop) for segment in self._segments], dtype=int
+        ).reshape(-1, 2)
+        return self._store, bounds
+
+    def _restore(
+        self, header: dict[str, Any], store: np.ndarray, bounds: np.ndarray
+    ) -> None:
+        """Rebuilds the header and segments from a cache entry, see _pack."""
+        self._header = header
+        self._store = store
+        for start, stop in bounds:
+            self.add_segment(Segment(store=store, start=int(start), stop=int(stop)))
 
     def get_time_fraction(self, percent: float) -> np.ndarray:
         """Returns a fraction of the time data."""
@@ -323,23 +449,11 @@ class ChiaroDataSet(abstracts.DataSet):
         """Returns a fraction of the indentation data."""
         return self._get_fraction(self.indentation, percent)
 
-    def add_segment(self, segment: "Segment") -> None:
-        """Adds a segment to the data set.
-
-        Args:
-            segment (Segment): The segment to add.
-        """
-        if segment not in self._segments:
-            self._segments.append(segment)
-        else:
-            raise ValueError("Segment already exists.")
-
     @property
     def header(self) -> dict[str, float | str]:
         """dict[str, float | str]: Returns the header of the data set."""
         return self._header
 
-
     @property
     def protocol(self) -> np.ndarray:
         """np.ndarray: Returns the tip commands."""
@@ -394,36 +508,26 @@ class NanoSurfDataSet(abstracts.DataSet):
 
 
 class ChiaroDataSetType(abstracts.DataSetType):
-    def __init__(self):
-        """Chiaro data set type. For Optics 11 format."""
-        super().__init__("Chiaro", [".txt"], ChiaroDataSet)
-
-    def has_valid_header(self, path: str) -> bool:
-        with open(path) as file:
-            signature = file.readline()
+    def __init__(self, data_set_cache: cache.DataSetCache | None = None):
+        """Chiaro data set type. For Optics 11 format.
 
-        if signature[0:5] == "Date\t":
-            return True
+        Args:
+            data_set_cache (DataSetCache | None): Cache given to every created data set.
+        """
+        super().__init__("Chiaro", [".txt"], ChiaroDataSet, [b"Date\t"])
+        self._cache = data_set_cache
 
-        return False
+    def create_data_set(self, name: str, path: str) -> ChiaroDataSet:
+        return ChiaroDataSet(name, path, self._cache)
 
 
 class NanoSurfDataSetType(abstracts.DataSetType):
     def __init__(self):
-        super().__init__("NanoSurf", [".txt"], NanoSurfDataSet)
-
-    def has_valid_header(self, path: str) -> bool:
-        with open(path) as file:
-            signature = file.readline()
-
-        if signature[0:9] == "#Filename":
-            return True
-
-        return False
+        super().__init__("NanoSurf", [".txt"], NanoSurfDataSet, [b"#Filename"])
 
 
 # TODO Easytsv DataSetType
-# * experiment.py contains check which can be used
+# * experiment.py contains check which can be used, i.e. the signature b"#easy_tsv"
 
 # TODO Jpk DataSetType
 # * experiment.py shows that there is no check function, will need working out
@@ -437,12 +541,39 @@ class NanoSurfDataSetType(abstracts.DataSetType):
 
 
 class Segment(abstracts.Segment):
-    def __init__(self, data: dict[str, Any]):
+    # the results of the ported analysis methods are properties over these slots
+    __slots__ = (
+        "_i_contact",
+        "_out_contact",
+        "_mode_feedback",
+        "_mode_set_point",
+        "_mode_trigger",
+        "_mode_threshold",
+        "_poisson",
+        "_young",
+        "_young_i_threshold",
+        "_touch",
+        "_h_indentation",
+        "_indentation",
+        "_h_touch",
+        "_h_pressure",
+        "_elastography",
+        "_filterLength",
+        "_contactLength",
+        "_speed",
+    )
+
+    def __init__(
+        self,
+        data: dict[str, Any] | None = None,
+        store: np.ndarray | None = None,
+        start: int = 0,
+        stop: int | None = None,
+    ):
         # TODO organise instance variables
-        super().__init__(data)
+        super().__init__(data, store, start, stop)
         self._i_contact: int = 0
         self._out_contact: int = 0
-        # self._parent = None
         self._mode_feedback = None
         self._mode_set_point = None
         self._mode_trigger = None
@@ -575,51 +706,118 @@ class Segment(abstracts.Segment):
         return y  # y will be in nN
 
     # Again, math code.
-    # Port as it is
-    # Dependencies = numpy, scipy (curve_fit)
+    # hertz is linear in E, so the least squares E is solved directly, see
+    # hertz.fit_young. seed is kept for callers, there is nothing to seed.
+    # Dependencies = numpy
     def fit_hertz(
         self, seed=1000.0 / 1e9, threshold=None, threshold_type="indentation"
     ):
-        # TODO
         self.young = None
-        if self.indentation is None:
+        if self.indentation is None or self.touch is None:
             return
-        x = self.indentation
-        y = self.touch
-        if threshold is not None:
-            imax = len(x)
-            if threshold_type == "indentation":
-                if threshold > np.max(x):
-                    return False
-                imax = np.argmin((x - threshold) ** 2)
-            else:
-                if threshold > np.max(y) or threshold < np.min(y):
-                    return False
-                imax = np.argmin((y - threshold) ** 2)
-            if imax > 10:
-                x = x[:imax]
-                y = y[:imax]
-                self.youngIThreshold = imax
-            else:
-                return False
-        seeds = [seed]
-        # NB the curve is forced to have F=0 at indentation 0
-        try:
-            popt, pcov = curve_fit(self.hertz, x, y, p0=seeds, maxfev=10000)
-            self.young = popt[0]
-            self.H_indentation = x
-            self.H_touch = y
-            area = np.pi * self.parent.tip_radius * x
-            self.H_pressure = y / area
-            return self.young * 1e9
+        young, stops = hertz.fit_young(
+            [self.indentation],
+            [self.touch],
+            self.parent.tip_radius,
+            self._poisson,
+            threshold,
+            threshold_type,
+        )
+        return self.set_hertz(young[0], stops[0], threshold)
 
-        except RuntimeError:
+    def set_hertz(self, young: float, stop: int, threshold: float | None = None):
+        """Stores a Hertz fit of the first stop samples of the indentation.
+
+        Args:
+            young (float): The fitted E, NaN if the fit failed.
+            stop (int): Number of samples fitted, 0 if the fit failed.
+            threshold (float | None): The threshold the fit stopped at, if any.
+
+        Returns:
+            float | bool: E * 1e9, or False if the fit failed.
+        """
+        if stop == 0 or np.isnan(young):
             return False
+        if threshold is not None:
+            self.youngIThreshold = stop
+        x = self.indentation[:stop]
+        y = self.touch[:stop]
+        self.young = young
+        self.H_indentation = x
+        self.H_touch = y
+        area = np.pi * self.parent.tip_radius * x
+        self.H_pressure = y / area
+        return self.young * 1e9
+
+    @property
+    def outContact(self) -> int:
+        return self._out_contact
+
+    @outContact.setter
+    def outContact(self, value: int):
+        self._set_result("_out_contact", value)
+
+    @property
+    def iContact(self) -> int:
+        return self._i_contact
+
+    @iContact.setter
+    def iContact(self, value: int):
+        self._set_result("_i_contact", value)
+
+    @property
+    def touch(self) -> np.ndarray | None:
+        return self._touch
+
+    @touch.setter
+    def touch(self, value: np.ndarray | None):
+        self._set_result("_touch", value)
+
+    @property
+    def young(self) -> float | None:
+        return self._young
+
+    @young.setter
+    def young(self, value: float | None):
+        self._set_result("_young", value)
+
+    @property
+    def youngIThreshold(self) -> int | None:
+        return self._young_i_threshold
+
+    @youngIThreshold.setter
+    def youngIThreshold(self, value: int | None):
+        self._set_result("_young_i_threshold", value)
+
+    @property
+    def H_indentation(self) -> np.ndarray | None:
+        return self._h_indentation
+
+    @H_indentation.setter
+    def H_indentation(self, value: np.ndarray | None):
+        self._set_result("_h_indentation", value)
+
+    @property
+    def H_touch(self) -> np.ndarray | None:
+        return self._h_touch
+
+    @H_touch.setter
+    def H_touch(self, value: np.ndarray | None):
+        self._set_result("_h_touch", value)
+
+    @property
+    def H_pressure(self) -> np.ndarray | None:
+        return self._h_pressure
+
+    @H_pressure.setter
+    def H_pressure(self, value: np.ndarray | None):
+        self._set_result("_h_pressure", value)
 
     @property
     def speed(self) -> int | float:
         return self._speed
 
+
 #         _      _      _       _       _       _
 #      __(.)< __(.)> __(.)=   >(.)__  >(.)__  >(.)__
 #      \___)  \___)  \___)     (___/   (___/   (___/
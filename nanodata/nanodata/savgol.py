@@ -0,0 +1,99 @@
+import functools
+import math
+import numpy as np
+
+from scipy.ndimage import convolve1d
+from scipy.signal import savgol_coeffs
+
+# Savitzky-Golay filtering with cached coefficients.
+#
+# scipy.signal.savgol_filter solves the least squares problem behind its kernel,
+# and fits a polynomial to both edges, on every call. Both only depend on
+# (window_length, polyorder, deriv, delta), so they are computed once here and kept
+# as arrays: the kernel is convolved along the filtered axis and the edges are
+# matrix products, for 1-D signals and batches of them alike.
+
+
+@functools.lru_cache(maxsize=128)
+def savgol_kernel(
+    window_length: int, polyorder: int, deriv: int = 0, delta: float = 1.0
+) -> np.ndarray:
+    """Returns the convolution kernel of a Savitzky-Golay filter, see
+    scipy.signal.savgol_coeffs. The array is cached and read-only."""
+    kernel = savgol_coeffs(window_length, polyorder, deriv=deriv, delta=delta)
+    kernel.flags.writeable = False
+    return kernel
+
+
+@functools.lru_cache(maxsize=128)
+def savgol_edges(
+    window_length: int, polyorder: int, deriv: int = 0, delta: float = 1.0
+) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the matrices giving the first and the last window_length // 2 values
+    of savgol_filter from the first and the last window_length samples.
+
+    Like savgol_filter with mode="interp", these values are those of the polynomial
+    fitted to the window_length samples at each edge. The arrays are cached and
+    read-only.
+    """
+    if polyorder >= window_length:
+        raise ValueError("polyorder must be less than window_length.")
+    # positions scaled to [-1, 1] keep the Vandermonde matrix well conditioned
+    centre = max((window_length - 1) / 2, 1)
+    positions = (np.arange(window_length) - centre) / centre
+    vandermonde = np.vander(positions, polyorder + 1, increasing=True)
+    fit = np.linalg.lstsq(vandermonde, np.eye(window_length), rcond=None)[0]
+    # derivative of every power of the position, at every position
+    powers = np.arange(polyorder + 1)
+    factors = np.array([math.perm(power, deriv) for power in powers], dtype=float)
+    factors /= (centre * delta) ** deriv
+    values = factors * positions[:, None] ** np.maximum(powers - deriv, 0)
+    edges = values @ fit
+    half = window_length // 2
+    left = edges[:half].copy()
+    right = edges[window_length - half :].copy()
+    left.flags.writeable = False
+    right.flags.writeable = False
+    return left, right
+
+
+def savgol_filter(
+    x: np.ndarray,
+    window_length: int,
+    polyorder: int,
+    deriv: int = 0,
+    delta: float = 1.0,
+    axis: int = -1,
+) -> np.ndarray:
+    """Applies a Savitzky-Golay filter as scipy.signal.savgol_filter does with
+    mode="interp", its default, with the cached kernel and edges.
+
+    Args:
+        x (np.ndarray): The signal, or signals along axis for a batch.
+        window_length (int): Length of the filter window, odd.
+        polyorder (int): Order of the polynomial fitted, less than window_length.
+        deriv (int): Order of the derivative to compute.
+        delta (float): Spacing of the samples, for derivatives.
+        axis (int): Axis along which the filter is applied.
+
+    Returns:
+        np.ndarray: The filtered signal, with the shape of x.
+    """
+    x = np.asarray(x)
+    if x.dtype != np.float64 and x.dtype != np.float32:
+        x = x.astype(np.float64)
+    kernel = savgol_kernel(window_length, polyorder, deriv, float(delta))
+    if window_length > x.shape[axis]:
+        raise ValueError(
+            "If mode is 'interp', window_length must be less than or equal to the "
+            "size of x."
+        )
+    y = convolve1d(x, kernel, axis=axis, mode="constant")
+    left, right = savgol_edges(window_length, polyorder, deriv, float(delta))
+    half = window_length // 2
+    if half:
+        samples = np.moveaxis(x, axis, -1)
+        filtered = np.moveaxis(y, axis, -1)
+        filtered[..., :half] = samples[..., :window_length] @ left.T
+        filtered[..., -half:] = samples[..., -window_length:] @ right.T
+    return y
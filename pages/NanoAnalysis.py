@@ -1,5 +1,6 @@
 import calendar
 import tempfile
+from typing import Iterator
 import streamlit as st
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 import os
@@ -9,18 +10,18 @@ import numpy as np
 import zipfile
 import matplotlib.pyplot as plt
 import pandas as pd
-import json
 import shutil
 import altair as alt
 import nanodata.nanodata as nano
-from NanoPrepareOld import save_uploaded_file, base_chart, layer_charts
+from NanoPrepareOld import base_chart, layer_charts
 import nanoanalysisdata.engine as engine
+import nanoanalysisdata.curvefile as curvefile
 
 
 def handle_click(i: int) -> None:
     """Activates and deactivates a curve in the haystack on clicking the checkbox
-        Args:
-            i (int): index of the curve in the haystack
+    Args:
+        i (int): index of the curve in the haystack
     """
     if engine.haystack[i].active:
         engine.haystack[i].active = False
@@ -42,13 +43,45 @@ def file_is_json(file):
         return False
 
 
-def generate_raw_curves(haystack: list) -> list:
-    """Creates DataFrame objects for experiment data and returns them in a list
+def file_is_npz(file):
+    return file.name.endswith(".npz")
+
+
+def iter_haystack(file: UploadedFile) -> Iterator[engine.curve]:
+    """Yields the curves of the haystack, reading them from the file first if it is
+    empty, so that each curve can be shown as soon as it is parsed. The haystack is
+    only set once the whole file is read, so a rerun interrupting the read starts
+    it over
         Args:
-            haystack (list): list storing the data for curves
+            file (UploadedFile): JSON or NPZ export uploaded by the user
 
         Returns:
-            all_curves (list): list of DataFrame objects
+            curves (Iterator[engine.curve]): the curves of the haystack
+    """
+    if len(engine.haystack) > 0:
+        yield from engine.haystack
+        return
+    if file_is_npz(file):
+        # binary export, read straight from the upload
+        curves = curvefile.load_npz(file)["curves"]
+    else:
+        # curves are parsed one at a time straight from the upload, with their F
+        # and Z data as arrays
+        _, curves = curvefile.read_json(file)
+    haystack = []
+    for cv in curves:
+        haystack.append(engine.curve(cv))
+        yield haystack[-1]
+    engine.haystack[:] = haystack
+
+
+def generate_raw_curves(haystack: list) -> list:
+    """Creates DataFrame objects for experiment data and returns them in a list
+    Args:
+        haystack (list): list storing the data for curves
+
+    Returns:
+        all_curves (list): list of DataFrame objects
     """
     all_curves = []
     for curve in haystack:
@@ -69,7 +102,7 @@ def main() -> None:
     )
 
     top_bar = st.container()
-    file = top_bar.file_uploader("Upload a JSON file")
+    file = top_bar.file_uploader("Upload a JSON or NPZ file")
     curve_expander = st.expander("Curve selection")
     graph_bar = st.container()
     graph_first_col, graph_third_col, graph_fourth_col = graph_bar.columns(3)
@@ -85,32 +118,26 @@ def main() -> None:
     ) = filter_bar.columns(5)
 
     if file_not_none(file):
-        if file_is_json(file):
-            save_uploaded_file(file, "data")
-
-            # Load the JSON file
-            f = open("data/" + file.name, "r")
-            structure = json.load(f)
-            # st.write(structure)
-            
-            if len(engine.haystack) == 0:
-                for cv in structure["curves"]:
-                    engine.haystack.append(engine.curve(cv))
+        if file_is_json(file) or file_is_npz(file):
+            # Raw curve plot
+            graph_first_col_raw = graph_first_col.container()
+            graph_first_col_raw.write("Raw curves")
+            graph_first_col_raw_plot = graph_first_col_raw.line_chart()
+            raw_curves = []
 
             # File selection checkboxes
             # graph_first_col.write("Files")
-            # create a checkbox for each file in the haystack
-            for i, curve in enumerate(engine.haystack):
+            # create a checkbox for each file in the haystack, and plot the curves
+            # as they are read; redrawn at every power of 2 so the work stays linear
+            for i, curve in enumerate(iter_haystack(file)):
                 curve_expander.checkbox(
                     curve.filename, value=True, key=i, on_change=handle_click, args=(i,)
                 )
-
-            # Raw curve plot
-            graph_first_col_raw = graph_first_col.container()
-            graph_first_col_raw.write("Raw curves")
-            graph_first_col_raw_plot = graph_first_col_raw.line_chart()
-            raw_curves = generate_raw_curves(engine.haystack)
-
+                raw_curves.extend(generate_raw_curves([curve]))
+                if len(raw_curves) & (len(raw_curves) - 1) == 0:
+                    graph_first_col_raw_plot.altair_chart(
+                        layer_charts(raw_curves, base_chart), use_container_width=True
+                    )
             graph_first_col_raw_plot.altair_chart(
                 layer_charts(raw_curves, base_chart), use_container_width=True
             )
@@ -157,7 +184,7 @@ def main() -> None:
                 graph_fourth_col_bilayer_plot = graph_fourth_col_bilayer.line_chart()
 
         else:
-            st.warning("Only files with the .json extension are supported.")
+            st.warning("Only files with the .json or .npz extension are supported.")
 
 
 if __name__ == "__main__":
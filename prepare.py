@@ -5,20 +5,21 @@ import pyqtgraph as pg
 from PyQt5 import QtCore, QtGui, QtWidgets
 import preparation.prepare_motor as motor
 import mvexperiment.experiment as experiment
+import nanoanalysisdata.curvefile as curvefile
 import preparation.prepare_view as view
 
 import protocols.screening
 
 tips = {
-    'sphere': {'geometry': 'sphere', 'parameter': 'Radius', 'unit': 'nm'},
-    'cylinder': {'geometry': 'cylinder', 'parameter': 'Radius', 'unit': 'nm'},
-    'cone': {'geometry': 'cone', 'parameter': 'Angle', 'unit': 'deg'},
-    'pyramid': {'geometry': 'pyramid', 'parameter': 'Angle', 'unit': 'deg'},
-    'other': {'geometry': 'other', 'parameter': 'Unknown', 'unit': 'au'}
+    "sphere": {"geometry": "sphere", "parameter": "Radius", "unit": "nm"},
+    "cylinder": {"geometry": "cylinder", "parameter": "Radius", "unit": "nm"},
+    "cone": {"geometry": "cone", "parameter": "Angle", "unit": "deg"},
+    "pyramid": {"geometry": "pyramid", "parameter": "Angle", "unit": "deg"},
+    "other": {"geometry": "other", "parameter": "Unknown", "unit": "au"},
 }
 
-pg.setConfigOption('background', 'w')
-pg.setConfigOption('foreground', 'k')
+pg.setConfigOption("background", "w")
+pg.setConfigOption("foreground", "k")
 
 
 def emptyCurve():
@@ -26,23 +27,19 @@ def emptyCurve():
         "filename": "noname",
         "date": "2021-12-02",
         "device_manufacturer": "Optics11",
-        "tip": {
-            "geometry": "sphere",
-            "radius": 0.0
-        },
+        "tip": {"geometry": "sphere", "radius": 0.0},
         "spring_constant": 0.0,
         "segment": "approach",
         "speed": 0.0,
-        "data": {
-            "F": [],
-            "Z": []
-        }
+        "data": {"F": [], "Z": []},
     }
     return curve
 
 
 def title_style(lab):
-    return '<span style="font-family: Arial; font-weight:bold; font-size: 10pt;">{}</span>'.format(lab)
+    return '<span style="font-family: Arial; font-weight:bold; font-size: 10pt;">{}</span>'.format(
+        lab
+    )
 
 
 def lab_style(lab):
@@ -58,30 +55,29 @@ class NanoWindow(QtWidgets.QMainWindow):
         self.collection = None
         # set plots style
         self.curve_raw = pg.PlotCurveItem(clickable=False)
-        self.curve_raw.setPen(
-            pg.mkPen(pg.QtGui.QColor(0, 255, 0, 255), width=1))
+        self.curve_raw.setPen(pg.mkPen(pg.QtGui.QColor(0, 255, 0, 255), width=1))
         self.ui.g_single.plotItem.showGrid(True, True)
         self.ui.g_single.plotItem.addItem(self.curve_raw)
         self.curve_single = pg.PlotCurveItem(clickable=False)
-        self.curve_single.setPen(
-            pg.mkPen(pg.QtGui.QColor(0, 0, 0, 200), width=1))
+        self.curve_single.setPen(pg.mkPen(pg.QtGui.QColor(0, 0, 0, 200), width=1))
         self.ui.g_single.plotItem.addItem(self.curve_single)
         self.curve_fit = pg.PlotCurveItem(clickable=False)
-        self.curve_fit.setPen(pg.mkPen(pg.QtGui.QColor(
-            0, 0, 255, 255), width=5, style=QtCore.Qt.DashLine))
+        self.curve_fit.setPen(
+            pg.mkPen(pg.QtGui.QColor(0, 0, 255, 255), width=5, style=QtCore.Qt.DashLine)
+        )
         self.ui.g_single.plotItem.addItem(self.curve_fit)
 
         self.screening = None
 
-        self.ui.g_fdistance.plotItem.setTitle(title_style('Raw curves'))
-        self.ui.g_single.plotItem.setTitle(title_style('Current curve'))
-        self.ui.g_fdistance.plotItem.setLabel('left', lab_style('Force [nN]'))
-        self.ui.g_single.plotItem.setLabel('left', lab_style('Force [nN]'))
-        self.ui.g_fdistance.plotItem.setLabel('bottom', lab_style('Displacement [nm]'))
-        self.ui.g_single.plotItem.setLabel('bottom', lab_style('Displacement [nm]'))
+        self.ui.g_fdistance.plotItem.setTitle(title_style("Raw curves"))
+        self.ui.g_single.plotItem.setTitle(title_style("Current curve"))
+        self.ui.g_fdistance.plotItem.setLabel("left", lab_style("Force [nN]"))
+        self.ui.g_single.plotItem.setLabel("left", lab_style("Force [nN]"))
+        self.ui.g_fdistance.plotItem.setLabel("bottom", lab_style("Displacement [nm]"))
+        self.ui.g_single.plotItem.setLabel("bottom", lab_style("Displacement [nm]"))
         self.ui.save.clicked.connect(self.saveJSON)
 
-        self.workingdir = './'
+        self.workingdir = "./"
         self.collection = []
         self.experiment = None  # Link to backend
 
@@ -119,22 +115,22 @@ class NanoWindow(QtWidgets.QMainWindow):
         text = str(self.ui.geometry.currentText()).lower()
         for idtip in tips:
             tip = tips[idtip]
-            if tip['geometry'] == text:
+            if tip["geometry"] == text:
                 return tip
         return None
 
     def getIndexGeometry(self, tip):
         for count in range(self.ui.geometry.count()):
             text = str(self.ui.geometry.itemText(count)).lower()
-            if tip['geometry'] == text:
+            if tip["geometry"] == text:
                 return count
 
     def geomlabel(self):
         tip = self.getCurrentTip()
         if tip is None:
-            self.ui.geometry_label.setText('None')
+            self.ui.geometry_label.setText("None")
         else:
-            self.ui.geometry_label.setText(tip['parameter'] + ' [' + tip['unit'] + ']')
+            self.ui.geometry_label.setText(tip["parameter"] + " [" + tip["unit"] + "]")
 
     # connecting all GUI events (signals) to respective slots (functions)
     def connect_all(self, connect=True):
@@ -153,8 +149,7 @@ class NanoWindow(QtWidgets.QMainWindow):
         slots.append(self.ui.mainlist.itemChanged)
         handlers.append(self.data_changed)
 
-        cli = [self.ui.toggle_activated,
-               self.ui.toggle_excluded]
+        cli = [self.ui.toggle_activated, self.ui.toggle_excluded]
         for click in cli:
             slots.append(click.clicked)
             handlers.append(self.toggle)
@@ -176,38 +171,40 @@ class NanoWindow(QtWidgets.QMainWindow):
 
     def open_folder(self):
         fname = QtWidgets.QFileDialog.getExistingDirectory(
-            self, 'Select the root dir', './')
-        if fname == '' or fname is None or fname[0] == '':
+            self, "Select the root dir", "./"
+        )
+        if fname == "" or fname is None or fname[0] == "":
             return
 
-        QtWidgets.QApplication.setOverrideCursor(
-            QtGui.QCursor(QtCore.Qt.WaitCursor))
+        QtWidgets.QApplication.setOverrideCursor(QtGui.QCursor(QtCore.Qt.WaitCursor))
         self.workingdir = fname
 
         exp = None
         quale = self.ui.c_open.currentText()
-        if 'Optics11' in quale:
-            if '2019' in quale:
+        if "Optics11" in quale:
+            if "2019" in quale:
                 exp = experiment.Chiaro2019(fname)
-            elif 'OLD' in quale:
+            elif "OLD" in quale:
                 exp = experiment.ChiaroGenova(fname)
             else:
                 exp = experiment.Chiaro(fname)
-        elif 'Nanosurf' in quale:
+        elif "Nanosurf" in quale:
             exp = experiment.NanoSurf(fname)
-        elif 'TSV' in quale:
+        elif "TSV" in quale:
             exp = experiment.Easytsv(fname)
-        elif 'jpk-force' in quale:
+        elif "jpk-force" in quale:
             exp = experiment.Jpk(fname)
-        elif 'jpk-fmap' in quale:
+        elif "jpk-fmap" in quale:
             exp = experiment.JpkForceMap(fname)
 
         exp.browse()
         if len(exp) == 0:
             QtWidgets.QApplication.restoreOverrideCursor()
             QtWidgets.QMessageBox.information(
-                self, 'Empty folder',
-                'I did not find any valid file in the folder, please check file format and folder')
+                self,
+                "Empty folder",
+                "I did not find any valid file in the folder, please check file format and folder",
+            )
             return
 
         self.disconnect_all()
@@ -215,7 +212,8 @@ class NanoWindow(QtWidgets.QMainWindow):
         self.experiment = exp
 
         progress = QtWidgets.QProgressDialog(
-            "Opening files...", "Cancel opening", 0, len(self.experiment.haystack))
+            "Opening files...", "Cancel opening", 0, len(self.experiment.haystack)
+        )
 
         # node = PlotCurveItem from PyQT (i think)
         def attach(node, parent):
@@ -249,7 +247,7 @@ class NanoWindow(QtWidgets.QMainWindow):
         self.ui.tipradius.setValue(int(ref.tip_radius))
 
         for tip in tips.values():
-            if ref.tip_shape == tip['geometry']:
+            if ref.tip_shape == tip["geometry"]:
                 indextip = self.getIndexGeometry(tip)
                 self.ui.geometry.setCurrentIndex(indextip)
                 self.ui.geometry.setEnabled(False)
@@ -304,7 +302,12 @@ class NanoWindow(QtWidgets.QMainWindow):
                     self.collection[i].set_XY(xnew, ynew)
                 except IndexError:
                     QtWidgets.QMessageBox.information(
-                        self, 'Empty curve', 'Problem detected with curve {}, not populated'.format(c.basename))
+                        self,
+                        "Empty curve",
+                        "Problem detected with curve {}, not populated".format(
+                            c.basename
+                        ),
+                    )
         else:
             return
 
@@ -316,7 +319,10 @@ class NanoWindow(QtWidgets.QMainWindow):
                 self.collection[i].set_XY(c[indicator].z, c[indicator].f)
             except IndexError:
                 QtWidgets.QMessageBox.information(
-                    self, 'Empty curve', 'Problem detected with curve {}, not populated'.format(c.basename))
+                    self,
+                    "Empty curve",
+                    "Problem detected with curve {}, not populated".format(c.basename),
+                )
 
     def curve_clicked(self, curve):
         for c in self.collection:
@@ -369,14 +375,17 @@ class NanoWindow(QtWidgets.QMainWindow):
     def saveJSON(self):
 
         # fname = QtWidgets.QFileDialog.getSaveFileName(self, 'Save the experiment to a JSON structure', './')
-        fname = QtWidgets.QFileDialog.getSaveFileName(self, 'Save the experiment to a JSON structure', self.workingdir,
-                                                      "JSON Files (*.json)")
-        if fname == '' or fname is None or fname[0] == '':
+        fname = QtWidgets.QFileDialog.getSaveFileName(
+            self,
+            "Save the experiment to a JSON structure",
+            self.workingdir,
+            "JSON Files (*.json);;NumPy archives (*.npz)",
+        )
+        if fname == "" or fname is None or fname[0] == "":
             return
 
         QtWidgets.QApplication.setOverrideCursor(QtGui.QCursor(QtCore.Qt.WaitCursor))
 
-        import json
         curves = []
 
         geometry = str(self.ui.geometry.currentText()).lower()
@@ -386,24 +395,30 @@ class NanoWindow(QtWidgets.QMainWindow):
         for c in self.collection:
             if c.active is True:
                 cv = emptyCurve()
-                cv['filename'] = c.basename
-                cv['tip']['radius'] = radius * 1e-9
-                cv['tip']['geometry'] = geometry
-                cv['spring_constant'] = spring
-                cv['position'] = (c.xpos, c.ypos)
-                cv['data']['Z'] = list(c._z * 1e-9)
-                cv['data']['F'] = list(c._f * 1e-9)
+                cv["filename"] = c.basename
+                cv["tip"]["radius"] = radius * 1e-9
+                cv["tip"]["geometry"] = geometry
+                cv["spring_constant"] = spring
+                cv["position"] = (c.xpos, c.ypos)
+                cv["data"]["Z"] = c._z * 1e-9
+                cv["data"]["F"] = c._f * 1e-9
                 curves.append(cv)
-        exp = {'Description': 'Optics11 data'}
+        exp = {"Description": "Optics11 data"}
         pro = {}
-        json.dump({'experiment': exp, 'protocol': pro, 'curves': curves}, open(fname[0], 'w'))
+        structure = {"experiment": exp, "protocol": pro, "curves": curves}
+        if fname[0].endswith(".npz"):
+            # binary export, see nanoanalysisdata.curvefile
+            curvefile.save_npz(fname[0], structure)
+        else:
+            with open(fname[0], "w") as f:
+                curvefile.save_json(f, structure, indent=None)
         QtWidgets.QApplication.restoreOverrideCursor()
 
 
 if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
-    app.setApplicationName('Nano2021')
-    app.setStyle('Fusion')
+    app.setApplicationName("Nano2021")
+    app.setStyle("Fusion")
     chiaro = NanoWindow()
     chiaro.show()
     # QtCore.QObject.connect( app, QtCore.SIGNAL( 'lastWindowClosed()' ), app, QtCore.SLOT( 'quit()' ) )
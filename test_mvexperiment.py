@@ -0,0 +1,98 @@
+import numpy as np
+
+import mvexperiment.experiment as experiment
+
+
+def _nodes_by_sample(time, z, protocol, bias=30, checkCross=True):
+    # the per-sample loop Chiaro.createSegments2019 and Chiaro2019 ran before findNodes
+    actualPos = 2
+    nodi = [0]
+    wait = 0
+    for nextThreshold, nextTime in protocol:
+        for j in range(actualPos, len(z)):
+            if time[j] > wait + nextTime:
+                if not checkCross or experiment.cross(
+                    z[j], z[j - 1], nextThreshold, bias
+                ):
+                    nodi.append(j)
+                    wait = time[j]
+                    break
+        actualPos = j
+    nodi.append(len(z) - 1)
+    return nodi
+
+
+def _genova_nodes_by_sample(time, z, protocol):
+    # the per-sample loop ChiaroGenova.createSegments ran before findGenovaNodes
+    nodi = [0]
+    j = 0
+    nexttime = protocol[j][1]
+    nextvalue = protocol[j][0]
+    timefound = False
+    valuefound = False
+    for i in range(len(time)):
+        if i == len(time) - 1:
+            nodi.append(i)
+        else:
+            if time[i] <= nexttime and time[i + 1] > nexttime:
+                timefound = True
+            if (z[i] <= nextvalue and z[i + 1] > nextvalue) or (
+                z[i] >= nextvalue and z[i + 1] < nextvalue
+            ):
+                valuefound = True
+        if timefound and valuefound:
+            nodi.append(i)
+            nexttime = time[i]
+            timefound = False
+            valuefound = False
+            if j + 1 == len(protocol):
+                nodi.append(len(time) - 1)
+                break
+            else:
+                j += 1
+                nexttime += protocol[j][1]
+                nextvalue = protocol[j][0]
+    return nodi
+
+
+def test_find_genova_nodes_matches_per_sample_loop():
+    time = np.arange(0, 8, 0.01)
+    z = np.interp(time, [0, 1, 3, 4, 6, 8], [0, 0, 5000, 5000, 0, 0])
+    protocol = [[2500.0, 1.5], [4900.0, 0.5], [100.0, 2.5]]
+    nodes = experiment.findGenovaNodes(time, z, protocol)
+    assert nodes == _genova_nodes_by_sample(time, z, protocol)
+    assert len(nodes) == len(protocol) + 2
+
+
+def test_find_genova_nodes_step_never_reached():
+    time = np.arange(0, 8, 0.01)
+    z = np.interp(time, [0, 1, 3, 4, 6, 8], [0, 0, 5000, 5000, 0, 0])
+    # z never goes past 6000, so the second step and the ones after it never end
+    protocol = [[2500.0, 1.5], [6000.0, 0.5], [100.0, 2.5]]
+    nodes = experiment.findGenovaNodes(time, z, protocol)
+    assert nodes == _genova_nodes_by_sample(time, z, protocol)
+    assert nodes[-1] == len(time) - 1
+    assert len(nodes) == 3
+
+
+def test_find_nodes_matches_per_sample_loop():
+    time = np.arange(0, 6, 0.01)
+    z = np.interp(time, [0, 1, 3, 4, 6], [0, 0, 10000, 10000, 0])
+    protocol = [[0.0, 1.0], [10000.0, 2.0], [10000.0, 1.0]]
+    for checkCross in (True, False):
+        nodes = experiment.findNodes(time, z, protocol, checkCross=checkCross)
+        assert nodes == _nodes_by_sample(time, z, protocol, checkCross=checkCross)
+    # without the crossing check every step ends on its duration alone, so the
+    # last step ends although z never crosses its threshold again
+    assert len(experiment.findNodes(time, z, protocol)) == 4
+    assert len(experiment.findNodes(time, z, protocol, checkCross=False)) == 5
+
+
+def test_find_nodes_step_not_found():
+    time = np.arange(0, 6, 0.01)
+    z = np.interp(time, [0, 1, 3, 4, 6], [0, 0, 10000, 10000, 0])
+    # z never reaches 20000, the search gives up and later steps are not found
+    protocol = [[0.0, 1.0], [20000.0, 2.0], [0.0, 0.5]]
+    nodes = experiment.findNodes(time, z, protocol)
+    assert nodes == _nodes_by_sample(time, z, protocol)
+    assert nodes == [0, 101, len(z) - 1]
@@ -1,30 +1,185 @@
+import io
+import json
 import os.path
+import numpy as np
 import pages.NanoAnalysis as NanoAnalysis
 import NanoPrepareOld as NanoPrepare
-
+import nanoanalysisdata.curvefile as curvefile
+import nanoanalysisdata.engine as engine
 
 
 def test_file_is_json():
     f = open("tests/prepare_export.json", "r")
     assert NanoAnalysis.file_is_json(f) is True
     f.close()
+
+
 def test_file_is_not_json():
     f = open("tests/smallest.zip", "r")
     assert NanoAnalysis.file_is_json(f) is False
     f.close()
 
+
 def test_file_is_not_none():
     f = open("tests/smallest.zip", "r")
     assert NanoAnalysis.file_not_none(f) is True
     f.close()
 
+
 def test_file_is_none():
     f = None
     assert NanoAnalysis.file_not_none(f) is False
 
+
 def test_generate_raw_curves():
     pass
 
+
 def test_generate_raw_curves_with_empty_haystack():
     pass
 
+
+def test_npz_export_round_trip():
+    curves = []
+    for i, n in enumerate([5, 0, 7]):
+        cv = NanoPrepare.generate_json_template()
+        cv["filename"] = f"curve_{i}"
+        cv["data"]["F"] = np.linspace(0, 1, n)
+        cv["data"]["Z"] = np.arange(n, dtype=float)
+        curves.append(cv)
+    buffer = io.BytesIO()
+    curvefile.save_npz(buffer, {"experiment": {}, "protocol": {}, "curves": curves})
+    buffer.seek(0)
+    structure = curvefile.load_npz(buffer)
+    assert [cv["filename"] for cv in structure["curves"]] == [
+        "curve_0",
+        "curve_1",
+        "curve_2",
+    ]
+    for saved, loaded in zip(curves, structure["curves"]):
+        assert np.array_equal(saved["data"]["F"], loaded["data"]["F"])
+        assert np.array_equal(saved["data"]["Z"], loaded["data"]["Z"])
+        assert loaded["tip"] == saved["tip"]
+    assert np.array_equal(engine.curve(structure["curves"][2])._Z, np.arange(7))
+
+
+def test_streamed_json_export_matches_json_dumps():
+    def curves():
+        for i, n in enumerate([3, 0]):
+            cv = NanoPrepare.generate_json_template()
+            cv["filename"] = f"curve_{i}"
+            cv["data"]["F"] = np.linspace(-1, 1, n)
+            cv["data"]["Z"] = np.arange(n, dtype=float)
+            yield cv
+
+    experiment = {"Description": "Optics11 data"}
+    for indent in ("", None):
+        buffer = io.StringIO()
+        curvefile.save_json(
+            buffer,
+            {"experiment": experiment, "protocol": {}, "curves": curves()},
+            indent,
+        )
+        expected = []
+        for cv in curves():
+            cv["data"] = {key: value.tolist() for key, value in cv["data"].items()}
+            expected.append(cv)
+        assert buffer.getvalue() == json.dumps(
+            {"experiment": experiment, "protocol": {}, "curves": expected},
+            indent=indent,
+        )
+
+
+def test_read_json_parses_curves_into_arrays():
+    curves = []
+    for i in range(3):
+        cv = NanoPrepare.generate_json_template()
+        cv["filename"] = f"curve_{i}"
+        cv["data"]["F"] = np.linspace(-1, 1, 5 * i).tolist()
+        cv["data"]["Z"] = np.arange(5 * i, dtype=float).tolist()
+        curves.append(cv)
+    text = json.dumps({"experiment": {}, "protocol": {}, "curves": curves}, indent="")
+    structure, loaded = curvefile.read_json(io.BytesIO(text.encode()), chunk_size=7)
+    assert structure == {"experiment": {}, "protocol": {}}
+    for saved, cv in zip(curves, loaded):
+        assert cv["filename"] == saved["filename"]
+        assert cv["data"]["F"].dtype == np.float64
+        assert np.array_equal(cv["data"]["F"], saved["data"]["F"])
+        assert np.array_equal(cv["data"]["Z"], saved["data"]["Z"])
+
+
+def test_calc_elspectra_all_matches_calc_elspectra():
+    rng = np.random.default_rng(0)
+    curves = []
+    for n, geometry in [
+        (400, "sphere"),
+        (30, "sphere"),
+        (900, "cylinder"),
+        (50, "cone"),
+    ]:
+        cv = engine.curve({"tip": {"geometry": geometry, "radius": 3e-6}})
+        zi = np.sort(rng.uniform(0, n * 2e-9, n))
+        zi[0] = 0.0
+        cv._Zi, cv._Fi = zi, 1e-3 * zi**1.5 + rng.normal(0, 1e-12, n)
+        curves.append(cv)
+    expected = []
+    for cv in curves:
+        cv.calc_elspectra(31, 3)
+        expected.append((cv._Ze, cv._E))
+        cv._Ze, cv._E = None, None
+    xx, E = engine.calc_elspectra_all(31, 3, curves)
+    assert E.shape == (4, len(xx))
+    for cv, row, (ze, e) in zip(curves, E, expected):
+        if e is None:
+            assert row.mask.all() and cv._E is None
+            continue
+        assert np.array_equal(cv._Ze, ze)
+        assert np.allclose(cv._E, e, rtol=1e-6)
+        assert np.array_equal(row.compressed(), cv._E)
+
+
+def test_crop_helpers_find_closest_samples():
+    cv = engine.curve({"data": {"F": np.arange(10.0), "Z": np.linspace(0, 9e-9, 10)}})
+    cv._Zi, cv._Fi = cv._Z.copy(), cv._F.copy()
+    zi, fi = cv.getFizi(2.2e-9, 6.6e-9)
+    assert np.array_equal(fi, [2.0, 3.0, 4.0, 5.0, 6.0])
+    cv._Zi = cv._Zi[::-1].copy()
+    assert cv.getJclose(2.2e-9, cv._Zi) == 7
+    cv._cp = [3.1e-9, 0.0]
+    cv.calc_indentation()
+    assert np.array_equal(cv._Fi, np.arange(3.0, 10.0))
+
+
+def test_read_json_falls_back_on_other_values():
+    text = (
+        '{"curves": [{"data": {"F": [1, NaN, -Infinity, 2e3], "Z": [1, null], '
+        '"T": [], "S": [[1, 2]]}}]}'
+    )
+    _, curves = curvefile.read_json(io.BytesIO(text.encode()))
+    data = next(curves)["data"]
+    assert np.array_equal(data["F"], [1.0, np.nan, -np.inf, 2000.0], equal_nan=True)
+    assert data["Z"] == [1, None]
+    assert data["T"].dtype == np.float64 and len(data["T"]) == 0
+    assert data["S"] == [[1, 2]]
+
+
+def test_iter_haystack_yields_curves_as_they_are_read():
+    cv = NanoPrepare.generate_json_template()
+    cv["data"] = {"F": [0.0, 1.0], "Z": [0.0, 1.0]}
+    text = json.dumps({"experiment": {}, "protocol": {}, "curves": [cv, cv]})
+    file = io.BytesIO(text.encode())
+    file.name = "export.json"
+    engine.haystack.clear()
+    try:
+        # a rerun stopping the read keeps nothing of it
+        curves = NanoAnalysis.iter_haystack(file)
+        first = next(curves)
+        assert isinstance(first, engine.curve)
+        curves.close()
+        assert len(engine.haystack) == 0
+        file.seek(0)
+        curves = list(NanoAnalysis.iter_haystack(file))
+        assert curves == engine.haystack and len(curves) == 2
+        assert list(NanoAnalysis.iter_haystack(file)) == engine.haystack
+    finally:
+        engine.haystack.clear()
@@ -3,6 +3,7 @@ import streamlit as st
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 import os
 import mvexperiment.experiment as experiment
+import mvexperiment.mvFilesystem as mvFilesystem
 import numpy as np
 import zipfile
 import matplotlib.pyplot as plt
@@ -19,41 +20,60 @@ def test_extract_zip():
     file_name = "tests/smallest.zip"
     assert NanoPrepare.extract_zip(file_name, dir_name) is not None
 
+
 def test_extract_zip_with_not_zip_file():
     dir_name = tempfile.mkdtemp()
     file_name = "tests/prepare_export.json"
     assert NanoPrepare.extract_zip(file_name, dir_name) is None
 
+
 def test_file_handler():
     f = open("tests/smallest.zip", "rb")
     file_name = "tests/smallest.zip"
-    quale = 'quale'
-    assert isinstance(NanoPrepare.file_handler(file_name, quale, f), nanodata.nanodata.ChiaroDataManager) is True
+    quale = "quale"
+    assert (
+        isinstance(
+            NanoPrepare.file_handler(file_name, quale, f),
+            nanodata.nanodata.ChiaroDataManager,
+        )
+        is True
+    )
+
 
 def test_save_to_json():
-    #TODO : add a test for the save to json when it is finished
+    # TODO : add a test for the save to json when it is finished
     pass
 
+
 def test_get_filter_with_existing_filter():
-    assert isinstance(NanoPrepare.get_filter('Force Filter'), nanodata.nanodata.filter.ForceFilter) is True
+    assert (
+        isinstance(
+            NanoPrepare.get_filter("Force Filter"), nanodata.nanodata.filter.ForceFilter
+        )
+        is True
+    )
+
 
 def test_get_filter_with_none_existing_filter():
-    assert NanoPrepare.get_filter('None existing filter') is None
+    assert NanoPrepare.get_filter("None existing filter") is None
+
 
 def test_execute_filter():
     f = open("tests/smallest.zip", "rb")
-    quale = 'quale'
+    quale = "quale"
     file_name = "tests/smallest.zip"
     data = NanoPrepare.file_handler(file_name, quale, f)
-    filter_object = NanoPrepare.get_filter('Force Filter')
+    filter_object = NanoPrepare.get_filter("Force Filter")
     threshold = 0.0
-    params =  {"force": float(threshold),"comparison": ">"}
+    params = {"force": float(threshold), "comparison": ">"}
 
     assert len(NanoPrepare.execute_filter(data, filter_object, params)) == 3
 
+
 def test_save_uploaded_file():
     pass
 
+
 def test_generate_json_template():
     curve = {
         "filename": "noname",
@@ -67,3 +87,62 @@ def test_generate_json_template():
     }
     assert NanoPrepare.generate_json_template() == curve
 
+
+def test_chiaro_header_without_colons(tmp_path):
+    lines = [
+        "Software version\t3.4.1",
+        "Device\tChiaro",
+        "Control mode\tLoad",
+        "Profile",
+    ]
+    lines += [f"P[Z{n}] (uN)\t{n}.500\tt[{n}] (s)\t2.000" for n in range(1, 6)]
+    lines += ["", "Time (s)\tLoad (uN)"]
+    path = tmp_path / "S-1 X-1 Y-1 I-1.txt"
+    path.write_text("\n".join(lines) + "\n")
+    chiaro = experiment.Chiaro(str(path))
+    chiaro.header()
+    assert chiaro.O11["version"] == "3.4.1"
+    assert chiaro.O11["mode"] == "Load"
+    assert chiaro.protocol == [[n + 0.5, 2.0] for n in range(1, 6)]
+
+
+def test_file_handler_reads_zip_in_place(monkeypatch):
+    def mkdtemp():
+        raise AssertionError("nothing is extracted from a zip")
+
+    nano.ChiaroDataManager("tests/smallest.zip").clear()
+    monkeypatch.setattr(tempfile, "mkdtemp", mkdtemp)
+    with open("tests/smallest.zip", "rb") as f:
+        data = NanoPrepare.file_handler("tests/smallest.zip", "quale", f)
+        assert len(data.data_sets) == 3
+        assert all(len(data_set.force) > 0 for data_set in data.data_sets)
+
+
+def test_chiaro_browses_zip_in_place(tmp_path):
+    with zipfile.ZipFile("tests/smallest.zip") as archive:
+        archive.extractall(tmp_path)
+    zipped = experiment.Chiaro("tests/smallest.zip")
+    zipped.browse()
+    extracted = experiment.Chiaro(str(tmp_path))
+    extracted.browse()
+    assert len(zipped.haystack) == len(extracted.haystack) == 3
+    by_name = {curve.basename: curve for curve in extracted.haystack}
+    for curve in zipped.haystack:
+        curve.open()
+        by_name[curve.basename].open()
+        assert np.array_equal(
+            curve.data["force"], by_name[curve.basename].data["force"]
+        )
+        assert len(curve) == len(by_name[curve.basename])
+
+
+def test_local_path_of_zip_member():
+    member = zipfile.Path(
+        "tests/smallest.zip", "smallest/5pc_sample1 Indentation_001.txt"
+    )
+    with mvFilesystem.localPath(member) as path:
+        with open(path, "rb") as f:
+            assert f.read() == member.read_bytes()
+    assert not os.path.exists(path)
+    with mvFilesystem.localPath("tests/smallest.zip") as path:
+        assert path == "tests/smallest.zip"
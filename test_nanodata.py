@@ -0,0 +1,460 @@
+import io
+import shutil
+import zipfile
+
+import numpy as np
+import pytest
+from scipy.optimize import curve_fit
+from scipy.signal import savgol_filter
+import nanodata.nanodata.nanodata as nd
+from nanodata.nanodata import abstracts, cache, contact, filter, header, hertz, lookup
+from nanodata.nanodata import interfaces, savgol
+
+
+@pytest.fixture(scope="module")
+def smallest_dir(tmp_path_factory) -> str:
+    """The folder of the data sets of tests/smallest.zip, extracted once per module.
+    Tests copy it before changing it."""
+    dir_name = tmp_path_factory.mktemp("smallest")
+    with zipfile.ZipFile("tests/smallest.zip", "r") as zip_file:
+        zip_file.extractall(dir_name)
+    return str(dir_name / "smallest")
+
+
+@pytest.fixture
+def data_sets(smallest_dir) -> list[nd.ChiaroDataSet]:
+    """The 001, 002 and 006 data sets of smallest_dir, loaded."""
+    loaded = []
+    for index in ("001", "002", "006"):
+        name = f"5pc_sample1 Indentation_{index}"
+        data_set = nd.ChiaroDataSet(name, f"{smallest_dir}/{name}.txt")
+        data_set.load()
+        loaded.append(data_set)
+    return loaded
+
+
+@pytest.fixture
+def new_manager():
+    """Returns a function creating a new ChiaroDataManager on every call, although it
+    is a singleton. The instance from before the test is restored afterwards."""
+    instances = interfaces.Singleton._instances
+    previous = instances.pop(nd.ChiaroDataManager, None)
+    managers = []
+
+    def create(*args, **kwargs) -> nd.ChiaroDataManager:
+        instances.pop(nd.ChiaroDataManager, None)
+        managers.append(nd.ChiaroDataManager(*args, **kwargs))
+        return managers[-1]
+
+    yield create
+    for manager in managers:
+        manager.clear()
+    instances.pop(nd.ChiaroDataManager, None)
+    if previous is not None:
+        instances[nd.ChiaroDataManager] = previous
+
+
+def test_parse_numeric_body():
+    body = "0,0\t1,5\t2\t3\t4\n0,1\t-1,5\t2\t3\t4\n"
+    data = nd.parse_numeric_body(body)
+    assert data.shape == (2, 5)
+    assert np.array_equal(data[:, 1], [1.5, -1.5])
+
+
+def test_parse_numeric_body_rejects_malformed_rows():
+    for body in ("1\t2\n3\t4\nfoo\tbar\n5\t6\n", "1\t2\n3\n5\t6\n", "1\t2\n3\t4\t5"):
+        with pytest.raises(ValueError):
+            nd.parse_numeric_body(body)
+        with pytest.raises(ValueError):
+            nd.read_numeric_body(io.StringIO(body), chunk_size=4)
+    # empty rows are skipped
+    assert nd.parse_numeric_body("1\t2\n\n \n3\t4\n").shape == (2, 2)
+
+
+def test_parse_numeric_body_with_auxiliary():
+    body = "0.0\t1.0\t2.0\t3.0\t4.0\t5.0\n0.1\t1.1\t2.1\t3.1\t4.1\t5.1\n"
+    assert nd.parse_numeric_body(body).shape == (2, 6)
+
+
+def test_parallel_load_matches_serial_load(smallest_dir, new_manager):
+    serial = new_manager(smallest_dir)
+    serial.load()
+    parallel = new_manager(smallest_dir)
+    parallel.load(workers=2)
+    assert list(parallel.keys) == list(serial.keys)
+    for name in serial.keys:
+        assert np.array_equal(parallel[name].force, serial[name].force)
+
+
+def test_scan_reads_headers_and_loads_lazily(smallest_dir, new_manager):
+    scanned = new_manager(smallest_dir)
+    scanned.scan()
+    assert len(scanned.keys) > 0
+    catalogue = scanned.catalogue
+    assert list(catalogue.index) == list(scanned.keys)
+    assert not catalogue["loaded"].any()
+    assert (catalogue["tip_radius"] > 0).all()
+    for data_set in scanned.data_sets:
+        loaded = nd.ChiaroDataSet(data_set.name, data_set.path)
+        loaded.load()
+        assert np.array_equal(data_set.force, loaded.force)
+        assert len(data_set) == len(loaded)
+    assert scanned.catalogue["loaded"].all()
+
+
+def test_max_loaded_unloads_least_recently_used(smallest_dir, new_manager):
+    manager = new_manager(smallest_dir, max_loaded=1)
+    manager.load(lazy=True)
+    first, second = list(manager.data_sets)[:2]
+    force = first.force.copy()
+    assert first.is_loaded and not second.is_loaded
+    second.force
+    assert second.is_loaded and not first.is_loaded
+    assert np.array_equal(first.force, force)
+    assert first.is_loaded and not second.is_loaded
+
+
+def test_modified_data_sets_are_not_unloaded(smallest_dir, new_manager):
+    manager = new_manager(smallest_dir, max_loaded=1)
+    manager.load(lazy=True)
+    first, second, third = manager.data_sets
+    first[0].force = first[0].force * 2
+    doubled = first.force.copy()
+    second[0].young = 1.0
+    third.force
+    assert first.is_loaded and second.is_loaded and third.is_loaded
+    assert np.array_equal(first.force, doubled)
+    assert second[0].young == 1.0
+    assert manager.evictions == 0
+
+
+def test_memory_budget_unloads_and_counts(smallest_dir, new_manager, tmp_path):
+    manager = new_manager(smallest_dir, cache_dir=str(tmp_path), memory_budget=1)
+    manager.load(lazy=True)
+    first, second = list(manager.data_sets)[:2]
+    force = first.force.copy()
+    first.force
+    assert (manager.misses, manager.hits, manager.evictions) == (1, 1, 0)
+    second.force
+    assert not first.is_loaded
+    assert manager.evictions == 1
+    assert manager.resident_bytes == second.nbytes
+    assert np.array_equal(first.force, force)
+    assert manager.misses == 3 and manager.evictions == 2
+
+
+def test_load_file_detects_type_from_first_bytes(smallest_dir, new_manager, tmp_path):
+    dir_name = shutil.copytree(smallest_dir, tmp_path / "smallest")
+    with open(dir_name / "other.txt", "w") as file:
+        file.write("#Filename=other\n")
+    manager = new_manager(str(dir_name))
+    manager.load()
+    assert "other" not in manager.keys
+    assert "5pc_sample1 Indentation_001" in manager.keys
+    assert manager["5pc_sample1 Indentation_001"].is_loaded
+
+
+def test_registry_detects_by_extension_and_signature():
+    registry = abstracts.DataSetTypeRegistry()
+    chiaro = nd.ChiaroDataSetType()
+    nano_surf = nd.NanoSurfDataSetType()
+    registry.register(chiaro)
+    registry.register(nano_surf)
+    assert registry.detect("a.txt", b"Date\t12/05/2021") is chiaro
+    assert registry.detect("a.txt", b"#Filename=a") is nano_surf
+    assert registry.detect("a.tsv", b"Date\t12/05/2021") is None
+    assert registry.detect("a.txt", b"#easy_tsv") is None
+    assert not registry.has_extension("a.tsv")
+
+
+def test_load_archive_matches_extracted_load(smallest_dir, new_manager, tmp_path):
+    manager = new_manager(str(tmp_path))
+    manager.load_archive("tests/smallest.zip", lazy=True)
+    assert len(manager.keys) == 3
+    for data_set in manager.data_sets:
+        assert not data_set.is_loaded
+        path = f"{smallest_dir}/{data_set.name}.txt"
+        extracted = nd.ChiaroDataSet(data_set.name, path)
+        extracted.load()
+        assert np.array_equal(data_set.force, extracted.force)
+        assert np.array_equal(data_set.protocol, extracted.protocol)
+    # nothing new is registered from the same archive, which is not kept open
+    manager.load_archive("tests/smallest.zip", lazy=True)
+    assert len(manager.keys) == 3
+    assert len(manager._archives) == 1
+
+
+def test_cached_load_matches_parsed_load(smallest_dir, tmp_path):
+    data_set_cache = cache.DataSetCache(str(tmp_path))
+    path = f"{smallest_dir}/5pc_sample1 Indentation_001.txt"
+    parsed = nd.ChiaroDataSet("parsed", path, data_set_cache)
+    parsed.load()
+    cached = nd.ChiaroDataSet("cached", path, data_set_cache)
+    cached.load()
+    assert len(cached) == len(parsed)
+    assert np.array_equal(cached.protocol, parsed.protocol)
+    assert cached.tip_radius == parsed.tip_radius
+    for cached_segment, parsed_segment in zip(cached, parsed):
+        for channel in abstracts.CHANNELS:
+            assert np.array_equal(cached_segment[channel], parsed_segment[channel])
+
+
+def test_cache_writers_do_not_share_temporary_files(tmp_path):
+    path = str(tmp_path / "entry.json")
+    with cache.replace_on_close(path, "w") as first:
+        with cache.replace_on_close(path, "w") as second:
+            assert first.name != second.name
+            second.write("second")
+        first.write("first")
+    with open(path) as file:
+        assert file.read() == "first"
+    assert [p.name for p in tmp_path.iterdir()] == ["entry.json"]
+
+
+def test_combined_channels_are_cached_and_invalidated(data_sets):
+    data_set = data_sets[0]
+    force = data_set.force
+    assert data_set.force is force
+    assert np.array_equal(force, np.concatenate([s.force for s in data_set]))
+    data_set[0].force = data_set[0].force * 2
+    assert data_set.force is not force
+    assert np.array_equal(data_set.force[: len(data_set[0].force)], data_set[0].force)
+
+
+def test_data_set_built_in_memory_is_not_read_from_its_path():
+    data_set = nd.ChiaroDataSet("memory", "/nonexistent/memory.txt")
+    time = np.linspace(0, 1, 10)
+    data_set.add_segment(nd.Segment({"time": time, "z": time, "force": 2 * time}))
+    data_set.add_segment(nd.Segment({"time": time, "z": time, "force": 3 * time}))
+    assert data_set.is_loaded
+    assert np.array_equal(data_set.force, np.concatenate([2 * time, 3 * time]))
+    assert np.array_equal(data_set.z, np.concatenate([time, time]))
+    assert len(data_set.segments) == 2
+
+
+def test_segment_has_no_instance_dict():
+    time = np.linspace(0, 1, 10)
+    segment = nd.Segment({"time": time, "z": time, "force": time})
+    assert not hasattr(segment, "__dict__")
+    assert (segment.outContact, segment.iContact, segment.young) == (0, 0, None)
+    segment.young = 1.0
+    assert segment._young == 1.0
+    with pytest.raises(AttributeError):
+        segment.unknown = 1
+
+
+def test_statistics_match_combined_channels(data_sets):
+    data_set = data_sets[1]
+    statistics = data_set.statistics
+    assert len(statistics) == len(data_set)
+    for channel in abstracts.CHANNELS:
+        combined = data_set._get_combined(channel)
+        assert statistics.channel_max(channel) == np.max(combined)
+        assert statistics.channel_min(channel) == np.min(combined)
+        assert statistics.channel_argmax(channel) == np.argmax(combined)
+        assert np.isclose(statistics.channel_mean(channel), np.mean(combined))
+
+
+def test_statistics_and_header_survive_unload(data_sets):
+    data_set = data_sets[1]
+    statistics = data_set.statistics
+    header = dict(data_set.header)
+    data_set.unload()
+    assert data_set.statistics is statistics
+    assert data_set.header == header
+    assert not data_set.is_loaded
+    data_set.force
+    assert data_set.statistics is statistics
+    data_set[0].force = data_set[0].force * 2
+    assert data_set.statistics is not statistics
+    changed = data_set.statistics
+    data_set.unload()
+    data_set.force
+    assert data_set.statistics is not changed
+    assert data_set.statistics.channel_max("force") == statistics.channel_max("force")
+
+
+def test_batch_histograms_match_numpy():
+    rng = np.random.default_rng(0)
+    forces = [rng.normal(0, 1, n) ** 3 for n in (5, 100, 2000)]
+    stack, lengths = contact.pad(forces)
+    counts, centres, bins = contact._auto_histograms(stack, lengths)
+    for force, row, row_centres, row_bins in zip(forces, counts, centres, bins):
+        expected, edges = np.histogram(force, bins="auto")
+        assert np.array_equal(row[:row_bins], expected)
+        assert np.allclose(row_centres[:row_bins], (edges[1:] + edges[:-1]) / 2)
+
+
+def test_find_contact_points_matches_per_segment(data_sets):
+    segments = [segment for data_set in data_sets for segment in data_set]
+    nd.find_contact_points(segments)
+    for segment in segments:
+        z, force = segment.z, segment.force
+        # the closed form Gaussian fit may end the baseline a few samples apart
+        scipy_out_contact = contact.find_out_of_contact_scipy(z, force)
+        assert abs(segment.outContact - scipy_out_contact) <= len(z) / 100
+        out_contact = segment.outContact
+        ypoly = np.polyval(np.polyfit(z[:out_contact], force[:out_contact], 1), z)
+        below = [i for i in range(1, out_contact + 1) if force[i] < ypoly[i]]
+        assert segment.iContact == (below[-1] if below else 0)
+
+
+def test_fit_young_matches_curve_fit():
+    rng = np.random.default_rng(0)
+    xs = [np.linspace(0, 1000, n) for n in (5, 300, 800)]
+    ys = [3e-5 * hertz.hertz_constant(5000, 0.5) * x**1.5 for x in xs]
+    ys = [y + rng.normal(0, 0.01, len(y)) for y in ys]
+
+    def model(x, young):
+        return young * hertz.hertz_constant(5000, 0.5) * np.abs(x) ** 1.5
+
+    young, stops = hertz.fit_young(xs, ys, 5000, 0.5)
+    assert np.array_equal(stops, [5, 300, 800])
+    for x, y, fitted in zip(xs, ys, young):
+        expected = curve_fit(model, x, y, p0=[1e-6], maxfev=10000)[0][0]
+        assert np.isclose(fitted, expected, rtol=1e-6)
+    young, stops = hertz.fit_young(xs, ys, 5000, 0.5, threshold=500)
+    assert stops[0] == 0 and np.isnan(young[0])
+    for x, y, fitted, stop in zip(xs[1:], ys[1:], young[1:], stops[1:]):
+        assert stop == np.argmin((x - 500) ** 2)
+        expected = curve_fit(model, x[:stop], y[:stop], p0=[1e-6])[0][0]
+        assert np.isclose(fitted, expected, rtol=1e-6)
+    young, stops = hertz.fit_young(xs, ys, 5000, 0.5, 2000, "force")
+    assert np.isnan(young).all() and not stops.any()
+
+
+def test_fit_young_does_not_depend_on_position():
+    # the last curve of a batch must not be reduced with the padding after it
+    x = np.array([100.0] * 12 + [-5.0, 200.0])
+    other = np.linspace(0, 300, 50)
+    for threshold, kind in [(10.0, "indentation"), (-4.0, "force")]:
+        first = hertz.fit_young([x, other], [x, other], 1.0, 0.5, threshold, kind)
+        last = hertz.fit_young([other, x], [other, x], 1.0, 0.5, threshold, kind)
+        assert np.array_equal(first[0], last[0][::-1], equal_nan=True)
+        assert np.array_equal(first[1], last[1][::-1])
+        assert last[1][1] == np.argmin((x - threshold) ** 2)
+
+
+def test_fit_hertz_curves_matches_fit_hertz(data_sets):
+    data_set = data_sets[0]
+    # the last segment has no indentation yet and is not fitted
+    for segment in data_set[:-1]:
+        segment.touch = np.abs(segment.force)
+    batch = nd.fit_hertz_curves(data_set, threshold=1.0, threshold_type="force")
+    assert np.isnan(batch[-1]) and data_set[-1].young is None
+    for segment, young in zip(data_set[:-1], batch):
+        fitted = segment.young
+        single = segment.fit_hertz(threshold=1.0, threshold_type="force")
+        if np.isnan(young):
+            assert single is False and fitted is None
+        else:
+            assert single == young and segment.young == fitted
+
+
+def test_savgol_filter_matches_scipy():
+    rng = np.random.default_rng(0)
+    signals = rng.normal(size=(4, 500)).cumsum(axis=1)
+    settings = [(101, 2, 2, 1.0), (31, 6, 0, 1.0), (31, 3, 1, 1e-9)]
+    for window, order, deriv, delta in settings:
+        batch = savgol.savgol_filter(signals.T, window, order, deriv, delta, axis=0)
+        for signal, filtered in zip(signals, batch.T):
+            expected = savgol_filter(signal, window, order, deriv, delta)
+            scale = np.abs(expected).max()
+            assert np.allclose(filtered, expected, rtol=1e-9, atol=1e-12 * scale)
+    assert savgol.savgol_kernel(101, 2, 2, 1.0) is savgol.savgol_kernel(101, 2, 2, 1.0)
+
+
+def test_nearest_index_matches_argmin():
+    rng = np.random.default_rng(0)
+    for x in [
+        np.sort(rng.integers(-5, 5, 40).astype(float)),
+        np.linspace(0, 1, 11)[::-1],
+        np.array([0.0, np.nan, 1.0]),
+        np.array([2.0]),
+    ]:
+        increasing = lookup.is_increasing(x)
+        for x0 in [*x, -10.0, 10.0, 0.25, 0.5, *rng.normal(0, 3, 20)]:
+            expected = np.argmin((x - x0) ** 2)
+            assert lookup.nearest_index(x, x0) == expected
+            assert lookup.nearest_index(x, x0, increasing) == expected
+    assert not lookup.is_increasing(np.array([0.0, np.nan, 1.0]))
+
+
+def test_apply_filters_matches_is_valid(data_sets):
+    force_filter = filter.ForceFilter()
+    threshold = float(np.median([np.max(data_set.force) for data_set in data_sets]))
+    for comparison in ("<", ">", "<=", ">=", "==", "!="):
+        parameters = {"force": threshold, "comparison": comparison}
+        expected = [force_filter.is_valid(parameters, d) for d in data_sets]
+        assert force_filter.mask(parameters, data_sets).tolist() == expected
+    chained = filter.apply_filters(
+        [
+            (force_filter, {"force": threshold, "comparison": ">="}),
+            (force_filter, {"force": threshold, "comparison": "<="}),
+        ],
+        data_sets,
+    )
+    assert chained.sum() == 1
+
+
+def test_apply_filters_skips_rejected_data_sets(data_sets):
+    force_filter = filter.ForceFilter()
+    threshold = float(np.median([np.max(data_set.force) for data_set in data_sets]))
+    checked = []
+
+    class RecordingFilter(filter.Filter):
+        def __init__(self):
+            super().__init__("Records the data sets it checks")
+
+        def is_valid(self, parameters, data_set):
+            checked.append(data_set)
+            return True
+
+    # subclasses register themselves, keep this one out of the filters of later tests
+    filter.FilterMeta._filters.pop(RecordingFilter)
+    mask = filter.apply_filters(
+        [
+            (force_filter, {"force": threshold, "comparison": ">"}),
+            (RecordingFilter(), {}),
+        ],
+        data_sets,
+    )
+    filter.FilterMeta._filters.pop(RecordingFilter)
+    assert len(mask) == len(data_sets)
+    assert checked == [d for d, valid in zip(data_sets, mask) if valid]
+    assert len(checked) == 1
+
+
+def test_find_protocol_nodes():
+    time = np.arange(0, 6, 0.01)
+    z = np.interp(time, [0, 1, 3, 4, 6], [0, 0, 10000, 10000, 0])
+    protocol = np.array([[0.0, 1.0], [10000.0, 2.0], [10000.0, 1.0]])
+    # the last step never crosses its threshold again, so only two ends are found
+    assert nd.find_protocol_nodes(time, z, protocol) == [0, 101, 401, len(z) - 1]
+
+
+def test_parse_header_multi_digit_protocol():
+    lines = ["Tip radius (um)\t22,000", "Control mode: Indentation", "Profile:"]
+    lines += [f"D[Z{n}] (nm)\t{n * 100}.000\tt[{n}] (s)\t1.000" for n in range(1, 12)]
+    lines += ["E[v=0.50] (Pa)\t1588.215", "Time (s)\tLoad (uN)", "0.0\t0.0"]
+    fields, found_body = header.parse_header(iter(lines))
+    assert found_body
+    assert fields["tip_radius"] == 22.0
+    assert fields["mode"] == "Indentation"
+    assert fields["E[v=0.50]"] == 1588.215
+    assert fields["protocol"].shape == (11, 2)
+    assert fields["protocol"][10, 0] == 1100.0
+
+
+def test_parse_header_without_colons_load_protocol():
+    lines = ["Software version\t3.4.1", "Control mode\tLoad", "Measurement\tsweep"]
+    lines += ["Profile"]
+    lines += [f"P[Z{n}] (uN)\t{n}.500\tt[{n}] (s)\t2.000" for n in range(1, 6)]
+    lines += ["P[max] (uN)\t5.000", "Time (s)\tLoad (uN)"]
+    fields, found_body = header.parse_header(iter(lines))
+    assert found_body
+    assert fields["version"] == "3.4.1"
+    assert fields["mode"] == "Load"
+    assert fields["measurement"] == "sweep"
+    assert fields["max_force"] == 5.0
+    assert fields["protocol"].tolist() == [[n + 0.5, 2.0] for n in range(1, 6)]